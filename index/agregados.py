@@ -0,0 +1,124 @@
+import itertools
+import pandas as pd
+from classificador import CATEGORIAS
+from metricas import medir
+
+# Períodos do índice e a frequência pandas de cada um
+GRANULARIDADES = {'minuto': 'min', 'hora': 'h', 'dia': 'D'}
+_CHAVES = ['periodo', 'nivel', 'categoria']
+# Versões únicas entre todos os índices, para servir de chave de cache
+_VERSOES = itertools.count(1)
+
+
+class IndiceAgregado:
+    # Quantidade de logs por período (minuto, hora e dia) × nível × categoria.
+    # O tamanho depende do intervalo de tempo coberto e não da quantidade de logs,
+    # então o dashboard e o relatório consultam o índice em vez das linhas.
+    def __init__(self):
+        self.total = 0
+        self.inicio = None
+        self.fim = None
+        self._tabelas = dict.fromkeys(GRANULARIDADES)
+        # Contagens por minuto dos blocos novos, somadas ao índice na próxima consulta
+        self._pendentes = []
+        # Muda a cada bloco acrescentado: quem desenha a partir do índice compara
+        # a versão para saber se precisa refazer o trabalho
+        self.versao = next(_VERSOES)
+
+    def __setstate__(self, estado):
+        # Índice lido do cache em disco: a versão gravada pode coincidir com a de
+        # outro índice desta execução, então recebe uma nova
+        self.__dict__.update(estado)
+        self.versao = next(_VERSOES)
+
+    def atualizar(self, df):
+        # Acrescenta um bloco de logs já classificado (com a coluna 'categoria')
+        if df.empty:
+            return self
+
+        with medir('agregacao', len(df)):
+            self.total += len(df)
+            self._limites(df['timestamp'].min(), df['timestamp'].max())
+            minutos = df['timestamp'].dt.floor(GRANULARIDADES['minuto']).rename('periodo')
+            contagem = df.groupby([minutos, df['nivel'].rename('nivel'), df['categoria'].rename('categoria')],
+                                  observed=True, sort=False).size()
+            if not contagem.empty:
+                # Níveis e categorias como texto para somar blocos com categorias diferentes
+                contagem.index = contagem.index.set_levels(
+                    [contagem.index.levels[1].astype(str), contagem.index.levels[2].astype(str)], level=[1, 2])
+                self._pendentes.append(contagem)
+            self.versao = next(_VERSOES)
+        return self
+
+    def combinar(self, outro):
+        self.total += outro.total
+        self._limites(outro.inicio, outro.fim)
+        minutos = outro.contagens('minuto')
+        if not minutos.empty:
+            self._pendentes.append(minutos)
+        self.versao = next(_VERSOES)
+        return self
+
+    def _limites(self, inicio, fim):
+        if inicio is not None and pd.notna(inicio):
+            self.inicio = inicio if self.inicio is None else min(self.inicio, inicio)
+        if fim is not None and pd.notna(fim):
+            self.fim = fim if self.fim is None else max(self.fim, fim)
+
+    def _consolidar(self):
+        if not self._pendentes:
+            return
+
+        partes = self._pendentes
+        if self._tabelas['minuto'] is not None:
+            partes = [self._tabelas['minuto']] + partes
+        minutos = pd.concat(partes).groupby(level=_CHAVES).sum()
+        self._pendentes = []
+
+        # Horas e dias são recalculados a partir dos minutos, que já são poucos
+        self._tabelas['minuto'] = minutos
+        periodos = minutos.index.get_level_values('periodo')
+        for nome, frequencia in GRANULARIDADES.items():
+            if nome != 'minuto':
+                self._tabelas[nome] = minutos.groupby(
+                    [periodos.floor(frequencia),
+                     minutos.index.get_level_values('nivel'),
+                     minutos.index.get_level_values('categoria')]).sum().rename_axis(_CHAVES)
+
+    def contagens(self, granularidade='minuto', nivel=None, categoria=None):
+        # Série com índice (periodo, nivel, categoria), opcionalmente filtrada
+        if granularidade not in GRANULARIDADES:
+            raise ValueError(f"Granularidade desconhecida: {granularidade} "
+                             f"(opções: {', '.join(GRANULARIDADES)})")
+        self._consolidar()
+        tabela = self._tabelas[granularidade]
+        if tabela is None:
+            vazio = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), [], []], names=_CHAVES)
+            return pd.Series([], index=vazio, dtype='int64')
+        if nivel is not None:
+            tabela = tabela[tabela.index.get_level_values('nivel') == nivel]
+        if categoria is not None:
+            tabela = tabela[tabela.index.get_level_values('categoria') == categoria]
+        return tabela
+
+    def por_nivel(self):
+        # Como value_counts: só níveis com ocorrências, do mais para o menos frequente
+        contagem = self.contagens('dia').groupby(level='nivel').sum()
+        return contagem[contagem > 0].sort_values(ascending=False)
+
+    def por_categoria(self, nivel=None):
+        contagem = self.contagens('dia', nivel=nivel).groupby(level='categoria').sum()
+        return contagem.reindex(CATEGORIAS, fill_value=0)
+
+    def por_hora_do_dia(self, nivel=None):
+        contagem = self.contagens('hora', nivel=nivel)
+        horas = contagem.index.get_level_values('periodo').hour
+        return contagem.groupby(horas).sum().sort_index()
+
+    def serie(self, granularidade='dia', nivel=None, categoria=None):
+        # Série temporal contínua (períodos sem logs valem zero), como um resample
+        contagem = self.contagens(granularidade, nivel=nivel, categoria=categoria)
+        serie = contagem.groupby(level='periodo').sum()
+        if serie.empty:
+            return serie
+        return serie.asfreq(GRANULARIDADES[granularidade], fill_value=0)
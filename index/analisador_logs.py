@@ -1,27 +1,69 @@
+import argparse
+import os
+import sys
+import tempfile
+from collections import Counter
+import numpy as np
 import pandas as pd
-import re
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-from sklearn.svm import OneClassSVM
-from sklearn.feature_extraction.text import TfidfVectorizer
-import seaborn as sns
-from datetime import datetime
+import pyarrow as pa
+from cache_resultados import Assinatura, CacheResultados, EntradaCache, identidade_modelo
+from classificador import DicionarioTemplates, classificar_logs
+from duplicadas import COLUNA_ITEM, COLUNA_TRANSACAO, JanelaTransacoes, marcar_duplicadas
+from agregados import IndiceAgregado
+from indice_tempo import IndiceTempo, LIMITE_LINHAS_PADRAO
+from ingestao import Quarentena, caminho_quarentena, detectar_codificacao, ler_cabecalho
+from motor_analise import MotorAnalise, TAMANHO_CHUNK_PADRAO, concatenar_chunks, ler_logs_csv, preprocessar
+from metricas import medir_iteracao
+from modelo_anomalias import CAMINHO_MODELO_PADRAO, DETECTOR_PADRAO
+from relatorio import ExportadorErros, blocos_filtrados, exportar_erros, formato_do_caminho, gravar_relatorio
+
+# Só o núcleo de análise é importado aqui. A interface (Tk), o dashboard
+# (Matplotlib/Seaborn) e o modelo de anomalias (scikit-learn) são importados
+# quando usados, então o módulo abre rápido e funciona em servidores sem Tk.
+try:
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+except ImportError:
+    tk = ttk = filedialog = messagebox = None
+
+# Colunas das tabelas das abas de logs e de resultados
+COLUNAS_TABELA = [('timestamp', 'Data/Hora'), ('nivel', 'Nível'), ('severidade', 'Severidade'),
+                  ('categoria', 'Categoria'), ('transactionid', 'Transação'), ('mensagem', 'Mensagem')]
+FILTROS_TABELA = ['nivel', 'severidade', 'categoria']
+LARGURAS_TABELA = {'timestamp': 150, 'nivel': 80, 'severidade': 90, 'categoria': 130, 'transactionid': 90,
+                   'mensagem': 520}
 
 class AnalisadorLogs:
     def __init__(self, root):
         self.root = root
         self.root.title("Analisador de Logs Avançado")
         self.root.geometry("1200x900")
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         
         self.df_logs = None
+        # Resultado carregado (EntradaCache): logs, máscaras e índices
+        self.entrada = None
         self.erros_detectados = None
+        self.mascara_regras = None
+        self.mascara_erros = None
+        # Índices de contagens usados pelo dashboard e pelo relatório
+        self.indice = None
+        self.indice_erros = None
+        self.erros_frequentes = None
+        # CSV aberto na aba de logs e seu índice de offsets por tempo
+        self.caminho_logs = None
+        self.indice_tempo = None
+        # Criado na primeira exibição do dashboard
+        self.dashboard = None
+        # Resultados de CSVs já analisados, para não refazer a análise ao reabri-los
+        self.cache = CacheResultados()
         
         self.create_widgets()
     
     def create_widgets(self):
+        from tabela_virtual import TabelaVirtual
+        from tarefas import BarraTarefas
+        
         main_frame = ttk.Frame(self.root)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
@@ -30,6 +72,8 @@ class AnalisadorLogs:
         control_frame.pack(fill=tk.X, pady=5)
         
         ttk.Button(control_frame, text="Carregar Logs", command=self.load_logs).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Carregar Parquet", command=self.load_store).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Navegar no Arquivo", command=self.browse_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Analisar Logs", command=self.analyze_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Mostrar Dashboard", command=self.show_dashboard).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Exportar Relatório", command=self.export_report).pack(side=tk.LEFT, padx=5)
@@ -42,32 +86,45 @@ class AnalisadorLogs:
         self.log_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.log_tab, text="Logs")
         
-        self.log_text = tk.Text(self.log_tab, wrap=tk.WORD)
-        scrollbar = ttk.Scrollbar(self.log_tab, orient="vertical", command=self.log_text.yview)
-        self.log_text.configure(yscrollcommand=scrollbar.set)
+        # Janela de tempo: lê só as linhas do período, sem carregar o arquivo inteiro
+        nav_frame = ttk.Frame(self.log_tab)
+        nav_frame.pack(side=tk.TOP, fill=tk.X, pady=2)
+        self.inicio_var = tk.StringVar()
+        self.fim_var = tk.StringVar()
+        ttk.Label(nav_frame, text="Início:").pack(side=tk.LEFT, padx=2)
+        ttk.Entry(nav_frame, textvariable=self.inicio_var, width=20).pack(side=tk.LEFT, padx=2)
+        ttk.Label(nav_frame, text="Fim:").pack(side=tk.LEFT, padx=2)
+        ttk.Entry(nav_frame, textvariable=self.fim_var, width=20).pack(side=tk.LEFT, padx=2)
+        ttk.Button(nav_frame, text="Ir", command=self.show_time_window).pack(side=tk.LEFT, padx=5)
         
-        scrollbar.pack(side="right", fill="y")
-        self.log_text.pack(fill=tk.BOTH, expand=True)
+        # Tabelas virtuais: só as linhas visíveis são desenhadas, então mostram o
+        # DataFrame inteiro (ordenável e filtrável) sem travar a interface
+        self.log_tabela = TabelaVirtual(self.log_tab, COLUNAS_TABELA, FILTROS_TABELA, LARGURAS_TABELA)
+        self.log_tabela.frame.pack(fill=tk.BOTH, expand=True)
         
         # Aba de resultados
         self.result_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.result_tab, text="Resultados")
         
-        self.result_text = tk.Text(self.result_tab, wrap=tk.WORD)
-        scrollbar_result = ttk.Scrollbar(self.result_tab, orient="vertical", command=self.result_text.yview)
-        self.result_text.configure(yscrollcommand=scrollbar_result.set)
+        self.result_text = tk.Text(self.result_tab, wrap=tk.WORD, height=14)
+        self.result_text.pack(side=tk.TOP, fill=tk.X)
         
-        scrollbar_result.pack(side="right", fill="y")
-        self.result_text.pack(fill=tk.BOTH, expand=True)
+        self.result_tabela = TabelaVirtual(self.result_tab, COLUNAS_TABELA, FILTROS_TABELA, LARGURAS_TABELA)
+        self.result_tabela.frame.pack(fill=tk.BOTH, expand=True)
         
         # Aba de dashboard
         self.dashboard_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.dashboard_tab, text="Dashboard")
         
-        # Barra de status
+        # Barra de status; carregamento, análise e gráficos rodam fora da thread do Tk
         self.status_var = tk.StringVar()
         self.status_var.set("Pronto")
-        ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN).pack(fill=tk.X)
+        self.barra = BarraTarefas(self.root, main_frame, self.status_var)
+        self.barra.frame.pack(fill=tk.X)
+    
+    def close(self):
+        self.barra.encerrar()
+        self.root.destroy()
     
     def load_logs(self):
         file_path = filedialog.askopenfilename(
@@ -76,292 +133,154 @@ class AnalisadorLogs:
         )
         
         if file_path:
-            try:
-                self.df_logs = pd.read_csv(file_path)
-                self.status_var.set(f"✅ Logs carregados: {file_path}")
-                
-                # Pré-processamento básico
-                self.df_logs['timestamp'] = pd.to_datetime(self.df_logs['timestamp'], errors='coerce')
-                self.df_logs = self.df_logs.dropna(subset=['timestamp'])
-                
-                self.log_text.delete(1.0, tk.END)
-                sample_logs = self.df_logs.sample(min(100, len(self.df_logs)))  # Mostra apenas uma amostra para performance
-                for _, row in sample_logs.iterrows():
-                    self.log_text.insert(tk.END, f"{row['timestamp']} - {row['nivel']} - {row['mensagem']}\n")
-                
-                self.log_text.insert(tk.END, f"\n\nTotal de logs carregados: {len(self.df_logs):,}")
-            except Exception as e:
-                self.status_var.set(f"Erro: {str(e)}")
-                messagebox.showerror("Erro", f"Falha ao carregar logs: {str(e)}")
+            # Linhas malformadas vão para <arquivo>.rejeitadas.csv em vez de abortar a carga
+            quarentena = Quarentena(caminho_quarentena(file_path))
+            self.barra.executar("Carregando logs...",
+                                lambda progresso: carregar_csv(file_path, quarentena, self.cache, progresso),
+                                lambda carregado: self._exibir_logs_carregados(carregado, file_path, quarentena),
+                                "Falha ao carregar logs")
+    
+    def load_store(self):
+        # Armazenamento Parquet criado com "cli.py importar": timestamp já vem como datetime
+        dir_path = filedialog.askdirectory(title="Selecione o diretório Parquet dos logs")
+        
+        if dir_path:
+            self.barra.executar("Carregando logs...",
+                                lambda progresso: EntradaCache(None, *carregar_lotes(_lotes_armazenamento(dir_path),
+                                                                                     progresso)),
+                                lambda carregado: self._exibir_logs_carregados(carregado, dir_path),
+                                "Falha ao carregar logs")
+    
+    def _exibir_logs_carregados(self, entrada, origem, quarentena=None):
+        self.entrada = entrada
+        self.df_logs, self.mascara_regras, self.indice = entrada.df_logs, entrada.mascara_regras, entrada.indice
+        self.mascara_erros = None
+        # Só CSVs podem ser navegados pelo índice de offsets
+        self.caminho_logs = origem if os.path.isfile(origem) else None
+        self.indice_tempo = None
+        self.status_var.set(f"✅ Logs carregados: {origem}")
+        if quarentena is not None and quarentena.total:
+            self.status_var.set(f"⚠️ Logs carregados: {origem} ({quarentena.total:,} linhas malformadas "
+                                f"em {quarentena.caminho})")
+        
+        self.log_tabela.mostrar(self.df_logs)
+        self.result_text.delete(1.0, tk.END)
+        self.result_tabela.limpar()
+    
+    def browse_logs(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("CSV files", "*.csv"), ("Text files", "*.txt"), ("All files", "*.*")],
+            title="Selecione o arquivo de logs para navegar"
+        )
+        
+        if file_path:
+            self.caminho_logs = file_path
+            self.indice_tempo = None
+            self.show_time_window()
+    
+    def show_time_window(self):
+        if self.caminho_logs is None:
+            messagebox.showwarning("Aviso", "Carregue ou abra um arquivo CSV de logs primeiro!")
+            return
+        
+        caminho = self.caminho_logs
+        inicio = self.inicio_var.get().strip() or None
+        fim = self.fim_var.get().strip() or None
+        self.barra.executar("Lendo janela de tempo...",
+                            lambda progresso: self._ler_janela(caminho, inicio, fim, progresso),
+                            lambda lido: self._exibir_janela(lido, inicio, fim),
+                            "Falha ao ler a janela de tempo")
+    
+    def _ler_janela(self, caminho, inicio, fim, progresso):
+        # O índice é construído na primeira consulta e salvo ao lado do arquivo
+        indice = self.indice_tempo
+        if indice is None or indice.caminho != caminho:
+            indice = IndiceTempo.abrir(caminho, progresso=progresso)
+        df = indice.ler(inicio, fim, LIMITE_LINHAS_PADRAO)
+        classificar_logs(df)
+        return indice, df
+    
+    def _exibir_janela(self, lido, inicio, fim):
+        self.indice_tempo, df = lido
+        self.log_tabela.mostrar(df)
+        self.status_var.set(f"✅ {len(df):,} logs na janela {inicio or 'início'} a {fim or 'fim'} "
+                            f"(máximo {LIMITE_LINHAS_PADRAO:,}; arquivo de {self.indice_tempo.inicio} "
+                            f"a {self.indice_tempo.fim})")
     
     def analyze_logs(self):
         if self.df_logs is None:
             messagebox.showwarning("Aviso", "Carregue os logs primeiro!")
             return
         
-        self.status_var.set("Analisando logs...")
-        self.root.update()
+        entrada = self.entrada
+        self.barra.executar("Analisando logs...",
+                            lambda progresso: resumir_erros(entrada, self.cache, progresso),
+                            self._exibir_resultados, "Falha na análise")
+    
+    def _exibir_resultados(self, resultado):
+        self.erros_detectados, self.indice_erros, self.erros_frequentes = resultado
+        self.mascara_erros = self.entrada.mascara_erros
+        self.result_text.delete(1.0, tk.END)
         
-        try:
-            self.erros_detectados = self._detectar_erros()
-            self.result_text.delete(1.0, tk.END)
+        if not self.erros_detectados.empty:
+            # Estatísticas básicas
+            total_erros = self.indice_erros.total
+            percentual = (total_erros / self.indice.total) * 100
             
-            if not self.erros_detectados.empty:
-                # Estatísticas básicas
-                total_erros = len(self.erros_detectados)
-                percentual = (total_erros / len(self.df_logs)) * 100
-                
-                self.result_text.insert(tk.END, "⚠️ RESUMO DE ERROS DETECTADOS ⚠️\n\n")
-                self.result_text.insert(tk.END, f"Total de erros: {total_erros:,}\n")
-                self.result_text.insert(tk.END, f"Percentual sobre total: {percentual:.2f}%\n")
-                self.result_text.insert(tk.END, f"Primeira ocorrência: {self.erros_detectados['timestamp'].min()}\n")
-                self.result_text.insert(tk.END, f"Última ocorrência: {self.erros_detectados['timestamp'].max()}\n\n")
-                
-                # Erros por tipo
-                self.result_text.insert(tk.END, "📊 DISTRIBUIÇÃO DE ERROS POR TIPO:\n\n")
-                padroes = {
-                    'Pagamento': self.erros_detectados['mensagem'].str.contains('pagamento|cartão|bancário', case=False).sum(),
-                    'Timeout': self.erros_detectados['mensagem'].str.contains('timeout', case=False).sum(),
-                    'Valores': self.erros_detectados['mensagem'].str.contains('valor|desconto|total', case=False).sum(),
-                    'Duplicada': self.erros_detectados['mensagem'].str.contains('duplicada', case=False).sum(),
-                    'Conexão': self.erros_detectados['mensagem'].str.contains('conexão|conectar|timeout', case=False).sum()
-                }
-                
-                for tipo, qtd in padroes.items():
-                    if qtd > 0:
-                        self.result_text.insert(tk.END, f"• {tipo}: {qtd} ocorrências\n")
-                
-                # Mostra os primeiros 50 erros para não sobrecarregar
-                self.result_text.insert(tk.END, "\n🔍 PRINCIPAIS ERROS DETECTADOS:\n\n")
-                for _, row in self.erros_detectados.head(50).iterrows():
-                    self.result_text.insert(tk.END, f"[{row['timestamp']}] {row['nivel']}: {row['mensagem']}\n")
-                
-                self.status_var.set(f"⚠️ {total_erros} erros encontrados!")
-            else:
-                self.result_text.insert(tk.END, "✅ Nenhum erro grave detectado.")
-                self.status_var.set("✅ Análise concluída!")
-        except Exception as e:
-            self.status_var.set(f"Erro: {str(e)}")
-            messagebox.showerror("Erro", f"Falha na análise: {str(e)}")
+            self.result_text.insert(tk.END, "⚠️ RESUMO DE ERROS DETECTADOS ⚠️\n\n")
+            self.result_text.insert(tk.END, f"Total de erros: {total_erros:,}\n")
+            self.result_text.insert(tk.END, f"Percentual sobre total: {percentual:.2f}%\n")
+            self.result_text.insert(tk.END, f"Primeira ocorrência: {self.indice_erros.inicio}\n")
+            self.result_text.insert(tk.END, f"Última ocorrência: {self.indice_erros.fim}\n\n")
+            
+            # Erros por tipo
+            self.result_text.insert(tk.END, "📊 DISTRIBUIÇÃO DE ERROS POR TIPO:\n\n")
+            padroes = self.indice_erros.por_categoria()
+            
+            for tipo, qtd in padroes.items():
+                if qtd > 0:
+                    self.result_text.insert(tk.END, f"• {tipo}: {qtd} ocorrências\n")
+            
+            # Todos os erros ficam na tabela abaixo do resumo
+            self.result_tabela.mostrar(self.erros_detectados)
+            self.status_var.set(f"⚠️ {total_erros} erros encontrados!")
+        else:
+            self.result_text.insert(tk.END, "✅ Nenhum erro grave detectado.")
+            self.result_tabela.limpar()
+            self.status_var.set("✅ Análise concluída!")
     
     def show_dashboard(self):
         if self.df_logs is None:
             messagebox.showwarning("Aviso", "Carregue os logs primeiro!")
             return
         
-        self.status_var.set("Gerando dashboard...")
-        self.root.update()
+        from dashboard import Dashboard, preparar_dashboard, versao_dados
         
-        try:
-            # Limpa a aba do dashboard
-            for widget in self.dashboard_tab.winfo_children():
-                widget.destroy()
-            
-            # Cria um frame com scroll para o dashboard
-            dashboard_canvas = tk.Canvas(self.dashboard_tab)
-            scrollbar = ttk.Scrollbar(self.dashboard_tab, orient="vertical", command=dashboard_canvas.yview)
-            scrollable_frame = ttk.Frame(dashboard_canvas)
-            
-            scrollable_frame.bind(
-                "<Configure>",
-                lambda e: dashboard_canvas.configure(
-                    scrollregion=dashboard_canvas.bbox("all")
-                )
-            )
-            
-            dashboard_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-            dashboard_canvas.configure(yscrollcommand=scrollbar.set)
-            
-            scrollbar.pack(side="right", fill="y")
-            dashboard_canvas.pack(side="left", fill="both", expand=True)
-            
-            # Cabeçalho do dashboard
-            header_frame = ttk.Frame(scrollable_frame)
-            header_frame.pack(fill=tk.X, pady=10)
-            
-            ttk.Label(header_frame, 
-                     text="DASHBOARD DE ANÁLISE DE LOGS",
-                     font=('Helvetica', 14, 'bold')).pack()
-            
-            # Estatísticas gerais
-            stats_frame = ttk.LabelFrame(scrollable_frame, text="📊 Estatísticas Gerais")
-            stats_frame.pack(fill=tk.X, padx=10, pady=5)
-            
-            # Calcula estatísticas
-            total_logs = len(self.df_logs)
-            start_date = self.df_logs['timestamp'].min()
-            end_date = self.df_logs['timestamp'].max()
-            error_count = len(self.erros_detectados) if self.erros_detectados is not None else 0
-            error_percent = (error_count / total_logs) * 100 if total_logs > 0 else 0
-            
-            stats_text = (f"• Total de logs: {total_logs:,}\n"
-                         f"• Período analisado: {start_date} até {end_date}\n"
-                         f"• Erros detectados: {error_count:,} ({error_percent:.2f}% do total)\n"
-                         f"• Nível mais frequente: {self.df_logs['nivel'].value_counts().idxmax()}")
-            
-            ttk.Label(stats_frame, text=stats_text, justify=tk.LEFT).pack(anchor=tk.W)
-            
-            # Cria os gráficos em uma grade 2x2
-            fig_frame = ttk.Frame(scrollable_frame)
-            fig_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-            
-            # Gráfico 1: Distribuição de níveis (melhorado)
-            fig1 = Figure(figsize=(6, 4), dpi=100)
-            ax1 = fig1.add_subplot(111)
-            nivel_counts = self.df_logs['nivel'].value_counts()
-            colors = ['#4CAF50' if nivel != 'ERROR' else '#F44336' for nivel in nivel_counts.index]
-            nivel_counts.plot(kind='bar', ax=ax1, color=colors)
-            ax1.set_title('Distribuição de Níveis de Log', pad=10)
-            ax1.set_ylabel('Quantidade')
-            ax1.grid(axis='y', linestyle='--', alpha=0.7)
-            
-            for p in ax1.patches:
-                ax1.annotate(f"{int(p.get_height())}", 
-                            (p.get_x() + p.get_width() / 2., p.get_height()),
-                            ha='center', va='center', xytext=(0, 5), textcoords='offset points')
-            
-            canvas1 = FigureCanvasTkAgg(fig1, master=fig_frame)
-            canvas1.draw()
-            canvas1.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Gráfico 2: Logs por hora (melhorado)
-            fig2 = Figure(figsize=(6, 4), dpi=100)
-            ax2 = fig2.add_subplot(111)
-            
-            self.df_logs['hora'] = self.df_logs['timestamp'].dt.hour
-            hora_counts = self.df_logs['hora'].value_counts().sort_index()
-            
-            sns.lineplot(x=hora_counts.index, y=hora_counts.values, ax=ax2, 
-                        marker='o', color='#2196F3', linewidth=2.5)
-            
-            ax2.set_title('Logs por Hora do Dia', pad=10)
-            ax2.set_xlabel('Hora')
-            ax2.set_ylabel('Quantidade')
-            ax2.grid(axis='both', linestyle='--', alpha=0.7)
-            ax2.set_xticks(range(0, 24))
-            ax2.fill_between(hora_counts.index, hora_counts.values, color='#2196F3', alpha=0.2)
-            
-            canvas2 = FigureCanvasTkAgg(fig2, master=fig_frame)
-            canvas2.draw()
-            canvas2.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Segunda linha de gráficos
-            fig_frame2 = ttk.Frame(scrollable_frame)
-            fig_frame2.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-            
-            # Gráfico 3: Tipos de erros (se houver)
-            fig3 = Figure(figsize=(6, 4), dpi=100)
-            ax3 = fig3.add_subplot(111)
-            
-            if 'ERROR' in self.df_logs['nivel'].values:
-                erros = self.df_logs[self.df_logs['nivel'] == 'ERROR']
-                padroes = {
-                    'Pagamento': erros['mensagem'].str.contains('pagamento|cartão|bancário', case=False).sum(),
-                    'Timeout': erros['mensagem'].str.contains('timeout', case=False).sum(),
-                    'Valores': erros['mensagem'].str.contains('valor|desconto|total', case=False).sum(),
-                    'Duplicada': erros['mensagem'].str.contains('duplicada', case=False).sum(),
-                    'Conexão': erros['mensagem'].str.contains('conexão|conectar', case=False).sum(),
-                    'Outros': len(erros) - sum([
-                        erros['mensagem'].str.contains('pagamento|cartão|bancário', case=False).sum(),
-                        erros['mensagem'].str.contains('timeout', case=False).sum(),
-                        erros['mensagem'].str.contains('valor|desconto|total', case=False).sum(),
-                        erros['mensagem'].str.contains('duplicada', case=False).sum(),
-                        erros['mensagem'].str.contains('conexão|conectar', case=False).sum()
-                    ])
-                }
-                
-                # Remove categorias com zero ocorrências
-                padroes = {k: v for k, v in padroes.items() if v > 0}
-                
-                if padroes:
-                    colors = sns.color_palette("Reds_r", len(padroes))
-                    wedges, texts, autotexts = ax3.pie(
-                        padroes.values(), 
-                        labels=padroes.keys(), 
-                        autopct='%1.1f%%',
-                        startangle=90,
-                        colors=colors,
-                        wedgeprops={'linewidth': 1, 'edgecolor': 'white'},
-                        textprops={'fontsize': 8}
-                    )
-                    
-                    for autotext in autotexts:
-                        autotext.set_color('white')
-                        autotext.set_fontweight('bold')
-                    
-                    ax3.set_title('Distribuição de Tipos de Erros', pad=10)
-                    ax3.axis('equal')
-                else:
-                    ax3.text(0.5, 0.5, 'Nenhum erro categorizado', ha='center', va='center')
-                    ax3.set_title('Distribuição de Tipos de Erros', pad=10)
-            else:
-                ax3.text(0.5, 0.5, 'Nenhum erro encontrado', ha='center', va='center')
-                ax3.set_title('Distribuição de Tipos de Erros', pad=10)
-            
-            canvas3 = FigureCanvasTkAgg(fig3, master=fig_frame2)
-            canvas3.draw()
-            canvas3.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Gráfico 4: Tendência temporal de erros
-            fig4 = Figure(figsize=(6, 4), dpi=100)
-            ax4 = fig4.add_subplot(111)
-            
-            if self.erros_detectados is not None and not self.erros_detectados.empty:
-                erros_por_dia = self.erros_detectados.set_index('timestamp').resample('D').size()
-                
-                sns.lineplot(
-                    x=erros_por_dia.index, 
-                    y=erros_por_dia.values, 
-                    ax=ax4, 
-                    color='#F44336',
-                    linewidth=2.5,
-                    marker='o'
-                )
-                
-                ax4.set_title('Tendência de Erros ao Longo do Tempo', pad=10)
-                ax4.set_xlabel('Data')
-                ax4.set_ylabel('Erros por dia')
-                ax4.grid(axis='both', linestyle='--', alpha=0.7)
-                
-                # Formatação da data
-                ax4.xaxis.set_major_formatter(plt.matplotlib.dates.DateFormatter('%d/%m'))
-                
-                # Adiciona média móvel
-                if len(erros_por_dia) > 7:
-                    media_movel = erros_por_dia.rolling(7).mean()
-                    ax4.plot(media_movel.index, media_movel.values, '--', color='#9C27B0', label='Média 7 dias')
-                    ax4.legend()
-            else:
-                ax4.text(0.5, 0.5, 'Nenhuma anomalia detectada', ha='center', va='center')
-                ax4.set_title('Tendência de Erros ao Longo do Tempo', pad=10)
-            
-            canvas4 = FigureCanvasTkAgg(fig4, master=fig_frame2)
-            canvas4.draw()
-            canvas4.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Seção de erros mais frequentes
-            if self.erros_detectados is not None and not self.erros_detectados.empty:
-                errors_frame = ttk.LabelFrame(scrollable_frame, text="🔍 Erros Mais Frequentes")
-                errors_frame.pack(fill=tk.BOTH, padx=10, pady=10)
-                
-                top_errors = self.erros_detectados['mensagem'].value_counts().head(5)
-                
-                for i, (error_msg, count) in enumerate(top_errors.items(), 1):
-                    error_frame = ttk.Frame(errors_frame)
-                    error_frame.pack(fill=tk.X, padx=5, pady=2)
-                    
-                    ttk.Label(error_frame, text=f"{i}.", width=3).pack(side=tk.LEFT)
-                    ttk.Label(error_frame, text=f"({count}x)").pack(side=tk.LEFT, padx=5)
-                    
-                    msg_label = ttk.Label(error_frame, text=error_msg[:150] + ("..." if len(error_msg) > 150 else ""), 
-                                         wraplength=800, justify=tk.LEFT)
-                    msg_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            
-            self.status_var.set("✅ Dashboard gerado!")
-        except Exception as e:
-            self.status_var.set(f"Erro: {str(e)}")
-            messagebox.showerror("Erro", f"Falha ao gerar dashboard: {str(e)}")
-            raise e
+        # As figuras são criadas uma vez; depois só os dados delas mudam
+        if self.dashboard is None:
+            self.dashboard = Dashboard(self.dashboard_tab)
+        
+        versao = versao_dados(self.indice, self.indice_erros)
+        if self.dashboard.atualizado(versao):
+            self.status_var.set("✅ Dashboard já está atualizado")
+            return
+        dados = self.dashboard.em_cache(versao)
+        if dados is not None:
+            self._exibir_dashboard(dados)
+            return
+        
+        # Roda na thread de trabalho: só consulta os índices (sem Matplotlib);
+        # as figuras são atualizadas na thread do Tk
+        indice, indice_erros, erros_frequentes = self.indice, self.indice_erros, self.erros_frequentes
+        pontos = self.dashboard.pontos
+        self.barra.executar("Gerando dashboard...",
+                            lambda progresso: preparar_dashboard(indice, indice_erros, erros_frequentes,
+                                                                 pontos, progresso),
+                            self._exibir_dashboard, "Falha ao gerar dashboard")
+    
+    def _exibir_dashboard(self, dados):
+        self.dashboard.atualizar(dados)
+        self.status_var.set("✅ Dashboard gerado!")
     
     def export_report(self):
         if self.df_logs is None:
@@ -370,72 +289,308 @@ class AnalisadorLogs:
         
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=[("Text files", "*.txt"), ("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"),
+                       ("Compressed files", "*.gz *.zst"), ("All files", "*.*")],
             title="Salvar relatório de análise"
         )
         
-        if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write("RELATÓRIO DE ANÁLISE DE LOGS\n")
-                    f.write("="*40 + "\n\n")
-                    
-                    # Informações gerais
-                    f.write(f"Data da análise: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
-                    f.write(f"Total de logs analisados: {len(self.df_logs):,}\n")
-                    f.write(f"Período coberto: {self.df_logs['timestamp'].min()} a {self.df_logs['timestamp'].max()}\n\n")
-                    
-                    # Erros detectados
-                    if self.erros_detectados is not None and not self.erros_detectados.empty:
-                        f.write(f"ERROS DETECTADOS: {len(self.erros_detectados):,}\n")
-                        f.write("="*40 + "\n\n")
-                        
-                        for _, row in self.erros_detectados.iterrows():
-                            f.write(f"[{row['timestamp']}] {row['nivel']}: {row['mensagem']}\n")
-                    else:
-                        f.write("NENHUM ERRO GRAVE DETECTADO\n")
-                
-                self.status_var.set(f"✅ Relatório salvo em: {file_path}")
-                messagebox.showinfo("Sucesso", "Relatório exportado com sucesso!")
-            except Exception as e:
-                self.status_var.set(f"Erro: {str(e)}")
-                messagebox.showerror("Erro", f"Falha ao exportar relatório: {str(e)}")
-    
-    def _detectar_erros(self):
-        # Detecção por regras
-        padrao = r"\berro\b|\bfalha\b|\btimeout\b|\bduplicada\b|\binválido\b|\bdiscrepância\b|\bexception\b"
-        por_regras = self.df_logs[self.df_logs['mensagem'].str.contains(padrao, flags=re.IGNORECASE, regex=True)]
+        if not file_path:
+            return
         
-        # Detecção por IA (One-Class SVM)
-        df_erros = self.df_logs[self.df_logs['nivel'] == 'ERROR'].copy()
-        if not df_erros.empty:
-            vectorizer = TfidfVectorizer(max_features=1000)
-            X = vectorizer.fit_transform(df_erros['mensagem']).toarray()
-            
-            modelo = OneClassSVM(gamma='auto', nu=0.1)
-            df_erros['anomalia'] = modelo.fit_predict(X)
-            por_ia = df_erros[df_erros['anomalia'] == -1]
-        else:
-            por_ia = pd.DataFrame()
+        if formato_do_caminho(file_path)[0] == 'texto':
+            self.barra.executar("Exportando relatório...",
+                                lambda progresso: gravar_relatorio(file_path, self.indice, self.erros_detectados,
+                                                                   self.indice_erros, progresso),
+                                lambda _: self._relatorio_exportado(file_path),
+                                "Falha ao exportar relatório")
+            return
         
-        # Combina resultados e remove duplicatas
-        erros_combinados = pd.concat([por_regras, por_ia]).drop_duplicates()
+        if self.mascara_erros is None:
+            messagebox.showwarning("Aviso", "Analise os logs antes de exportar os erros!")
+            return
         
-        # Adiciona severidade baseada em regras
-        def calcular_severidade(mensagem):
-            if re.search(r"\bcritico\b|\bfatal\b", mensagem, re.IGNORECASE):
-                return "Alta"
-            elif re.search(r"\berro\b|\bfalha\b", mensagem, re.IGNORECASE):
-                return "Média"
+        # CSV e JSON Lines: os erros saem direto dos logs carregados, bloco a bloco
+        self.barra.executar("Exportando erros...",
+                            lambda progresso: exportar_erros(file_path,
+                                                             blocos_filtrados(self.df_logs, self.mascara_erros),
+                                                             self.indice_erros.total, progresso),
+                            lambda _: self._relatorio_exportado(file_path),
+                            "Falha ao exportar erros")
+    
+    def _relatorio_exportado(self, file_path):
+        self.status_var.set(f"✅ Relatório salvo em: {file_path}")
+        messagebox.showinfo("Sucesso", "Relatório exportado com sucesso!")
+
+
+class _ProgressoTerminal:
+    # Mesma interface do Progresso das tarefas da interface, escrevendo no stderr
+    def informar(self, fracao, mensagem=None):
+        if mensagem:
+            print(f"[{fracao:>4.0%}] {mensagem}", file=sys.stderr)
+
+
+def carregar_lotes(lotes, progresso=None, duplicadas=None):
+    # Classifica e indexa cada bloco assim que é lido. Severidade e categoria
+    # são calculadas uma vez e reaproveitadas nas abas e na análise; transações
+    # repetidas na janela (duplicadas) entram nas detecções por regras.
+    progresso = progresso or _ProgressoTerminal()
+    templates = DicionarioTemplates()
+    if duplicadas is None:
+        duplicadas = JanelaTransacoes()
+    indice = IndiceAgregado()
+    chunks = []
+    mascaras = []
+
+    for chunk, fracao in lotes:
+        mascaras.append(classificar_logs(chunk, templates) | marcar_duplicadas(chunk, duplicadas))
+        indice.atualizar(chunk)
+        chunks.append(chunk)
+        progresso.informar(fracao, f"Carregando logs... {indice.total:,} linhas")
+
+    if not chunks:
+        raise ValueError("Nenhum log encontrado")
+
+    progresso.informar(1.0, "Combinando blocos...")
+    return concatenar_chunks(chunks), np.concatenate(mascaras), indice
+
+
+def detectar_erros(df_logs, mascara_regras, progresso=None, detector=DETECTOR_PADRAO,
+                   caminho_modelo=CAMINHO_MODELO_PADRAO):
+    # Máscara das linhas detectadas por regras (classificação feita no
+    # carregamento) ou pelo modelo; as linhas não são copiadas aqui
+    progresso = progresso or _ProgressoTerminal()
+
+    # Detecção por IA: modelo salvo em disco, só pontua os logs de erro
+    if (df_logs['nivel'] == 'ERROR').any():
+        from modelo_anomalias import carregar_ou_treinar
+
+        progresso.informar(0.1, "Carregando modelo de anomalias...")
+        modelo = carregar_ou_treinar(df_logs, caminho_modelo, detector=detector)
+        progresso.informar(0.5, "Pontuando logs de erro...")
+        por_ia = modelo.pontuar_logs(df_logs)
+    else:
+        por_ia = np.zeros(len(df_logs), dtype=bool)
+
+    # Combina resultados: linhas encontradas pelos dois métodos aparecem uma vez
+    progresso.informar(0.8, "Combinando detecções...")
+    return mascara_regras | por_ia
+
+
+def carregar_csv(caminho, quarentena=None, cache=None, progresso=None, detector=DETECTOR_PADRAO):
+    # Logs do CSV classificados e indexados, como EntradaCache. Com cache, o
+    # mesmo conteúdo não é lido de novo (nem as detecções refeitas), e se o
+    # arquivo só cresceu desde a última análise, só o final é analisado.
+    progresso = progresso or _ProgressoTerminal()
+    if cache is None:
+        return EntradaCache(None, *carregar_lotes(_lotes_csv(caminho, quarentena), progresso))
+
+    assinatura = Assinatura.do_arquivo(caminho, detector)
+    entrada = cache.buscar(assinatura)
+    if entrada is not None:
+        progresso.informar(1.0, "Resultado reaproveitado do cache")
+        entrada.caminho = caminho
+        return entrada
+
+    base = cache.buscar_prefixo(caminho, assinatura)
+    if base is None:
+        # Lê só até o tamanho da assinatura, mesmo que o arquivo cresça durante a leitura
+        df_logs, mascara_regras, indice = carregar_lotes(_lotes_csv(caminho, quarentena, fim=assinatura.tamanho),
+                                                         progresso)
+        entrada = EntradaCache(assinatura, df_logs, mascara_regras, indice, caminho=caminho)
+    else:
+        entrada = _estender(caminho, base, assinatura, quarentena, progresso, cache.caminho_modelo)
+
+    progresso.informar(1.0, "Gravando cache...")
+    cache.gravar(entrada)
+    if base is not None:
+        cache.remover(base.assinatura)
+    return entrada
+
+
+def _estender(caminho, base, assinatura, quarentena, progresso, caminho_modelo):
+    # Analisa só os bytes acrescentados depois da entrada base e junta os resultados
+    lotes = _lotes_csv(caminho, quarentena, base.assinatura.tamanho, assinatura.tamanho, ler_cabecalho(caminho))
+    duplicadas = JanelaTransacoes()
+    if COLUNA_TRANSACAO in base.df_logs.columns:
+        # As transações do fim do conteúdo anterior contam para as duplicadas do trecho novo
+        timestamps = base.df_logs['timestamp']
+        recentes = timestamps >= timestamps.max() - pd.Timedelta(seconds=duplicadas.janela)
+        colunas = ['timestamp'] + [coluna for coluna in (COLUNA_ITEM, COLUNA_TRANSACAO) if coluna in base.df_logs]
+        marcar_duplicadas(base.df_logs.loc[recentes, colunas], duplicadas)
+    try:
+        df, mascara_regras, indice = carregar_lotes(lotes, progresso, duplicadas)
+    except ValueError:
+        # Nenhuma linha válida no final acrescentado
+        return EntradaCache(assinatura, base.df_logs, base.mascara_regras, base.indice, base.mascara_erros,
+                            base.indice_erros, caminho=caminho, modelo=base.modelo)
+
+    progresso.informar(1.0, "Combinando com o resultado em cache...")
+    mascara_erros = indice_erros = None
+    if base.mascara_erros is not None and base.indice_erros is not None:
+        novos_erros = detectar_erros(df, mascara_regras, progresso, assinatura.detector, caminho_modelo)
+        # Se o modelo foi retreinado agora, as detecções antigas não combinam com
+        # as novas e a detecção é refeita no arquivo inteiro
+        if identidade_modelo(caminho_modelo) == base.modelo:
+            mascara_erros = np.concatenate([base.mascara_erros, novos_erros])
+            indice_erros = base.indice_erros.combinar(IndiceAgregado().atualizar(df[novos_erros]))
+    return EntradaCache(assinatura, concatenar_chunks([base.df_logs, df]),
+                        np.concatenate([base.mascara_regras, mascara_regras]), base.indice.combinar(indice),
+                        mascara_erros, indice_erros, caminho=caminho,
+                        modelo=base.modelo if mascara_erros is not None else None)
+
+
+def resumir_erros(entrada, cache=None, progresso=None):
+    # Erros detectados, seu índice de agregados e as 5 mensagens mais frequentes.
+    # A detecção só roda se a entrada ainda não a tem; o resultado vai para o cache.
+    progresso = progresso or _ProgressoTerminal()
+    if entrada.mascara_erros is None or entrada.indice_erros is None:
+        detector = entrada.assinatura.detector if entrada.assinatura is not None else DETECTOR_PADRAO
+        caminho_modelo = cache.caminho_modelo if cache is not None else CAMINHO_MODELO_PADRAO
+        entrada.mascara_erros = detectar_erros(entrada.df_logs, entrada.mascara_regras, progresso, detector,
+                                               caminho_modelo)
+        entrada.modelo = identidade_modelo(caminho_modelo)
+        progresso.informar(0.9, "Indexando erros detectados...")
+        entrada.indice_erros = IndiceAgregado().atualizar(entrada.df_logs[entrada.mascara_erros])
+        if cache is not None and entrada.assinatura is not None:
+            progresso.informar(0.95, "Gravando cache...")
+            cache.gravar(entrada)
+
+    erros_detectados = entrada.df_logs[entrada.mascara_erros]
+    top_errors = erros_detectados['mensagem'].value_counts()
+    return erros_detectados, entrada.indice_erros, top_errors[top_errors > 0].head(5)
+
+
+def _lotes_csv(caminho, quarentena=None, inicio=0, fim=None, nomes=None):
+    # Blocos do CSV (ou só dos bytes de inicio a fim, com os nomes das colunas
+    # informados) com a fração do intervalo já lida
+    codificacao = detectar_codificacao(caminho)
+    cabecalho = nomes or ler_cabecalho(caminho, codificacao)
+    if quarentena is not None and inicio == 0:
+        quarentena.limpar()
+    with pa.memory_map(caminho) as mapa:
+        fim = mapa.size() if fim is None else fim
+        mapa.seek(inicio)
+        origem = pa.BufferReader(mapa.read_buffer(fim - inicio))
+    tamanho = max(fim - inicio, 1)
+    # Mensagens e níveis se repetem: lidos como categorias (dicionário de templates)
+    chunks = ler_logs_csv(origem, TAMANHO_CHUNK_PADRAO, quarentena, nomes=nomes, codificacao=codificacao,
+                          cabecalho=cabecalho)
+    for chunk in medir_iteracao('carregamento', chunks):
+        yield chunk, min(origem.tell() / tamanho, 1.0)
+
+
+def _lotes_armazenamento(diretorio):
+    from armazenamento import abrir, ler_lotes
+
+    total = max(abrir(diretorio).count_rows(), 1)
+    lidos = 0
+    for lote in medir_iteracao('carregamento', ler_lotes(diretorio)):
+        lidos += len(lote)
+        yield lote, lidos / total
+
+
+def _analisar_em_blocos(caminho, relatorio=None):
+    # Mesmas detecções da interface (regras, duplicadas e modelo salvo), lendo em
+    # blocos: só os agregados ficam em memória, e os erros de cada bloco vão
+    # direto para o relatório. Sem modelo salvo (ou vencido), o treino é uma
+    # primeira leitura em blocos. Retorna o resultado e as mensagens mais frequentes.
+    from modelo_anomalias import carregar_ou_treinar_chunks
+
+    motor = MotorAnalise(guardar_erros=False)
+    if os.path.isdir(caminho):
+        from armazenamento import ler_lotes
+
+        lotes = ler_lotes(caminho)
+    else:
+        lotes = motor.ler_chunks(caminho)
+    motor.modelo = carregar_ou_treinar_chunks(preprocessar(lote) for lote in lotes)
+
+    # O relatório em texto começa pelos totais: as linhas dos erros são gravadas
+    # num arquivo temporário e copiadas depois do cabeçalho
+    texto = relatorio is not None and formato_do_caminho(relatorio)[0] == 'texto'
+    linhas_erros = None
+    if texto:
+        descritor, linhas_erros = tempfile.mkstemp(suffix='.txt', dir=os.path.dirname(os.path.abspath(relatorio)))
+        os.close(descritor)
+    exportador = None
+    if relatorio is not None:
+        exportador = ExportadorErros(linhas_erros, formato='texto') if texto else ExportadorErros(relatorio)
+    frequentes = Counter()
+
+    def ao_detectar(erros):
+        frequentes.update(erros['mensagem'].value_counts().to_dict())
+        if exportador is not None:
+            exportador.escrever(erros)
+
+    try:
+        if os.path.isdir(caminho):
+            resultado = motor.analisar_armazenamento(caminho, ao_detectar=ao_detectar)
+        else:
+            resultado = motor.analisar_arquivo(caminho, ao_detectar=ao_detectar)
+        if exportador is not None:
+            exportador.fechar()
+        if texto:
+            gravar_relatorio(relatorio, resultado.indice, indice_erros=resultado.indice_erros,
+                             arquivo_erros=linhas_erros)
+    finally:
+        if exportador is not None:
+            exportador.fechar()
+        if linhas_erros is not None:
+            os.remove(linhas_erros)
+    return resultado, {mensagem: qtd for mensagem, qtd in frequentes.most_common(5) if qtd > 0}
+
+
+def analisar_sem_interface(args):
+    # Mesma análise da interface, sem Tk: detecta e grava o relatório. Com --cache
+    # o arquivo inteiro é carregado, como na interface, para ler e gravar o cache.
+    if args.cache and not os.path.isdir(args.logs):
+        cache = CacheResultados()
+        quarentena = Quarentena(caminho_quarentena(args.logs))
+        entrada = carregar_csv(args.logs, quarentena, cache)
+        erros_detectados, indice_erros, erros_frequentes = resumir_erros(entrada, cache)
+        indice, rejeitadas, caminho_rejeitadas = entrada.indice, quarentena.total, quarentena.caminho
+        if args.relatorio:
+            if formato_do_caminho(args.relatorio)[0] == 'texto':
+                gravar_relatorio(args.relatorio, indice, erros_detectados, indice_erros)
             else:
-                return "Baixa"
-        
-        if not erros_combinados.empty:
-            erros_combinados['severidade'] = erros_combinados['mensagem'].apply(calcular_severidade)
-        
-        return erros_combinados
+                exportar_erros(args.relatorio, blocos_filtrados(entrada.df_logs, entrada.mascara_erros))
+    else:
+        resultado, erros_frequentes = _analisar_em_blocos(args.logs, args.relatorio)
+        indice, indice_erros, rejeitadas = resultado.indice, resultado.indice_erros, resultado.linhas_rejeitadas
+        caminho_rejeitadas = None if os.path.isdir(args.logs) else caminho_quarentena(args.logs)
 
-if __name__ == "__main__":
+    print(f"Logs analisados: {indice.total:,}")
+    if rejeitadas:
+        print(f"Linhas malformadas: {rejeitadas:,} (em {caminho_rejeitadas})")
+    print(f"Erros detectados: {indice_erros.total:,}")
+    for tipo, qtd in indice_erros.por_categoria().items():
+        if qtd > 0:
+            print(f"• {tipo}: {qtd} ocorrências")
+    for mensagem, qtd in erros_frequentes.items():
+        print(f"({qtd}x) {mensagem}")
+    if args.relatorio:
+        print(f"Relatório salvo em: {args.relatorio}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisador de logs: sem argumentos abre a interface gráfica")
+    parser.add_argument('logs', nargs='?', help="CSV ou diretório Parquet de logs a analisar sem interface")
+    parser.add_argument('--relatorio', help="Relatório (.txt) ou exportação dos erros (.csv, .jsonl, .gz, .zst)")
+    parser.add_argument('--cache', action='store_true',
+                        help="Carrega o CSV inteiro, como a interface, reaproveitando e gravando o cache de "
+                             "resultados (sem --cache a análise é feita em blocos, com memória limitada)")
+    args = parser.parse_args(argv)
+
+    if args.logs:
+        return analisar_sem_interface(args)
+    if tk is None:
+        parser.error("Tk não está disponível; informe um arquivo de logs para analisar sem interface")
     root = tk.Tk()
-    app = AnalisadorLogs(root)
-    root.mainloop()
\ No newline at end of file
+    AnalisadorLogs(root)
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import glob
+import hashlib
+import os
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from ingestao import Quarentena, caminho_quarentena, fim_exclusivo
+from motor_analise import COLUNAS_ID_LOG, COLUNAS_LOG, TAMANHO_CHUNK_PADRAO, ler_logs_csv
+
+# Armazenamento colunar (Parquet) particionado por dia. O timestamp fica como
+# datetime nativo e nível/mensagem como colunas de dicionário (categóricas),
+# então nada precisa ser reinterpretado a cada carregamento. Os IDs (visitante,
+# item, transação) só são gravados quando o CSV de origem os tem; na leitura,
+# partes sem eles ficam com nulos.
+ESQUEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('nivel', pa.dictionary(pa.int32(), pa.string())),
+    ('mensagem', pa.dictionary(pa.int32(), pa.string())),
+    ('visitorid', pa.int64()),
+    ('itemid', pa.int64()),
+    ('transactionid', pa.int64()),
+    ('dia', pa.date32()),
+])
+PARTICIONAMENTO = ds.partitioning(pa.schema([('dia', pa.date32())]), flavor='hive')
+
+
+def importar_csv(caminho_csv, diretorio, tamanho_chunk=TAMANHO_CHUNK_PADRAO, quarentena=None):
+    # Converte o CSV uma única vez, em blocos. Os arquivos gerados levam um prefixo
+    # próprio do CSV de origem (nome + hash do caminho absoluto) e reimportar o
+    # mesmo arquivo apaga antes as partes antigas dele, mesmo que agora gere menos
+    # blocos. Linhas malformadas vão para a quarentena (padrão: <csv>.rejeitadas.csv).
+    prefixo = prefixo_partes(caminho_csv)
+    if quarentena is None:
+        quarentena = Quarentena(caminho_quarentena(caminho_csv))
+        quarentena.limpar()
+    remover_partes(diretorio, prefixo)
+    total = 0
+    chunks = ler_logs_csv(caminho_csv, tamanho_chunk, quarentena)
+    for i, chunk in enumerate(chunks):
+        chunk['dia'] = chunk['timestamp'].dt.date
+        tabela = pa.Table.from_pandas(chunk, schema=_esquema(chunk.columns), preserve_index=False)
+        ds.write_dataset(tabela, diretorio, format='parquet', partitioning=PARTICIONAMENTO,
+                         basename_template=f"{prefixo}-{i}-{{i}}.parquet",
+                         existing_data_behavior='overwrite_or_ignore')
+        total += len(chunk)
+    return total
+
+
+def prefixo_partes(caminho_csv):
+    # CSVs com o mesmo nome em diretórios diferentes não compartilham partes
+    nome_base = re.sub(r'\W+', '_', os.path.splitext(os.path.basename(caminho_csv))[0])
+    origem = hashlib.sha1(os.path.abspath(caminho_csv).encode('utf-8')).hexdigest()[:12]
+    return f"{nome_base}_{origem}"
+
+
+def remover_partes(diretorio, prefixo):
+    # Apaga as partes de uma origem em todas as partições; partições vazias saem junto
+    for parte in glob.glob(os.path.join(glob.escape(diretorio), '*', f"{glob.escape(prefixo)}-*.parquet")):
+        os.remove(parte)
+        particao = os.path.dirname(parte)
+        if not os.listdir(particao):
+            os.rmdir(particao)
+
+
+def _filtro(inicio=None, fim=None, niveis=None):
+    # Monta a expressão aplicada pelo leitor: as condições sobre 'dia' descartam
+    # partições inteiras e as demais são avaliadas durante a leitura. Um fim só
+    # com a data inclui o dia inteiro (ver fim_exclusivo).
+    condicoes = []
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        condicoes.append(ds.field('dia') >= pa.scalar(inicio.date(), type=pa.date32()))
+        condicoes.append(ds.field('timestamp') >= pa.scalar(inicio.to_pydatetime(), type=pa.timestamp('us')))
+    if fim is not None:
+        fim = fim_exclusivo(fim)
+        ultimo_dia = (fim - pd.Timedelta(microseconds=1)).date()
+        condicoes.append(ds.field('dia') <= pa.scalar(ultimo_dia, type=pa.date32()))
+        condicoes.append(ds.field('timestamp') < pa.scalar(fim.to_pydatetime(), type=pa.timestamp('us')))
+    if niveis:
+        condicoes.append(ds.field('nivel').isin(list(niveis)))
+
+    filtro = None
+    for condicao in condicoes:
+        filtro = condicao if filtro is None else filtro & condicao
+    return filtro
+
+
+def _esquema(colunas):
+    # ESQUEMA só com as colunas de IDs presentes
+    return pa.schema([campo for campo in ESQUEMA if campo.name not in COLUNAS_ID_LOG or campo.name in colunas])
+
+
+def abrir(diretorio):
+    # O esquema junta as colunas de todas as partes: importações com e sem IDs
+    # podem dividir o mesmo armazenamento
+    dataset = ds.dataset(diretorio, format='parquet', partitioning=PARTICIONAMENTO)
+    colunas = {nome for fragmento in dataset.get_fragments() for nome in fragmento.physical_schema.names}
+    return ds.dataset(diretorio, schema=_esquema(colunas), format='parquet', partitioning=PARTICIONAMENTO)
+
+
+def _colunas(dataset, colunas):
+    # Padrão: colunas do log e os IDs que o armazenamento tiver
+    return colunas or COLUNAS_LOG + [coluna for coluna in COLUNAS_ID_LOG if coluna in dataset.schema.names]
+
+
+def carregar_logs(diretorio, colunas=None, inicio=None, fim=None, niveis=None):
+    # Lê só as colunas e o intervalo de datas pedidos, ex.: niveis=['ERROR']
+    dataset = abrir(diretorio)
+    tabela = dataset.to_table(columns=_colunas(dataset, colunas), filter=_filtro(inicio, fim, niveis))
+    return tabela.to_pandas()
+
+
+def ler_lotes(diretorio, colunas=None, inicio=None, fim=None, niveis=None, tamanho_lote=TAMANHO_CHUNK_PADRAO):
+    # Igual a carregar_logs, mas em lotes de tamanho fixo para análises com memória limitada
+    dataset = abrir(diretorio)
+    lotes = dataset.to_batches(columns=_colunas(dataset, colunas), filter=_filtro(inicio, fim, niveis),
+                               batch_size=tamanho_lote)
+    for lote in lotes:
+        if lote.num_rows:
+            yield lote.to_pandas()
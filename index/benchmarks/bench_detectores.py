@@ -0,0 +1,116 @@
+import argparse
+import importlib
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados_sinteticos import gerar_logs_sinteticos  # noqa: E402
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000, 10_000_000]
+# O SVM original usa matriz densa e kernel RBF: acima disso leva horas ou esgota a memória
+LIMITE_SVM_ORIGINAL = 50_000
+DEPENDENCIAS = ['modelo_anomalias', 'scipy.sparse', 'sklearn.ensemble', 'sklearn.feature_extraction.text',
+                'sklearn.linear_model', 'sklearn.svm']
+
+
+def _pico_memoria_mb():
+    # ru_maxrss vem em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _svm_original(df):
+    # Reproduz o _detectar_erros anterior: TF-IDF denso + OneClassSVM refeito a cada execução
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.svm import OneClassSVM
+
+    df_erros = df[df['nivel'] == 'ERROR']
+    inicio = time.perf_counter()
+    X = TfidfVectorizer(max_features=1000).fit_transform(df_erros['mensagem'].astype(str)).toarray()
+    modelo = OneClassSVM(gamma='auto', nu=0.1).fit(X)
+    treino = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    modelo.predict(X)
+    return treino, time.perf_counter() - inicio
+
+
+def _detector(nome, df):
+    from modelo_anomalias import criar_detector
+
+    detector = criar_detector(nome)
+    inicio = time.perf_counter()
+    detector.treinar_chunks([df])
+    treino = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    detector.pontuar_logs(df)
+    return treino, time.perf_counter() - inicio
+
+
+def _importar_dependencias():
+    # Bibliotecas dos detectores carregadas antes da medição, para que a memória
+    # extra seja só dos dados e do modelo, e não o custo de importação repetido
+    # em todos os casos
+    for modulo in DEPENDENCIAS:
+        importlib.import_module(modulo)
+
+
+def medir(nome, linhas, seed):
+    # Roda em um processo novo para que o pico de memória seja só deste caso
+    _importar_dependencias()
+    df = gerar_logs_sinteticos(linhas, seed=seed)
+    memoria_base = _pico_memoria_mb()
+    if nome == 'svm-original':
+        treino, pontuacao = _svm_original(df)
+    else:
+        treino, pontuacao = _detector(nome, df)
+    return {
+        'detector': nome,
+        'linhas': linhas,
+        'treino_s': round(treino, 4),
+        'pontuacao_s': round(pontuacao, 4),
+        'linhas_por_s': round(linhas / pontuacao) if pontuacao > 0 else None,
+        'memoria_extra_mb': round(_pico_memoria_mb() - memoria_base, 1),
+    }
+
+
+def main(argv=None):
+    from modelo_anomalias import DETECTORES
+
+    parser = argparse.ArgumentParser(description="Compara tempo e memória dos detectores de anomalias")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--detectores', nargs='+', default=['svm-original'] + sorted(DETECTORES))
+    parser.add_argument('--limite-svm', type=int, default=LIMITE_SVM_ORIGINAL,
+                        help="Maior quantidade de linhas testada nos detectores baseados em SVM com kernel")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Arquivo para gravar os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    contexto = get_context('spawn')
+    for linhas in args.tamanhos:
+        for nome in args.detectores:
+            if nome in ('svm-original', 'svm') and linhas > args.limite_svm:
+                resultados.append({'detector': nome, 'linhas': linhas, 'pulado': True})
+                print(f"{nome:>14} {linhas:>12,}  pulado (acima de --limite-svm)")
+                continue
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                resultado = executor.submit(medir, nome, linhas, args.seed).result()
+            resultados.append(resultado)
+            print(f"{nome:>14} {linhas:>12,}  treino {resultado['treino_s']:>9.3f}s  "
+                  f"pontuação {resultado['pontuacao_s']:>9.3f}s  memória +{resultado['memoria_extra_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metricas import METRICAS, memoria_mb  # noqa: E402
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000, 10_000_000, 100_000_000]
+INTERVALO_AMOSTRAGEM = 0.005
+INICIO_PADRAO = '2015-06-01'
+DIAS_PADRAO = 30
+# Partes internas medidas pela própria análise (metricas.medir) que aparecem
+# separadas dentro de cada etapa
+SUBETAPAS = ['regras', 'vetorizacao', 'treino', 'predicao']
+
+
+class _Etapas:
+    # Mede tempo de parede e pico de memória de cada etapa; uma thread amostra a
+    # memória residente enquanto a etapa roda. O tempo de regras, vetorização,
+    # treino e predição dentro da etapa vem das métricas da própria análise.
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.resultados = []
+
+    def medir(self, nome, funcao, *args, **kwargs):
+        base = memoria_mb()
+        pico = [base]
+        parar = threading.Event()
+
+        def amostrar():
+            while not parar.wait(INTERVALO_AMOSTRAGEM):
+                pico[0] = max(pico[0], memoria_mb())
+
+        amostrador = threading.Thread(target=amostrar, daemon=True)
+        amostrador.start()
+        METRICAS.limpar()
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao(*args, **kwargs)
+        finally:
+            segundos = time.perf_counter() - inicio
+            parar.set()
+            amostrador.join()
+        pico[0] = max(pico[0], memoria_mb())
+        resumo = METRICAS.resumo()
+
+        self.resultados.append({
+            'etapa': nome,
+            'segundos': round(segundos, 4),
+            'linhas_por_s': round(self.linhas / segundos) if segundos > 0 else None,
+            'memoria_pico_mb': round(pico[0], 1),
+            'memoria_extra_mb': round(pico[0] - base, 1),
+            'subetapas': {etapa: {'segundos': round(resumo[etapa]['segundos'], 4),
+                                  'execucoes': resumo[etapa]['execucoes'], 'linhas': resumo[etapa]['linhas']}
+                          for etapa in SUBETAPAS if etapa in resumo},
+        })
+        return resultado
+
+
+def _garantir_csv(diretorio, linhas, seed):
+    from simulador import gerar_blocos, gravar_csv
+    import pandas as pd
+
+    caminho = os.path.join(diretorio, f"logs_{linhas}_{seed}.csv")
+    if not os.path.exists(caminho):
+        inicio = pd.Timestamp(INICIO_PADRAO)
+        temporario = caminho + '.tmp'
+        gravar_csv(temporario, gerar_blocos(linhas, inicio, inicio + pd.Timedelta(days=DIAS_PADRAO), seed=seed))
+        os.replace(temporario, caminho)
+    return caminho
+
+
+class _SemProgresso:
+    def informar(self, fracao, mensagem=None):
+        pass
+
+
+def _ler(caminho):
+    # Só a leitura do CSV (o leitor já converte os timestamps), sem classificar
+    from motor_analise import ler_logs_csv
+
+    return sum(len(chunk) for chunk in ler_logs_csv(caminho))
+
+
+def _dashboard(indice, indice_erros, erros_frequentes):
+    # Dados dos gráficos como a interface prepara, sem desenhar as figuras
+    from dashboard import preparar_dashboard
+
+    return preparar_dashboard(indice, indice_erros, erros_frequentes)
+
+
+def medir(linhas, detector, diretorio, seed):
+    # Roda em um processo novo para que a memória medida seja só deste tamanho.
+    # Cada etapa chama as mesmas funções públicas da análise sem interface.
+    from agregados import IndiceAgregado
+    from analisador_logs import carregar_csv, detectar_erros
+    from modelo_anomalias import ModeloAnomalias
+    from motor_analise import MotorAnalise
+    from relatorio import gravar_relatorio
+
+    caminho = _garantir_csv(diretorio, linhas, seed)
+    etapas = _Etapas(linhas)
+    progresso = _SemProgresso()
+
+    try:
+        # Dashboard importa Tk e Matplotlib: importados fora da medição
+        import dashboard
+    except ImportError:
+        dashboard = None
+
+    with tempfile.TemporaryDirectory() as temporario:
+        caminho_modelo = os.path.join(temporario, 'modelo.joblib')
+
+        # Carregamento: leitura do CSV e, em carregar_csv, também classificação,
+        # duplicadas e índice de agregados, bloco a bloco
+        etapas.medir('leitura_csv', _ler, caminho)
+        entrada = etapas.medir('carregamento', carregar_csv, caminho, progresso=progresso)
+        df, indice = entrada.df_logs, entrada.indice
+
+        # detectar_erros sem modelo salvo treina e grava; com o modelo salvo só pontua
+        etapas.medir('treino', detectar_erros, df, entrada.mascara_regras, progresso, detector, caminho_modelo)
+        mascara = etapas.medir('deteccao', detectar_erros, df, entrada.mascara_regras, progresso, detector,
+                               caminho_modelo)
+        erros = df[mascara]
+        indice_erros = etapas.medir('indice_erros', IndiceAgregado().atualizar, erros)
+        erros_frequentes = erros['mensagem'].value_counts().head(5)
+
+        if dashboard is not None:
+            etapas.medir('dashboard', _dashboard, indice, indice_erros, erros_frequentes)
+        etapas.medir('relatorio', gravar_relatorio, os.path.join(temporario, 'relatorio.txt'),
+                     indice, erros, indice_erros)
+
+        # Análise em blocos da linha de comando (cli.py analisar --modelo)
+        modelo = ModeloAnomalias.carregar(caminho_modelo)
+        motor = MotorAnalise(guardar_erros=False, modelo=modelo)
+        etapas.medir('motor', motor.analisar_arquivo, caminho)
+
+    return {'linhas': linhas, 'erros_detectados': len(erros), 'amostras_modelo': modelo.amostras_vistas,
+            'etapas': etapas.resultados}
+
+
+def _ambiente():
+    import numpy as np
+    import pandas as pd
+    import sklearn
+
+    try:
+        versao = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        versao = None
+    return {
+        'versao': versao,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processadores': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def _tempos(resultado):
+    # (etapa, segundos) de cada etapa e de cada subetapa ("etapa/subetapa")
+    for etapa in resultado.get('etapas', []):
+        yield etapa['etapa'], etapa['segundos']
+        for nome, subetapa in etapa.get('subetapas', {}).items():
+            yield f"{etapa['etapa']}/{nome}", subetapa['segundos']
+
+
+def _comparar(anterior, resultados):
+    # Razão entre o tempo atual e o do arquivo anterior, por tamanho e etapa
+    tempos = {(r['linhas'], etapa): segundos for r in anterior['resultados'] for etapa, segundos in _tempos(r)}
+    for resultado in resultados:
+        for etapa, segundos in _tempos(resultado):
+            antes = tempos.get((resultado['linhas'], etapa))
+            if antes:
+                print(f"{etapa:>22} {resultado['linhas']:>12,}  {antes:>9.3f}s -> "
+                      f"{segundos:>9.3f}s  ({segundos / antes:.2f}x)")
+
+
+def main(argv=None):
+    from modelo_anomalias import DETECTOR_PADRAO, DETECTORES
+
+    parser = argparse.ArgumentParser(description="Mede tempo e memória de cada etapa da análise de logs")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--detector', choices=sorted(DETECTORES), default=DETECTOR_PADRAO)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dados', help="Diretório onde os CSVs sintéticos são gerados e reaproveitados "
+                                        "(padrão: diretório temporário apagado no fim)")
+    parser.add_argument('--json', help="Arquivo para gravar os resultados em JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar os tempos")
+    args = parser.parse_args(argv)
+
+    temporario = None
+    diretorio = args.dados
+    if diretorio is None:
+        temporario = tempfile.TemporaryDirectory()
+        diretorio = temporario.name
+    os.makedirs(diretorio, exist_ok=True)
+
+    resultados = []
+    contexto = get_context('spawn')
+    try:
+        for linhas in args.tamanhos:
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                    resultado = executor.submit(medir, linhas, args.detector, diretorio, args.seed).result()
+            except (BrokenProcessPool, MemoryError) as e:
+                # Tamanhos que não cabem na memória ficam registrados em vez de interromper a execução
+                resultados.append({'linhas': linhas, 'erro': repr(e)})
+                print(f"{linhas:>12,}  falhou: {e!r}")
+                continue
+
+            resultados.append(resultado)
+            for etapa in resultado['etapas']:
+                print(f"{etapa['etapa']:>12} {linhas:>12,}  {etapa['segundos']:>9.3f}s  "
+                      f"pico {etapa['memoria_pico_mb']:>8.1f} MB (+{etapa['memoria_extra_mb']:.1f})")
+                for nome, subetapa in etapa['subetapas'].items():
+                    print(f"{'':>12} {'':>12}  {subetapa['segundos']:>9.3f}s  {nome} "
+                          f"({subetapa['execucoes']:,}x, {subetapa['linhas']:,} linhas)")
+    finally:
+        if temporario is not None:
+            temporario.cleanup()
+
+    saida = {'ambiente': _ambiente(), 'detector': args.detector, 'seed': args.seed, 'resultados': resultados}
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(saida, f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            _comparar(json.load(f), resultados)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
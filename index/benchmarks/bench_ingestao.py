@@ -0,0 +1,225 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+DIRETORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIRETORIO)
+
+from dados_sinteticos import gerar_logs_sinteticos  # noqa: E402
+
+# Teste de carga do serviço de ingestão (cli.py servir): muitos produtores
+# simultâneos, cada um numa conexão persistente, enviando lotes CSV por POST
+# /logs. Um 503 (fila cheia) é repetido depois do Retry-After. No fim, confere em
+# /contagens se todas as linhas enviadas foram recebidas e analisadas.
+PRODUTORES_PADRAO = 2000
+ENVIOS_PADRAO = 10
+LINHAS_POR_ENVIO_PADRAO = 50
+CORPOS_DISTINTOS = 64
+ESPERA_ANALISE = 120.0
+
+
+def _corpos(linhas, quantidade, seed):
+    # Corpos CSV sem cabeçalho, gerados uma vez e reaproveitados pelos produtores
+    df = gerar_logs_sinteticos(linhas * quantidade, seed=seed)
+    csv = df.to_csv(header=False, index=False, date_format='%Y-%m-%d %H:%M:%S').encode('utf-8')
+    linhas_csv = csv.splitlines(keepends=True)
+    return [b''.join(linhas_csv[i:i + linhas]) for i in range(0, len(linhas_csv), linhas)]
+
+
+def _aumentar_limite_arquivos(conexoes):
+    # Cada produtor é um descritor aberto no cliente (e outro no servidor, se local)
+    suave, rigido = resource.getrlimit(resource.RLIMIT_NOFILE)
+    desejado = conexoes * 2 + 256
+    if suave < desejado:
+        novo = desejado if rigido == resource.RLIM_INFINITY else min(desejado, rigido)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (novo, rigido))
+        suave = novo
+    return suave
+
+
+async def _conectar(destino):
+    if destino['unix']:
+        return await asyncio.open_unix_connection(destino['unix'])
+    return await asyncio.open_connection(destino['host'], destino['porta'])
+
+
+async def _requisicao(leitor, escritor, metodo, alvo, corpo=b''):
+    escritor.write(f"{metodo} {alvo} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(corpo)}\r\n\r\n"
+                   .encode('latin-1') + corpo)
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    resposta = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+    return status, cabecalhos, resposta
+
+
+async def _consultar(destino, alvo):
+    leitor, escritor = await _conectar(destino)
+    try:
+        status, _, resposta = await _requisicao(leitor, escritor, 'GET', alvo)
+    finally:
+        escritor.close()
+    if status != 200:
+        raise RuntimeError(f"GET {alvo} respondeu {status}")
+    return json.loads(resposta)
+
+
+async def _produtor(numero, destino, corpos, envios, latencias, totais):
+    leitor, escritor = await _conectar(destino)
+    try:
+        for envio in range(envios):
+            corpo = corpos[(numero + envio) % len(corpos)]
+            while True:
+                inicio = time.perf_counter()
+                status, cabecalhos, _ = await _requisicao(leitor, escritor, 'POST', '/logs', corpo)
+                latencias.append(time.perf_counter() - inicio)
+                if status != 503:
+                    break
+                totais['recusados'] += 1
+                await asyncio.sleep(float(cabecalhos.get('retry-after', 1)))
+            if status != 202:
+                raise RuntimeError(f"POST /logs respondeu {status}")
+            totais['linhas'] += corpo.count(b'\n')
+            totais['envios'] += 1
+    finally:
+        escritor.close()
+
+
+def _percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(int(fracao * len(ordenados)), len(ordenados) - 1)] if ordenados else 0.0
+
+
+async def carga(destino, produtores, envios, corpos):
+    antes = await _consultar(destino, '/contagens')
+    latencias = []
+    totais = {'linhas': 0, 'envios': 0, 'recusados': 0}
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_produtor(i, destino, corpos, envios, latencias, totais) for i in range(produtores)))
+    envio_s = time.perf_counter() - inicio
+
+    # Espera o consumidor analisar tudo o que foi aceito
+    esperado = antes['logs'] + antes['linhas_rejeitadas'] + totais['linhas']
+    prazo = time.perf_counter() + ESPERA_ANALISE
+    while True:
+        depois = await _consultar(destino, '/contagens')
+        if depois['logs'] + depois['linhas_rejeitadas'] >= esperado or time.perf_counter() > prazo:
+            break
+        await asyncio.sleep(0.05)
+    total_s = time.perf_counter() - inicio
+
+    recebidas = depois['linhas_recebidas'] - antes['linhas_recebidas']
+    analisadas = depois['logs'] - antes['logs']
+    rejeitadas = depois['linhas_rejeitadas'] - antes['linhas_rejeitadas']
+    return {
+        'produtores': produtores,
+        'envios': totais['envios'],
+        'linhas_enviadas': totais['linhas'],
+        'linhas_recebidas': recebidas,
+        'linhas_analisadas': analisadas,
+        'linhas_rejeitadas': rejeitadas,
+        'erros_detectados': depois['erros'] - antes['erros'],
+        'envios_recusados': totais['recusados'],
+        'lotes_analisados': depois['lotes_analisados'] - antes['lotes_analisados'],
+        'envio_s': round(envio_s, 3),
+        'total_s': round(total_s, 3),
+        'linhas_por_s': round(analisadas / total_s) if total_s > 0 else None,
+        'latencia_p50_ms': round(_percentil(latencias, 0.50) * 1000, 2),
+        'latencia_p99_ms': round(_percentil(latencias, 0.99) * 1000, 2),
+        'latencia_max_ms': round(max(latencias, default=0.0) * 1000, 2),
+        'ok': recebidas == totais['linhas'] and analisadas + rejeitadas == totais['linhas'],
+    }
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _iniciar_servidor(destino, opcoes):
+    # Servidor em outro processo, para que o cliente não dispute a mesma thread
+    comando = [sys.executable, os.path.join(DIRETORIO, 'cli.py'), 'servir'] + opcoes
+    comando += ['--unix', destino['unix']] if destino['unix'] else ['--porta', str(destino['porta'])]
+    processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL)
+    prazo = time.perf_counter() + 30
+    while time.perf_counter() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError(f"servidor terminou com código {processo.returncode}")
+        try:
+            asyncio.run(_consultar(destino, '/saude'))
+            return processo
+        except OSError:
+            time.sleep(0.1)
+    processo.kill()
+    raise RuntimeError("servidor não respondeu em 30s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de ingestão de logs")
+    parser.add_argument('--url', help="Servidor já em execução (ex.: http://127.0.0.1:8070); "
+                                      "sem --url, um servidor local é iniciado")
+    parser.add_argument('--unix', help="Socket Unix do servidor; sem --url, inicia um servidor nele")
+    parser.add_argument('--produtores', type=int, default=PRODUTORES_PADRAO,
+                        help="Produtores simultâneos, cada um em uma conexão")
+    parser.add_argument('--envios', type=int, default=ENVIOS_PADRAO, help="Envios por produtor")
+    parser.add_argument('--linhas', type=int, default=LINHAS_POR_ENVIO_PADRAO, help="Linhas de log por envio")
+    parser.add_argument('--servidor', nargs=argparse.REMAINDER, default=[],
+                        help="Opções repassadas ao servidor iniciado (ex.: --servidor --max-pendentes 64)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Arquivo para gravar os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    limite = _aumentar_limite_arquivos(args.produtores)
+    if limite < args.produtores + 64:
+        print(f"Limite de arquivos abertos ({limite}) baixo para {args.produtores} produtores", file=sys.stderr)
+
+    if args.url:
+        url = urlsplit(args.url)
+        destino = {'unix': None, 'host': url.hostname, 'porta': url.port or 80}
+    else:
+        destino = {'unix': args.unix, 'host': '127.0.0.1', 'porta': None if args.unix else _porta_livre()}
+    processo = None if args.url else _iniciar_servidor(destino, args.servidor)
+
+    try:
+        corpos = _corpos(args.linhas, CORPOS_DISTINTOS, args.seed)
+        resultado = asyncio.run(carga(destino, args.produtores, args.envios, corpos))
+    finally:
+        if processo is not None:
+            processo.send_signal(signal.SIGTERM)
+            processo.wait(timeout=ESPERA_ANALISE)
+
+    print(f"{resultado['produtores']:,} produtores, {resultado['envios']:,} envios, "
+          f"{resultado['linhas_enviadas']:,} linhas em {resultado['total_s']:.2f}s "
+          f"({resultado['linhas_por_s']:,} linhas/s, {resultado['lotes_analisados']:,} micro-lotes)")
+    print(f"latência do envio: p50 {resultado['latencia_p50_ms']:.1f} ms, p99 {resultado['latencia_p99_ms']:.1f} ms, "
+          f"máx {resultado['latencia_max_ms']:.1f} ms; {resultado['envios_recusados']:,} recusas (503)")
+    print(f"{resultado['linhas_analisadas']:,} analisadas, {resultado['linhas_rejeitadas']:,} rejeitadas, "
+          f"{resultado['erros_detectados']:,} erros detectados")
+    if not resultado['ok']:
+        print(f"Linhas perdidas: {resultado['linhas_enviadas']:,} enviadas, "
+              f"{resultado['linhas_recebidas']:,} recebidas", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+    return 0 if resultado['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
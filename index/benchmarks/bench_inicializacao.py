@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DIRETORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que não podem ser carregados só por importar o núcleo de análise:
+# gráficos, interface e modelo de anomalias são importados quando usados
+PESADOS = ['matplotlib', 'seaborn', 'sklearn', 'scipy', 'joblib']
+PROIBIDOS = {
+    'cli': PESADOS + ['tkinter', 'pyarrow.dataset'],
+    'motor_analise': PESADOS + ['tkinter'],
+    'analisador_logs': PESADOS,
+    'modelo_anomalias': PESADOS + ['tkinter'],
+}
+# Tempo máximo de importação (mediana, em segundos); pandas sozinho leva cerca de 0,4s
+LIMITE_PADRAO = 1.0
+REPETICOES_PADRAO = 5
+
+_MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+segundos = time.perf_counter() - inicio
+print(json.dumps({{'segundos': segundos, 'modulos': sorted(sys.modules)}}))
+"""
+
+
+def _ambiente_sem_tela():
+    # Como num servidor: sem display
+    ambiente = dict(os.environ)
+    ambiente.pop('DISPLAY', None)
+    ambiente.pop('WAYLAND_DISPLAY', None)
+    return ambiente
+
+
+def medir_importacao(modulo, repeticoes=REPETICOES_PADRAO):
+    # Cada importação roda num interpretador novo, sem cache de módulos
+    tempos = []
+    carregados = set()
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', _MEDIR.format(modulo=modulo)], cwd=DIRETORIO,
+                               env=_ambiente_sem_tela(), capture_output=True, text=True, check=True)
+        resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos.append(resultado['segundos'])
+        carregados.update(resultado['modulos'])
+    proibidos = sorted(m for m in carregados if m.split('.')[0] in PROIBIDOS[modulo] or m in PROIBIDOS[modulo])
+    return {'modulo': modulo, 'segundos': round(statistics.median(tempos), 4),
+            'modulos_carregados': len(carregados), 'proibidos': proibidos}
+
+
+def executar_ajuda(script):
+    # A linha de comando precisa funcionar sem display
+    saida = subprocess.run([sys.executable, script, '--help'], cwd=DIRETORIO, env=_ambiente_sem_tela(),
+                           capture_output=True, text=True)
+    return {'script': script, 'codigo': saida.returncode, 'erro': saida.stderr.strip()[-500:]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica o tempo de importação e os módulos carregados "
+                                                 "pelo núcleo de análise (falha se houver regressão)")
+    parser.add_argument('--modulos', nargs='+', choices=sorted(PROIBIDOS), default=list(PROIBIDOS))
+    parser.add_argument('--limite', type=float, default=LIMITE_PADRAO,
+                        help="Tempo máximo de importação de cada módulo, em segundos")
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO)
+    parser.add_argument('--json', help="Arquivo para gravar os resultados em JSON")
+    args = parser.parse_args(argv)
+
+    falhas = []
+    resultados = []
+    for modulo in args.modulos:
+        resultado = medir_importacao(modulo, args.repeticoes)
+        resultados.append(resultado)
+        print(f"{modulo:>18}  {resultado['segundos']:>7.3f}s  {resultado['modulos_carregados']:>5} módulos")
+        if resultado['proibidos']:
+            falhas.append(f"{modulo} carrega {', '.join(resultado['proibidos'])}")
+        if resultado['segundos'] > args.limite:
+            falhas.append(f"{modulo} leva {resultado['segundos']:.3f}s para importar (limite {args.limite}s)")
+
+    for script in ('cli.py', 'analisador_logs.py'):
+        ajuda = executar_ajuda(script)
+        resultados.append(ajuda)
+        if ajuda['codigo'] != 0:
+            falhas.append(f"{script} --help falhou sem display: {ajuda['erro']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'limite': args.limite, 'resultados': resultados, 'falhas': falhas}, f,
+                      ensure_ascii=False, indent=2)
+    for falha in falhas:
+        print(f"FALHA: {falha}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import numpy as np
+import pandas as pd
+from simulador import sortear_logs
+
+
+def gerar_logs_sinteticos(n, seed=0, proporcao_erro=0.3, dias=30, inicio='2015-06-01'):
+    # Logs no formato timestamp,nivel,mensagem com as mesmas mensagens do gerador
+    rng = np.random.default_rng(seed)
+    nivel, mensagem = sortear_logs(rng, n, proporcao_erro)
+    segundos = np.sort(rng.integers(0, dias * 24 * 60 * 60, n))
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp(inicio) + pd.to_timedelta(segundos, unit='s'),
+        'nivel': nivel,
+        'mensagem': mensagem,
+    })
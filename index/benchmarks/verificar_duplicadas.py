@@ -0,0 +1,106 @@
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisador_logs import carregar_csv  # noqa: E402
+from duplicadas import COLUNA_ITEM, JanelaTransacoes, marcar_duplicadas  # noqa: E402
+from motor_analise import ler_logs_csv  # noqa: E402
+from seguidor import MonitorTempoReal  # noqa: E402
+
+# Verificação da detecção de transações duplicadas em todos os caminhos (blocos
+# do carregamento, linha a linha do seguidor e carregar_csv). Um pedido com
+# vários itens tem uma linha por item com o mesmo transactionid e o mesmo
+# instante: só o mesmo item repetido na janela é duplicada.
+CABECALHO = 'timestamp,nivel,mensagem,visitorid,itemid,transactionid'
+MENSAGEM = 'Pagamento processado com sucesso.'
+# (timestamp, itemid, transactionid, duplicada com itemid, duplicada só pelo transactionid)
+LINHAS = [
+    ('2015-06-01 10:00:00', 100, 7, False, False),
+    # Mesmo pedido, outros itens, mesmo instante
+    ('2015-06-01 10:00:00', 101, 7, False, True),
+    ('2015-06-01 10:00:00', 102, 7, False, True),
+    # Mesmo item em outro pedido
+    ('2015-06-01 10:05:00', 100, 8, False, False),
+    # Item do pedido repetido dentro da janela de 1h
+    ('2015-06-01 10:30:00', 101, 7, True, True),
+    # Repetido só depois da janela
+    ('2015-06-01 12:00:00', 102, 7, False, False),
+]
+JANELA = 60 * 60
+
+
+def _csv(com_item):
+    colunas = CABECALHO.split(',')
+    if not com_item:
+        colunas.remove(COLUNA_ITEM)
+    linhas = [','.join(colunas)]
+    for timestamp, item, transacao, _, _ in LINHAS:
+        valores = [timestamp, 'INFO', MENSAGEM, '1'] + ([str(item)] if com_item else []) + [str(transacao)]
+        linhas.append(','.join(valores))
+    return '\n'.join(linhas) + '\n', colunas
+
+
+def _por_blocos(caminho, tamanho_chunk):
+    janela = JanelaTransacoes(JANELA)
+    marcadas = []
+    for chunk in ler_logs_csv(caminho, tamanho_chunk):
+        marcadas.extend(marcar_duplicadas(chunk, janela).tolist())
+    return marcadas
+
+
+def _linha_a_linha(texto, colunas):
+    marcadas = []
+    monitor = MonitorTempoReal(colunas=colunas, janela_duplicadas=JANELA)
+    for linha in texto.splitlines()[1:]:
+        # A mensagem não casa com nenhuma regra: toda detecção é uma duplicada
+        antes = monitor.erros_detectados
+        monitor.processar_linha(linha)
+        marcadas.append(monitor.erros_detectados > antes)
+    return marcadas
+
+
+class _SemProgresso:
+    def informar(self, fracao, mensagem=None):
+        pass
+
+
+def _carregamento(caminho):
+    entrada = carregar_csv(caminho, progresso=_SemProgresso())
+    return (entrada.df_logs['categoria'] == 'Duplicada').tolist()
+
+
+def verificar():
+    falhas = []
+    with tempfile.TemporaryDirectory() as temporario:
+        for com_item in (True, False):
+            texto, colunas = _csv(com_item)
+            caminho = os.path.join(temporario, f"logs_{com_item}.csv")
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(texto)
+            esperado = [linha[3] if com_item else linha[4] for linha in LINHAS]
+            caminhos = {
+                'blocos de 2 linhas': _por_blocos(caminho, 2),
+                'bloco único': _por_blocos(caminho, len(LINHAS)),
+                'linha a linha': _linha_a_linha(texto, colunas),
+                'carregar_csv': _carregamento(caminho),
+            }
+            for nome, marcadas in caminhos.items():
+                if marcadas != esperado:
+                    falhas.append(f"{'com' if com_item else 'sem'} itemid, {nome}: {marcadas} != {esperado}")
+    return falhas
+
+
+def main(argv=None):
+    argparse.ArgumentParser(description="Verifica a detecção de transações duplicadas").parse_args(argv)
+    falhas = verificar()
+    for falha in falhas:
+        print(falha, file=sys.stderr)
+    print("Duplicadas: " + ("OK" if not falhas else f"{len(falhas)} falhas"))
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from modelo_anomalias import CAMINHO_MODELO_PADRAO
+
+# Cache em disco dos resultados da análise de um arquivo de logs: logs já lidos
+# e classificados (severidade, categoria), máscaras das regras e das detecções e
+# os índices de agregados. A chave vem do conteúdo do arquivo e da configuração
+# do detector, então reabrir o mesmo arquivo, mesmo copiado para outro lugar, não
+# refaz a análise. Arquivos de até LIMITE_HASH_COMPLETO bytes entram inteiros no
+# hash; nos maiores só amostras do início, meio e fim, e a data de modificação
+# também entra na chave. Quando o arquivo só cresceu, a entrada anterior é
+# reaproveitada e só o final é analisado. As detecções guardam qual modelo de
+# anomalias as produziu e são refeitas se o modelo foi retreinado ou trocado.
+DIRETORIO_CACHE_PADRAO = os.path.join(os.path.expanduser('~'), '.cona', 'cache')
+TAMANHO_MAXIMO_PADRAO = 2 * 1024 ** 3
+TAMANHO_AMOSTRA = 1024 * 1024
+LIMITE_HASH_COMPLETO = 64 * 1024 * 1024
+# Mudar quando o formato das entradas ou a classificação por regras mudar
+VERSAO = 4
+
+
+def _hash_amostras(caminho, tamanho):
+    # Hash dos primeiros `tamanho` bytes do arquivo (inteiros ou, acima de
+    # LIMITE_HASH_COMPLETO, só amostras); com `tamanho` menor que o arquivo, diz
+    # se o arquivo começa com o conteúdo antigo
+    resumo = hashlib.blake2b(str(tamanho).encode(), digest_size=16)
+    if tamanho <= LIMITE_HASH_COMPLETO:
+        trechos = [(0, tamanho)]
+    else:
+        inicios = sorted({0, tamanho // 2 - TAMANHO_AMOSTRA // 2, tamanho - TAMANHO_AMOSTRA})
+        trechos = [(inicio, TAMANHO_AMOSTRA) for inicio in inicios]
+    with open(caminho, 'rb') as f:
+        for inicio, quantidade in trechos:
+            f.seek(inicio)
+            while quantidade > 0:
+                bloco = f.read(min(TAMANHO_AMOSTRA, quantidade))
+                if not bloco:
+                    break
+                resumo.update(bloco)
+                quantidade -= len(bloco)
+    return resumo.hexdigest()
+
+
+def identidade_modelo(caminho=CAMINHO_MODELO_PADRAO):
+    # Muda sempre que o modelo salvo é retreinado ou substituído; None sem modelo
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    return f"{estado.st_mtime_ns}-{estado.st_size}"
+
+
+def _termina_em_linha(caminho, tamanho):
+    if tamanho == 0:
+        return True
+    with open(caminho, 'rb') as f:
+        f.seek(tamanho - 1)
+        return f.read(1) == b'\n'
+
+
+def _tamanho_em_disco(pasta):
+    return sum(entrada.stat().st_size for entrada in os.scandir(pasta) if entrada.is_file())
+
+
+class Assinatura:
+    # Identidade de um arquivo para o cache: conteúdo + configuração do detector.
+    # modificado (mtime) só vale para arquivos grandes, cujo hash é por amostras.
+    def __init__(self, tamanho, hash_conteudo, detector, modificado=None):
+        self.tamanho = tamanho
+        self.hash_conteudo = hash_conteudo
+        self.detector = detector
+        self.modificado = modificado
+
+    @staticmethod
+    def do_arquivo(caminho, detector):
+        estado = os.stat(caminho)
+        modificado = estado.st_mtime_ns if estado.st_size > LIMITE_HASH_COMPLETO else None
+        return Assinatura(estado.st_size, _hash_amostras(caminho, estado.st_size), detector, modificado)
+
+    @property
+    def chave(self):
+        return hashlib.blake2b(f"{VERSAO}|{self.detector}|{self.tamanho}|{self.hash_conteudo}|{self.modificado}"
+                               .encode(), digest_size=16).hexdigest()
+
+
+class EntradaCache:
+    # Resultado guardado de um arquivo; mascara_erros e indice_erros ficam None
+    # até a detecção (regras + modelo) ser feita; modelo é a identidade_modelo do
+    # modelo usado nela. Sem assinatura (ex.: logs do armazenamento Parquet) a
+    # entrada não vai para o cache.
+    def __init__(self, assinatura, df_logs, mascara_regras, indice, mascara_erros=None, indice_erros=None,
+                 termina_em_linha=True, caminho=None, modelo=None):
+        self.assinatura = assinatura
+        self.caminho = caminho
+        self.df_logs = df_logs
+        self.mascara_regras = mascara_regras
+        self.indice = indice
+        self.mascara_erros = mascara_erros
+        self.indice_erros = indice_erros
+        self.termina_em_linha = termina_em_linha
+        self.modelo = modelo
+
+
+class CacheResultados:
+    # caminho_modelo: modelo de anomalias cujas detecções o cache guarda
+    def __init__(self, diretorio=DIRETORIO_CACHE_PADRAO, tamanho_maximo=TAMANHO_MAXIMO_PADRAO,
+                 caminho_modelo=CAMINHO_MODELO_PADRAO):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self.caminho_modelo = caminho_modelo
+
+    def _pasta(self, chave):
+        return os.path.join(self.diretorio, chave)
+
+    def _metas(self):
+        # (pasta, meta) de todas as entradas completas
+        if not os.path.isdir(self.diretorio):
+            return
+        for nome in os.listdir(self.diretorio):
+            try:
+                with open(os.path.join(self.diretorio, nome, 'meta.json'), encoding='utf-8') as f:
+                    yield os.path.join(self.diretorio, nome), json.load(f)
+            except (OSError, ValueError):
+                continue
+
+    def buscar(self, assinatura):
+        # Entrada do mesmo conteúdo e detector, ou None
+        pasta = self._pasta(assinatura.chave)
+        try:
+            return self._ler(pasta, assinatura)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, pa.ArrowException):
+            return None
+
+    def buscar_prefixo(self, caminho, assinatura):
+        # Maior entrada de um conteúdo que é o início do arquivo atual (o arquivo
+        # só cresceu desde então), para analisar apenas o final acrescentado
+        candidatas = sorted((meta['tamanho'], pasta, meta) for pasta, meta in self._metas()
+                            if meta['detector'] == assinatura.detector and meta['versao'] == VERSAO
+                            and meta['termina_em_linha'] and meta['tamanho'] < assinatura.tamanho)
+        for tamanho, pasta, meta in reversed(candidatas):
+            if _hash_amostras(caminho, tamanho) == meta['hash_conteudo']:
+                return self.buscar(Assinatura(tamanho, meta['hash_conteudo'], meta['detector'],
+                                              meta['modificado']))
+        return None
+
+    def _ler(self, pasta, assinatura):
+        with open(os.path.join(pasta, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        df_logs = pq.read_table(os.path.join(pasta, 'logs.parquet')).to_pandas()
+        mascara_regras = df_logs.pop('_regra').to_numpy()
+        mascara_erros = df_logs.pop('_erro').to_numpy() if '_erro' in df_logs.columns else None
+        with open(os.path.join(pasta, 'indices.pkl'), 'rb') as f:
+            indice, indice_erros = pickle.load(f)
+        if mascara_erros is not None and meta['modelo'] != identidade_modelo(self.caminho_modelo):
+            # Detecções de um modelo que já foi retreinado ou trocado: só as regras valem
+            mascara_erros = indice_erros = None
+
+        # Uso recente conta para o despejo (LRU)
+        meta['acesso'] = time.time()
+        self._gravar_meta(pasta, meta)
+        return EntradaCache(assinatura, df_logs, mascara_regras, indice, mascara_erros, indice_erros,
+                            meta['termina_em_linha'], meta['origem'],
+                            meta['modelo'] if mascara_erros is not None else None)
+
+    def _gravar_meta(self, pasta, meta):
+        temporario = os.path.join(pasta, 'meta.json.tmp')
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temporario, os.path.join(pasta, 'meta.json'))
+
+    def gravar(self, entrada):
+        # Grava (ou substitui) a entrada. O arquivo de origem diz se o conteúdo
+        # terminava em quebra de linha, condição para estender a entrada depois.
+        assinatura = entrada.assinatura
+        caminho = entrada.caminho
+        pasta = self._pasta(assinatura.chave)
+        temporaria = f"{pasta}.{os.getpid()}.tmp"
+        shutil.rmtree(temporaria, ignore_errors=True)
+        os.makedirs(temporaria)
+
+        tabela = pa.Table.from_pandas(entrada.df_logs, preserve_index=False)
+        tabela = tabela.append_column('_regra', pa.array(entrada.mascara_regras, type=pa.bool_()))
+        if entrada.mascara_erros is not None:
+            tabela = tabela.append_column('_erro', pa.array(entrada.mascara_erros, type=pa.bool_()))
+        pq.write_table(tabela, os.path.join(temporaria, 'logs.parquet'))
+        with open(os.path.join(temporaria, 'indices.pkl'), 'wb') as f:
+            pickle.dump((entrada.indice, entrada.indice_erros), f, protocol=pickle.HIGHEST_PROTOCOL)
+        if caminho is not None:
+            entrada.termina_em_linha = _termina_em_linha(caminho, assinatura.tamanho)
+        self._gravar_meta(temporaria, {
+            'versao': VERSAO, 'detector': assinatura.detector, 'tamanho': assinatura.tamanho,
+            'hash_conteudo': assinatura.hash_conteudo, 'modificado': assinatura.modificado,
+            'modelo': entrada.modelo if entrada.mascara_erros is not None else None,
+            'termina_em_linha': entrada.termina_em_linha,
+            'origem': os.path.abspath(caminho) if caminho else None, 'linhas': len(entrada.df_logs),
+            'acesso': time.time(),
+        })
+
+        shutil.rmtree(pasta, ignore_errors=True)
+        os.replace(temporaria, pasta)
+        self.despejar()
+
+    def remover(self, assinatura):
+        shutil.rmtree(self._pasta(assinatura.chave), ignore_errors=True)
+
+    def despejar(self):
+        # Remove as entradas usadas há mais tempo até o cache caber no tamanho máximo
+        entradas = sorted((meta['acesso'], pasta, _tamanho_em_disco(pasta)) for pasta, meta in self._metas())
+        total = sum(tamanho for _, _, tamanho in entradas)
+        for _, pasta, tamanho in entradas:
+            if total <= self.tamanho_maximo:
+                break
+            shutil.rmtree(pasta, ignore_errors=True)
+            total -= tamanho
+
+    def limpar(self):
+        shutil.rmtree(self.diretorio, ignore_errors=True)
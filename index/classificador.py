@@ -0,0 +1,131 @@
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from metricas import medir
+
+# Palavras das regras de detecção e de severidade (comparadas como palavra inteira)
+PALAVRAS_REGRA = {'erro', 'falha', 'timeout', 'duplicada', 'inválido', 'discrepância', 'exception'}
+PALAVRAS_SEVERIDADE_ALTA = {'critico', 'fatal'}
+PALAVRAS_SEVERIDADE_MEDIA = {'erro', 'falha'}
+
+# Palavras de cada categoria (comparadas como trecho da mensagem), em ordem de prioridade:
+# cada mensagem recebe a primeira categoria que casar
+PRIORIDADE_CATEGORIAS = [
+    ('Timeout', {'timeout'}),
+    ('Duplicada', {'duplicada'}),
+    ('Conexão', {'conexão', 'conectar'}),
+    ('Valores', {'valor', 'desconto', 'total'}),
+    ('Pagamento', {'pagamento', 'cartão', 'bancário'}),
+]
+
+# Ordem de exibição usada pelo relatório e pelo dashboard
+CATEGORIAS = ['Pagamento', 'Timeout', 'Valores', 'Duplicada', 'Conexão', 'Outros']
+SEVERIDADES = ['Baixa', 'Média', 'Alta']
+# Mensagens distintas classificadas guardadas por DicionarioTemplates
+MAX_TEMPLATES_PADRAO = 100_000
+
+_PALAVRAS = (PALAVRAS_REGRA | PALAVRAS_SEVERIDADE_ALTA | PALAVRAS_SEVERIDADE_MEDIA
+             | set().union(*(palavras for _, palavras in PRIORIDADE_CATEGORIAS)))
+# Uma única expressão com todas as palavras, as mais longas primeiro
+_PADRAO = re.compile('|'.join(re.escape(p) for p in sorted(_PALAVRAS, key=len, reverse=True)),
+                     re.IGNORECASE)
+
+
+def _caractere_de_palavra(c):
+    return c.isalnum() or c == '_'
+
+
+def classificar_mensagem(mensagem):
+    # Percorre a mensagem uma única vez e devolve (casa_regra, severidade, categoria)
+    inteiras = set()
+    trechos = set()
+    for m in _PADRAO.finditer(mensagem):
+        palavra = m.group().lower()
+        trechos.add(palavra)
+        inicio, fim = m.span()
+        if ((inicio == 0 or not _caractere_de_palavra(mensagem[inicio - 1]))
+                and (fim == len(mensagem) or not _caractere_de_palavra(mensagem[fim]))):
+            inteiras.add(palavra)
+
+    casa_regra = bool(inteiras & PALAVRAS_REGRA)
+
+    if inteiras & PALAVRAS_SEVERIDADE_ALTA:
+        severidade = 'Alta'
+    elif inteiras & PALAVRAS_SEVERIDADE_MEDIA:
+        severidade = 'Média'
+    else:
+        severidade = 'Baixa'
+
+    categoria = 'Outros'
+    for nome, palavras in PRIORIDADE_CATEGORIAS:
+        if trechos & palavras:
+            categoria = nome
+            break
+
+    return casa_regra, severidade, categoria
+
+
+class DicionarioTemplates:
+    # Classificação das mensagens distintas (templates), feita quando cada uma
+    # aparece e reaproveitada nos blocos seguintes. Acima de max_templates sai a
+    # usada há mais tempo (LRU): mensagens únicas (IDs, valores) não fazem o
+    # dicionário crescer sem limite, e uma mensagem que saiu é classificada de
+    # novo se voltar. Cada classificação é guardada como um inteiro: regra no
+    # bit 0, severidade nos bits 1-2 e categoria a partir do bit 3.
+    def __init__(self, max_templates=MAX_TEMPLATES_PADRAO):
+        self.max_templates = max_templates
+        self._classes = OrderedDict()
+
+    def __len__(self):
+        return len(self._classes)
+
+    def _classe(self, texto):
+        classe = self._classes.get(texto)
+        if classe is not None:
+            self._classes.move_to_end(texto)
+            return classe
+        casa_regra, severidade, categoria = classificar_mensagem(texto)
+        classe = int(casa_regra) | SEVERIDADES.index(severidade) << 1 | CATEGORIAS.index(categoria) << 3
+        self._classes[texto] = classe
+        if len(self._classes) > self.max_templates:
+            self._classes.popitem(last=False)
+        return classe
+
+    def classificar(self, mensagens):
+        # Máscara das regras e colunas categóricas de severidade e categoria,
+        # classificando só os valores distintos da série
+        if isinstance(mensagens.dtype, pd.CategoricalDtype):
+            locais, distintas = mensagens.cat.codes.to_numpy(), mensagens.cat.categories
+        else:
+            locais, distintas = pd.factorize(mensagens)
+
+        # A última posição é a da mensagem vazia (código local -1)
+        classes = np.empty(len(distintas) + 1, dtype=np.int8)
+        for i, texto in enumerate(distintas):
+            classes[i] = self._classe(str(texto))
+        classes[-1] = self._classe('')
+        por_linha = classes[locais]
+        return ((por_linha & 1).astype(bool),
+                pd.Categorical.from_codes((por_linha >> 1) & 3, categories=SEVERIDADES),
+                pd.Categorical.from_codes(por_linha >> 3, categories=CATEGORIAS))
+
+
+def classificar(mensagens, templates=None):
+    # Retorna a máscara das regras e as colunas categóricas de severidade e categoria
+    if templates is None:
+        templates = DicionarioTemplates()
+    return templates.classificar(mensagens)
+
+
+def classificar_logs(df, templates=None):
+    # Adiciona as colunas 'severidade' e 'categoria' e retorna a máscara das regras
+    with medir('regras', len(df)):
+        regra, severidade, categoria = classificar(df['mensagem'], templates)
+        df['severidade'] = severidade
+        df['categoria'] = categoria
+    return regra
+
+
+def contar_categorias(df):
+    return df['categoria'].value_counts().reindex(CATEGORIAS, fill_value=0)
@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+import pandas as pd
+from duplicadas import JANELA_DUPLICADAS_PADRAO
+from motor_analise import MotorAnalise, TAMANHO_CHUNK_PADRAO, preprocessar
+from modelo_anomalias import (ModeloAnomalias, CAMINHO_MODELO_PADRAO, DETECTORES, DETECTOR_PADRAO,
+                              criar_detector)
+from indice_tempo import IndiceTempo, LIMITE_LINHAS_PADRAO
+from ingestao import Quarentena, caminho_quarentena, ler_cabecalho
+from metricas import METRICAS, PORTA_PADRAO
+from relatorio import ExportadorErros
+from simulador import (Surto, PROPORCAO_ERRO_PADRAO, TAMANHO_BLOCO_PADRAO, gerar_blocos,
+                       gravar_csv)
+from servidor_ingestao import (ServicoIngestao, servir, PORTA_PADRAO as PORTA_INGESTAO,
+                               TAMANHO_LOTE_PADRAO as TAMANHO_LOTE_INGESTAO,
+                               INTERVALO_LOTE_PADRAO as INTERVALO_LOTE_INGESTAO,
+                               MAX_PENDENTES_PADRAO as MAX_PENDENTES_INGESTAO,
+                               ESPERA_MAXIMA_PADRAO as ESPERA_MAXIMA_INGESTAO)
+from seguidor import (MonitorTempoReal, JANELA_PADRAO, TOTAL, seguir_arquivo,
+                      seguir_entrada_padrao)
+
+
+def comando_analisar(args):
+    modelo = ModeloAnomalias.carregar(args.modelo) if args.modelo else None
+    motor = MotorAnalise(tamanho_chunk=args.chunk, guardar_erros=False, processos=args.processos,
+                         modelo=modelo, janela_duplicadas=args.janela_duplicadas)
+
+    # Grava as detecções de cada chunk assim que são produzidas; o formato vem
+    # da extensão (.csv, .jsonl, .txt, com .gz ou .zst opcional)
+    exportador = ExportadorErros(args.saida) if args.saida else None
+    ao_detectar = exportador.escrever if exportador else None
+    try:
+        return _analisar(args, motor, ao_detectar)
+    finally:
+        if exportador is not None:
+            exportador.fechar()
+
+
+def _analisar(args, motor, ao_detectar):
+    armazenamentos = [caminho for caminho in args.arquivos if os.path.isdir(caminho)]
+    arquivos = [caminho for caminho in args.arquivos if not os.path.isdir(caminho)]
+
+    for diretorio in armazenamentos:
+        resultado = motor.analisar_armazenamento(diretorio, inicio=args.inicio, fim=args.fim,
+                                                 ao_detectar=ao_detectar)
+        print(f"Armazenamento: {diretorio}")
+        print(resultado.resumo())
+        print()
+
+    if motor.processos > 1 and arquivos:
+        # Todos os arquivos entram no mesmo pool e geram um único resultado
+        resultado = motor.analisar_arquivos(arquivos, ao_detectar=ao_detectar)
+        print(f"Arquivos: {len(arquivos)}")
+        print(resultado.resumo())
+        return 0
+
+    for caminho in arquivos:
+        resultado = motor.analisar_arquivo(caminho, ao_detectar=ao_detectar)
+        print(f"Arquivo: {caminho}")
+        print(resultado.resumo())
+        print()
+    return 0
+
+
+def comando_treinar(args):
+    motor = MotorAnalise(tamanho_chunk=args.chunk)
+    chunks = (preprocessar(chunk) for caminho in args.arquivos for chunk in motor.ler_chunks(caminho))
+
+    if args.incremental and os.path.exists(args.modelo):
+        modelo = ModeloAnomalias.carregar(args.modelo)
+        if not modelo.incremental:
+            print(f"O detector '{modelo.nome}' não permite treino incremental")
+            return 1
+    else:
+        modelo = criar_detector(args.detector)
+
+    modelo.treinar_chunks(chunks)
+    if not modelo.treinado:
+        print("Nenhum log de nível ERROR encontrado para treinar o modelo")
+        return 1
+
+    modelo.salvar(args.modelo)
+    print(f"Modelo '{modelo.nome}' salvo em {args.modelo} ({modelo.amostras_vistas:,} amostras)")
+    return 0
+
+
+def comando_seguir(args):
+    limites = {}
+    for item in args.limite:
+        categoria, _, valor = item.partition('=')
+        if not valor.isdigit():
+            print(f"Limite inválido: {item} (use CATEGORIA=QUANTIDADE)")
+            return 2
+        limites[categoria] = int(valor)
+
+    # O cabeçalho do arquivo diz onde estão a mensagem e os IDs, mesmo começando
+    # do fim; na entrada padrão ele é reconhecido quando aparece
+    colunas = None if args.arquivo == '-' else ler_cabecalho(args.arquivo)
+    monitor = MonitorTempoReal(janela=args.janela, limites=limites, limite_padrao=args.limite_padrao,
+                               colunas=colunas, janela_duplicadas=args.janela_duplicadas)
+    if args.arquivo == '-':
+        linhas = seguir_entrada_padrao()
+    else:
+        linhas = seguir_arquivo(args.arquivo, do_inicio=args.do_inicio)
+
+    try:
+        monitor.processar(linhas)
+    except KeyboardInterrupt:
+        pass
+    print(f"{monitor.linhas_processadas:,} logs processados, {monitor.erros_detectados:,} erros detectados")
+    return 0
+
+
+def comando_importar(args):
+    # pyarrow.dataset só é carregado por este comando
+    from armazenamento import importar_csv
+
+    for caminho in args.arquivos:
+        quarentena = Quarentena(caminho_quarentena(caminho))
+        quarentena.limpar()
+        total = importar_csv(caminho, args.destino, tamanho_chunk=args.chunk, quarentena=quarentena)
+        print(f"{caminho}: {total:,} logs importados para {args.destino}")
+        if quarentena.total:
+            print(f"{caminho}: {quarentena.total:,} linhas malformadas gravadas em {quarentena.caminho}")
+    return 0
+
+
+def comando_servir(args):
+    modelo = ModeloAnomalias.carregar(args.modelo) if args.modelo else None
+    servico = ServicoIngestao(modelo=modelo, tamanho_lote=args.lote, intervalo=args.intervalo,
+                              max_pendentes=args.max_pendentes, espera_maxima=args.espera_maxima,
+                              janela_duplicadas=args.janela_duplicadas)
+
+    def pronto(servidor):
+        onde = args.unix or ', '.join(f"http://{s.getsockname()[0]}:{s.getsockname()[1]}" for s in servidor.sockets)
+        print(f"Recebendo logs em {onde} (POST /logs; GET /contagens, /deteccoes, /metrics)", file=sys.stderr)
+
+    try:
+        asyncio.run(servir(servico, porta=args.porta, endereco=args.endereco, socket_unix=args.unix, pronto=pronto))
+    except FileExistsError as e:
+        print(e)
+        return 1
+    contagens = servico.contagens()
+    print(f"{contagens['logs']:,} logs analisados, {contagens['erros']:,} erros detectados, "
+          f"{contagens['envios_recusados']:,} envios recusados com a fila cheia")
+    return 0
+
+
+def comando_consultar(args):
+    # Lê só os blocos do arquivo que cobrem a janela, pelo índice de offsets
+    if args.reindexar:
+        indice = IndiceTempo.construir(args.arquivo)
+        indice.salvar()
+    else:
+        indice = IndiceTempo.abrir(args.arquivo)
+    print(f"{args.arquivo}: {indice.inicio} a {indice.fim} ({indice.blocos:,} blocos indexados)", file=sys.stderr)
+
+    logs = indice.ler(args.inicio, args.fim, limite=args.limite or None)
+    logs.to_csv(sys.stdout, index=False)
+    return 0
+
+
+def comando_gerar(args):
+    try:
+        surtos = [Surto.interpretar(texto) for texto in args.surto]
+    except ValueError as e:
+        print(e)
+        return 2
+
+    inicio = pd.Timestamp(args.inicio)
+    blocos = gerar_blocos(args.linhas, inicio, inicio + pd.Timedelta(days=args.dias),
+                          proporcao_erro=args.proporcao_erro, surtos=surtos,
+                          tamanho_bloco=args.bloco, seed=args.seed)
+
+    def ao_progredir(total):
+        print(f"\r{total:,} / {args.linhas:,} logs gerados", end='', file=sys.stderr, flush=True)
+
+    total = gravar_csv(args.saida, blocos, ao_progredir=ao_progredir)
+    print(file=sys.stderr)
+    print(f"{total:,} logs gravados em {args.saida}")
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Análise de logs de transações sem interface gráfica")
+    parser.add_argument('--metricas', metavar='ARQUIVO',
+                        help="Grava as métricas de cada etapa no formato texto do Prometheus ao terminar")
+    parser.add_argument('--porta-metricas', type=int, nargs='?', const=PORTA_PADRAO, metavar='PORTA',
+                        help=f"Expõe as métricas em http://127.0.0.1:PORTA/metrics (padrão {PORTA_PADRAO})")
+    parser.add_argument('--log-metricas', metavar='ARQUIVO',
+                        help="Grava uma linha JSON por execução de etapa ('-' para a saída de erro)")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    analisar = subparsers.add_parser('analisar', help="Analisa arquivos CSV de logs em blocos")
+    analisar.add_argument('arquivos', nargs='+',
+                          help="Arquivos CSV no formato timestamp,nivel,mensagem[,visitorid,itemid,transactionid] "
+                               "ou diretórios criados por 'importar'")
+    analisar.add_argument('--chunk', type=int, default=TAMANHO_CHUNK_PADRAO,
+                          help="Quantidade de linhas lidas por bloco")
+    analisar.add_argument('--processos', type=int, default=1,
+                          help="Quantidade de processos (0 usa todos os núcleos)")
+    analisar.add_argument('--saida', help="Arquivo para gravar os erros detectados (.csv, .jsonl ou .txt, "
+                                          "opcionalmente com .gz ou .zst)")
+    analisar.add_argument('--inicio', help="Início do período (só para diretórios Parquet)")
+    analisar.add_argument('--fim', help="Fim do período, incluído; uma data sem hora inclui o dia inteiro "
+                                        "(só para diretórios Parquet)")
+    analisar.add_argument('--modelo', help="Modelo de anomalias treinado para pontuar os logs de erro")
+    analisar.add_argument('--janela-duplicadas', type=int, default=JANELA_DUPLICADAS_PADRAO,
+                          help="Segundos em que o mesmo item de uma transação repetido conta como duplicada")
+    analisar.set_defaults(func=comando_analisar)
+
+    treinar = subparsers.add_parser('treinar', help="Treina e salva o modelo de anomalias")
+    treinar.add_argument('arquivos', nargs='+', help="Arquivos CSV usados no treino")
+    treinar.add_argument('--modelo', default=CAMINHO_MODELO_PADRAO, help="Onde salvar o modelo")
+    treinar.add_argument('--detector', choices=sorted(DETECTORES), default=DETECTOR_PADRAO,
+                         help="Algoritmo de detecção de anomalias")
+    treinar.add_argument('--incremental', action='store_true',
+                         help="Atualiza o modelo existente em vez de treinar do zero")
+    treinar.add_argument('--chunk', type=int, default=TAMANHO_CHUNK_PADRAO,
+                         help="Quantidade de linhas lidas por bloco")
+    treinar.set_defaults(func=comando_treinar)
+
+    importar = subparsers.add_parser('importar', help="Converte CSVs de logs para Parquet particionado por dia")
+    importar.add_argument('arquivos', nargs='+', help="Arquivos CSV no formato timestamp,nivel,mensagem")
+    importar.add_argument('destino', help="Diretório do armazenamento Parquet")
+    importar.add_argument('--chunk', type=int, default=TAMANHO_CHUNK_PADRAO,
+                          help="Quantidade de linhas lidas por bloco")
+    importar.set_defaults(func=comando_importar)
+
+    seguir = subparsers.add_parser('seguir', help="Acompanha um arquivo de logs em crescimento e emite alertas")
+    seguir.add_argument('arquivo', help="Arquivo de logs a acompanhar ou '-' para ler da entrada padrão")
+    seguir.add_argument('--janela', type=int, default=JANELA_PADRAO,
+                        help="Tamanho da janela deslizante em segundos")
+    seguir.add_argument('--limite', action='append', default=[], metavar='CATEGORIA=QUANTIDADE',
+                        help=f"Erros da categoria na janela que disparam alerta (categorias e '{TOTAL}')")
+    seguir.add_argument('--limite-padrao', type=int,
+                        help="Limite usado para as categorias sem --limite próprio")
+    seguir.add_argument('--do-inicio', action='store_true',
+                        help="Processa o conteúdo já existente antes de acompanhar o arquivo")
+    seguir.add_argument('--janela-duplicadas', type=int, default=JANELA_DUPLICADAS_PADRAO,
+                        help="Segundos em que o mesmo item de uma transação repetido conta como duplicada")
+    seguir.set_defaults(func=comando_seguir)
+
+    servir = subparsers.add_parser('servir', help="Recebe lotes de logs por HTTP local ou socket Unix e os "
+                                                  "analisa em micro-lotes")
+    servir.add_argument('--porta', type=int, default=PORTA_INGESTAO, help="Porta HTTP local")
+    servir.add_argument('--endereco', default='127.0.0.1', help="Endereço em que a porta HTTP escuta")
+    servir.add_argument('--unix', metavar='CAMINHO', help="Escuta em um socket Unix em vez da porta HTTP")
+    servir.add_argument('--modelo', help="Modelo de anomalias treinado para pontuar os logs de erro")
+    servir.add_argument('--lote', type=int, default=TAMANHO_LOTE_INGESTAO,
+                        help="Linhas máximas por micro-lote analisado")
+    servir.add_argument('--intervalo', type=float, default=INTERVALO_LOTE_INGESTAO,
+                        help="Segundos máximos esperando para completar um micro-lote")
+    servir.add_argument('--max-pendentes', type=int, default=MAX_PENDENTES_INGESTAO,
+                        help="Envios aguardando análise antes de os produtores terem de esperar")
+    servir.add_argument('--espera-maxima', type=float, default=ESPERA_MAXIMA_INGESTAO,
+                        help="Segundos que um envio espera a fila liberar antes de receber 503")
+    servir.add_argument('--janela-duplicadas', type=int, default=JANELA_DUPLICADAS_PADRAO,
+                        help="Segundos em que o mesmo item de uma transação repetido conta como duplicada")
+    servir.set_defaults(func=comando_servir)
+
+    consultar = subparsers.add_parser('consultar', help="Mostra os logs de uma janela de tempo sem ler o arquivo inteiro")
+    consultar.add_argument('arquivo', help="Arquivo CSV de logs (o índice é salvo ao lado, em ARQUIVO.indice.npz)")
+    consultar.add_argument('--inicio', help="Início da janela, ex.: '2015-06-03 10:00'")
+    consultar.add_argument('--fim', help="Fim da janela, incluído; uma data sem hora inclui o dia inteiro")
+    consultar.add_argument('--limite', type=int, default=LIMITE_LINHAS_PADRAO,
+                           help="Máximo de linhas mostradas (0 mostra todas)")
+    consultar.add_argument('--reindexar', action='store_true', help="Reconstrói o índice do zero")
+    consultar.set_defaults(func=comando_consultar)
+
+    gerar = subparsers.add_parser('gerar', help="Gera logs sintéticos em grande volume para testes de carga")
+    gerar.add_argument('saida', help="Arquivo CSV de saída")
+    gerar.add_argument('--linhas', type=int, default=1_000_000, help="Quantidade de logs gerados")
+    gerar.add_argument('--inicio', default='2015-06-01', help="Timestamp do início do período")
+    gerar.add_argument('--dias', type=float, default=30, help="Duração do período em dias")
+    gerar.add_argument('--proporcao-erro', type=float, default=PROPORCAO_ERRO_PADRAO,
+                       help="Proporção de logs ERROR fora dos surtos")
+    gerar.add_argument('--surto', action='append', default=[], metavar='INICIO,DURACAO[,chave=valor...]',
+                       help="Período de surto ou queda, ex.: '2015-06-03 10:00,30min,proporcao=0.9,"
+                            "volume=5,categoria=Timeout' (volume=0 simula uma queda sem logs)")
+    gerar.add_argument('--seed', type=int, default=0, help="Semente do gerador aleatório")
+    gerar.add_argument('--bloco', type=int, default=TAMANHO_BLOCO_PADRAO,
+                       help="Quantidade aproximada de linhas geradas e gravadas por vez")
+    gerar.set_defaults(func=comando_gerar)
+
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+
+    if args.log_metricas:
+        handler = logging.StreamHandler() if args.log_metricas == '-' else logging.FileHandler(
+            args.log_metricas, encoding='utf-8')
+        logger = logging.getLogger('cona.metricas')
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    if args.porta_metricas is not None:
+        METRICAS.servir_http(args.porta_metricas)
+
+    try:
+        return args.func(args)
+    finally:
+        if args.metricas:
+            METRICAS.gravar_prometheus(args.metricas)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+from collections import OrderedDict
+import numpy as np
+import tkinter as tk
+from tkinter import ttk
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+import seaborn as sns
+
+# Dashboard com as figuras criadas uma vez só: a cada atualização só os dados dos
+# artistas (barras, linhas, fatias) mudam e só as figuras alteradas são redesenhadas.
+# Os dados vêm dos índices de agregados e ficam em cache pela versão deles.
+TAMANHO_CACHE = 4
+# Pontos por série quando a largura do gráfico ainda não é conhecida
+PONTOS_PADRAO = 600
+COR_ERRO = '#F44336'
+COR_NORMAL = '#4CAF50'
+COR_HORA = '#2196F3'
+COR_MEDIA = '#9C27B0'
+TITULO_ERROS = 'Distribuição de Tipos de Erros'
+
+
+def versao_dados(indice, indice_erros):
+    return indice.versao, (indice_erros.versao if indice_erros is not None else None)
+
+
+def reduzir_serie(serie, pontos):
+    # Mantém o menor e o maior valor de cada faixa de cerca de 2 pontos de tela:
+    # o desenho fica igual ao da série completa (picos preservados) com no
+    # máximo `pontos` pontos
+    if len(serie) <= pontos:
+        return serie
+    faixas = max(pontos // 2, 1)
+    grupo = np.arange(len(serie)) * faixas // len(serie)
+    ordem = np.lexsort((serie.to_numpy(), grupo))
+    fim = np.flatnonzero(np.diff(grupo[ordem], append=faixas)) + 1
+    inicio = np.concatenate([[0], fim[:-1]])
+    posicoes = np.unique(np.concatenate([ordem[inicio], ordem[fim - 1]]))
+    return serie.iloc[posicoes]
+
+
+class DadosDashboard:
+    # Tudo que o dashboard desenha, calculado fora da thread do Tk
+    def __init__(self, versao, pontos, texto, niveis, horas, categorias, erros_por_dia, media_movel,
+                 erros_frequentes):
+        self.versao = versao
+        self.pontos = pontos
+        self.texto = texto
+        self.niveis = niveis
+        self.horas = horas
+        self.categorias = categorias
+        self.erros_por_dia = erros_por_dia
+        self.media_movel = media_movel
+        self.erros_frequentes = erros_frequentes
+
+
+def preparar_dashboard(indice, indice_erros, erros_frequentes, pontos=PONTOS_PADRAO, progresso=None):
+    # Estatísticas lidas do índice de agregados, sem percorrer os logs
+    total_logs = indice.total
+    error_count = indice_erros.total if indice_erros is not None else 0
+    nivel_counts = indice.por_nivel()
+    error_percent = (error_count / total_logs) * 100 if total_logs > 0 else 0
+
+    texto = (f"• Total de logs: {total_logs:,}\n"
+             f"• Período analisado: {indice.inicio} até {indice.fim}\n"
+             f"• Erros detectados: {error_count:,} ({error_percent:.2f}% do total)\n"
+             f"• Nível mais frequente: {nivel_counts.idxmax()}")
+
+    horas = indice.por_hora_do_dia().reindex(range(24), fill_value=0)
+    if progresso is not None:
+        progresso.informar(0.3)
+
+    categorias = None
+    if 'ERROR' in nivel_counts.index:
+        # Remove categorias com zero ocorrências
+        categorias = indice.por_categoria(nivel='ERROR')
+        categorias = categorias[categorias > 0]
+    if progresso is not None:
+        progresso.informar(0.6)
+
+    erros_por_dia = media_movel = None
+    if indice_erros is not None and indice_erros.total > 0:
+        erros_por_dia = indice_erros.serie('dia')
+        if len(erros_por_dia) > 7:
+            media_movel = reduzir_serie(erros_por_dia.rolling(7).mean().dropna(), pontos)
+        erros_por_dia = reduzir_serie(erros_por_dia, pontos)
+    if progresso is not None:
+        progresso.informar(1.0)
+
+    return DadosDashboard(versao_dados(indice, indice_erros), pontos, texto, nivel_counts, horas, categorias,
+                          erros_por_dia, media_movel, erros_frequentes)
+
+
+def _figura():
+    figura = Figure(figsize=(6, 4), dpi=100)
+    return figura, figura.add_subplot(111)
+
+
+def _iguais(a, b):
+    if a is None or b is None:
+        return a is b
+    return a.equals(b)
+
+
+class Dashboard:
+    def __init__(self, parent):
+        self._dados = None
+        self._cache = OrderedDict()
+
+        # Frame com scroll para o dashboard
+        canvas = tk.Canvas(parent)
+        scrollbar = ttk.Scrollbar(parent, orient="vertical", command=canvas.yview)
+        self.frame = ttk.Frame(canvas)
+        self.frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.create_window((0, 0), window=self.frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        canvas.pack(side="left", fill="both", expand=True)
+
+        # Cabeçalho do dashboard
+        header_frame = ttk.Frame(self.frame)
+        header_frame.pack(fill=tk.X, pady=10)
+        ttk.Label(header_frame, text="DASHBOARD DE ANÁLISE DE LOGS", font=('Helvetica', 14, 'bold')).pack()
+
+        # Estatísticas gerais
+        stats_frame = ttk.LabelFrame(self.frame, text="📊 Estatísticas Gerais")
+        stats_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.stats_label = ttk.Label(stats_frame, justify=tk.LEFT)
+        self.stats_label.pack(anchor=tk.W)
+
+        # Gráfico 1: distribuição de níveis
+        self.fig_niveis, self.ax_niveis = _figura()
+        self.ax_niveis.set_title('Distribuição de Níveis de Log', pad=10)
+        self.ax_niveis.set_ylabel('Quantidade')
+        self.ax_niveis.grid(axis='y', linestyle='--', alpha=0.7)
+        self._barras = None
+        self._rotulos = []
+
+        # Gráfico 2: logs por hora do dia (24 pontos fixos)
+        self.fig_horas, self.ax_horas = _figura()
+        self.ax_horas.set_title('Logs por Hora do Dia', pad=10)
+        self.ax_horas.set_xlabel('Hora')
+        self.ax_horas.set_ylabel('Quantidade')
+        self.ax_horas.grid(axis='both', linestyle='--', alpha=0.7)
+        self.ax_horas.set_xticks(range(0, 24))
+        zeros = np.zeros(24)
+        self.linha_horas, = self.ax_horas.plot(range(24), zeros, marker='o', color=COR_HORA, linewidth=2.5)
+        self.area_horas = self.ax_horas.fill_between(range(24), zeros, color=COR_HORA, alpha=0.2)
+
+        # Gráfico 3: tipos de erros
+        self.fig_categorias, self.ax_categorias = _figura()
+
+        # Gráfico 4: tendência temporal de erros, com datas no eixo x
+        self.fig_tendencia, self.ax_tendencia = _figura()
+        self.ax_tendencia.set_title('Tendência de Erros ao Longo do Tempo', pad=10)
+        self.ax_tendencia.set_xlabel('Data')
+        self.ax_tendencia.set_ylabel('Erros por dia')
+        self.ax_tendencia.grid(axis='both', linestyle='--', alpha=0.7)
+        self.ax_tendencia.xaxis_date()
+        self.ax_tendencia.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+        self.linha_erros, = self.ax_tendencia.plot([], [], color=COR_ERRO, linewidth=2.5, marker='o')
+        self.linha_media, = self.ax_tendencia.plot([], [], '--', color=COR_MEDIA, label='Média 7 dias')
+        self.aviso_tendencia = self.ax_tendencia.text(0.5, 0.5, 'Nenhuma anomalia detectada', ha='center',
+                                                      va='center', transform=self.ax_tendencia.transAxes)
+
+        # Gráficos em uma grade 2x2
+        self.canvases = {}
+        figuras = [self.fig_niveis, self.fig_horas, self.fig_categorias, self.fig_tendencia]
+        for linha in (figuras[:2], figuras[2:]):
+            fig_frame = ttk.Frame(self.frame)
+            fig_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            for figura in linha:
+                canvas_figura = FigureCanvasTkAgg(figura, master=fig_frame)
+                canvas_figura.get_tk_widget().pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+                self.canvases[figura] = canvas_figura
+
+        # Seção de erros mais frequentes (escondida quando não há erros)
+        self.errors_frame = ttk.LabelFrame(self.frame, text="🔍 Erros Mais Frequentes")
+
+    @property
+    def pontos(self):
+        # Largura em pixels do gráfico de tendência: mais pontos que isso não aparecem
+        largura = int(self.ax_tendencia.bbox.width)
+        return largura if largura > 1 else PONTOS_PADRAO
+
+    def atualizado(self, versao):
+        return self._dados is not None and self._dados.versao == versao
+
+    def em_cache(self, versao):
+        dados = self._cache.get((versao, self.pontos))
+        if dados is not None:
+            self._cache.move_to_end((versao, self.pontos))
+        return dados
+
+    def atualizar(self, dados):
+        # Aplica os dados às figuras existentes; retorna False se nada mudou
+        self._cache[(dados.versao, dados.pontos)] = dados
+        self._cache.move_to_end((dados.versao, dados.pontos))
+        while len(self._cache) > TAMANHO_CACHE:
+            self._cache.popitem(last=False)
+
+        anterior = self._dados
+        if anterior is not None and anterior.versao == dados.versao and anterior.pontos == dados.pontos:
+            return False
+        self._dados = dados
+
+        self.stats_label.configure(text=dados.texto)
+        alteradas = []
+        if anterior is None or not _iguais(anterior.niveis, dados.niveis):
+            self._atualizar_niveis(dados.niveis)
+            alteradas.append(self.fig_niveis)
+        if anterior is None or not _iguais(anterior.horas, dados.horas):
+            self._atualizar_horas(dados.horas)
+            alteradas.append(self.fig_horas)
+        if anterior is None or not _iguais(anterior.categorias, dados.categorias):
+            self._atualizar_categorias(dados.categorias)
+            alteradas.append(self.fig_categorias)
+        if (anterior is None or not _iguais(anterior.erros_por_dia, dados.erros_por_dia)
+                or not _iguais(anterior.media_movel, dados.media_movel)):
+            self._atualizar_tendencia(dados.erros_por_dia, dados.media_movel)
+            alteradas.append(self.fig_tendencia)
+        if anterior is None or not _iguais(anterior.erros_frequentes, dados.erros_frequentes):
+            self._atualizar_erros_frequentes(dados.erros_frequentes)
+
+        for figura in alteradas:
+            self.canvases[figura].draw_idle()
+        return True
+
+    def _atualizar_niveis(self, niveis):
+        ax = self.ax_niveis
+        rotulos = [str(nivel) for nivel in niveis.index]
+        if self._barras is not None and [t.get_text() for t in ax.get_xticklabels()] == rotulos:
+            # Mesmos níveis: só as alturas mudam
+            for barra, valor in zip(self._barras, niveis.values):
+                barra.set_height(valor)
+        else:
+            if self._barras is not None:
+                self._barras.remove()
+            colors = [COR_ERRO if nivel == 'ERROR' else COR_NORMAL for nivel in rotulos]
+            self._barras = ax.bar(range(len(rotulos)), niveis.values, color=colors, width=0.5)
+            ax.set_xticks(range(len(rotulos)), rotulos)
+        for rotulo in self._rotulos:
+            rotulo.remove()
+        self._rotulos = ax.bar_label(self._barras, fmt='%d', padding=2)
+        ax.relim()
+        ax.autoscale_view()
+
+    def _atualizar_horas(self, horas):
+        self.linha_horas.set_ydata(horas.values)
+        self.area_horas.set_data(range(24), horas.values, 0)
+        self.ax_horas.relim()
+        self.ax_horas.autoscale_view()
+
+    def _atualizar_categorias(self, categorias):
+        # O número de fatias muda com os dados: o pie é refeito só neste eixo
+        ax = self.ax_categorias
+        ax.clear()
+        if categorias is not None and not categorias.empty:
+            colors = sns.color_palette("Reds_r", len(categorias))
+            wedges, texts, autotexts = ax.pie(
+                categorias.values,
+                labels=categorias.index,
+                autopct='%1.1f%%',
+                startangle=90,
+                colors=colors,
+                wedgeprops={'linewidth': 1, 'edgecolor': 'white'},
+                textprops={'fontsize': 8}
+            )
+            for autotext in autotexts:
+                autotext.set_color('white')
+                autotext.set_fontweight('bold')
+            ax.axis('equal')
+        else:
+            aviso = 'Nenhum erro categorizado' if categorias is not None else 'Nenhum erro encontrado'
+            ax.text(0.5, 0.5, aviso, ha='center', va='center')
+        ax.set_title(TITULO_ERROS, pad=10)
+
+    def _atualizar_tendencia(self, erros_por_dia, media_movel):
+        ax = self.ax_tendencia
+        tem_erros = erros_por_dia is not None and not erros_por_dia.empty
+        self.aviso_tendencia.set_visible(not tem_erros)
+        self.linha_erros.set_visible(tem_erros)
+        if tem_erros:
+            self.linha_erros.set_data(mdates.date2num(erros_por_dia.index), erros_por_dia.values)
+        tem_media = tem_erros and media_movel is not None
+        self.linha_media.set_visible(tem_media)
+        if tem_media:
+            self.linha_media.set_data(mdates.date2num(media_movel.index), media_movel.values)
+        if ax.get_legend() is not None:
+            ax.get_legend().remove()
+        if tem_media:
+            ax.legend(handles=[self.linha_media])
+        ax.relim(visible_only=True)
+        ax.autoscale_view()
+
+    def _atualizar_erros_frequentes(self, erros_frequentes):
+        for widget in self.errors_frame.winfo_children():
+            widget.destroy()
+        if erros_frequentes is None or erros_frequentes.empty:
+            self.errors_frame.pack_forget()
+            return
+        self.errors_frame.pack(fill=tk.BOTH, padx=10, pady=10)
+
+        for i, (error_msg, count) in enumerate(erros_frequentes.items(), 1):
+            error_frame = ttk.Frame(self.errors_frame)
+            error_frame.pack(fill=tk.X, padx=5, pady=2)
+
+            ttk.Label(error_frame, text=f"{i}.", width=3).pack(side=tk.LEFT)
+            ttk.Label(error_frame, text=f"({count}x)").pack(side=tk.LEFT, padx=5)
+
+            msg_label = ttk.Label(error_frame, text=error_msg[:150] + ("..." if len(error_msg) > 150 else ""),
+                                  wraplength=800, justify=tk.LEFT)
+            msg_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
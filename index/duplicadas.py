@@ -0,0 +1,142 @@
+import itertools
+import numpy as np
+import pandas as pd
+from classificador import CATEGORIAS
+from metricas import medir
+
+# Transações duplicadas: o mesmo item de uma transação (transactionid + itemid)
+# aparecendo de novo dentro de uma janela de tempo. O events.csv tem uma linha por
+# item, então um pedido com vários itens repete o transactionid sem ser repetição;
+# sem a coluna itemid, vale só o transactionid. Os IDs vistos ficam em baldes de
+# tempo e baldes inteiros saem da memória quando ficam mais antigos que a janela,
+# então o consumo depende das transações da janela e não do tamanho do arquivo.
+COLUNA_TRANSACAO = 'transactionid'
+COLUNA_ITEM = 'itemid'
+JANELA_DUPLICADAS_PADRAO = 60 * 60
+BALDES_PADRAO = 60
+_DUPLICADA = CATEGORIAS.index('Duplicada')
+
+
+def chave_transacao(transacoes, itens=None):
+    # Chave int64 do par (transação, item), exata para IDs de até 31 bits (como os
+    # do events.csv); item ausente vale -1. Aceita arrays ou um par de inteiros.
+    transacoes = np.asarray(transacoes, dtype=np.int64)
+    if itens is None:
+        return transacoes
+    return (transacoes << 32) ^ (np.asarray(itens, dtype=np.int64) & 0xFFFFFFFF)
+
+
+class JanelaTransacoes:
+    # IDs de transação dos últimos `janela` segundos com o último instante (em
+    # segundos) de cada um, em baldes de janela/baldes segundos
+    def __init__(self, janela=JANELA_DUPLICADAS_PADRAO, baldes=BALDES_PADRAO):
+        self.janela = janela
+        self.largura = max(janela // baldes, 1)
+        self.ultimo = None
+        # número do balde -> {id: instante}
+        self._baldes = {}
+
+    def __len__(self):
+        return sum(len(balde) for balde in self._baldes.values())
+
+    def repetida(self, transacao, instante):
+        # Linha a linha, para o monitoramento em tempo real; registra a transação
+        repetida = any(abs(instante - balde[transacao]) <= self.janela
+                       for balde in self._baldes.values() if transacao in balde)
+        if self.ultimo is not None and instante < self.ultimo - self.janela:
+            return repetida
+
+        numero = instante // self.largura
+        self._baldes.setdefault(numero, {})[transacao] = instante
+        if self.ultimo is None or instante > self.ultimo:
+            novo_balde = self.ultimo is None or numero > self.ultimo // self.largura
+            self.ultimo = instante
+            if novo_balde:
+                self._expirar()
+        return repetida
+
+    def marcar(self, transacoes, instantes):
+        # Máscara das posições cujo ID já apareceu até `janela` segundos antes, nos
+        # blocos anteriores ou antes no próprio bloco; todas ficam registradas
+        transacoes = np.asarray(transacoes, dtype=np.int64)
+        instantes = np.asarray(instantes, dtype=np.int64)
+        repetidas = np.zeros(len(transacoes), dtype=bool)
+        if not len(transacoes):
+            return repetidas
+
+        # Dentro do bloco: cada ocorrência comparada com a anterior do mesmo ID
+        ordem = np.lexsort((instantes, transacoes))
+        ids, quando = transacoes[ordem], instantes[ordem]
+        repetidas[ordem[1:]] = (ids[1:] == ids[:-1]) & (quando[1:] - quando[:-1] <= self.janela)
+
+        # Blocos anteriores: uma busca só, nos IDs de todos os baldes
+        if self._baldes:
+            vistos, vistos_em = self._vistos()
+            posicoes = np.minimum(np.searchsorted(vistos, transacoes), len(vistos) - 1)
+            repetidas |= (vistos[posicoes] == transacoes) & (np.abs(instantes - vistos_em[posicoes]) <= self.janela)
+
+        self._registrar(transacoes, instantes)
+        return repetidas
+
+    def _vistos(self):
+        # IDs ordenados de todos os baldes com o último instante de cada um
+        total = len(self)
+        ids = np.fromiter(itertools.chain.from_iterable(self._baldes.values()), dtype=np.int64, count=total)
+        quando = np.fromiter(itertools.chain.from_iterable(balde.values() for balde in self._baldes.values()),
+                             dtype=np.int64, count=total)
+        ordem = np.lexsort((quando, ids))
+        ids, quando = ids[ordem], quando[ordem]
+        ultimos = np.append(ids[1:] != ids[:-1], True)
+        return ids[ultimos], quando[ultimos]
+
+    def _registrar(self, transacoes, instantes):
+        maximo = int(instantes.max())
+        self.ultimo = maximo if self.ultimo is None else max(self.ultimo, maximo)
+        # Linhas já fora da janela expirariam em seguida: nem entram
+        recentes = instantes >= self.ultimo - self.janela
+        numeros = instantes[recentes] // self.largura
+        ordem = np.argsort(numeros, kind='stable')
+        numeros = numeros[ordem]
+        transacoes, instantes = transacoes[recentes][ordem], instantes[recentes][ordem]
+
+        cortes = np.flatnonzero(np.diff(numeros)) + 1
+        for inicio, fim in zip(np.r_[0, cortes], np.r_[cortes, len(numeros)]):
+            if inicio == fim:
+                continue
+            numero = int(numeros[inicio])
+            self._baldes.setdefault(numero, {}).update(zip(transacoes[inicio:fim].tolist(),
+                                                           instantes[inicio:fim].tolist()))
+        self._expirar()
+
+    def _expirar(self):
+        # Baldes em que até o instante mais novo possível ficou mais de `janela`
+        # segundos atrás do último instante visto
+        limite = (self.ultimo - self.janela) // self.largura
+        for numero in [numero for numero in self._baldes if numero < limite]:
+            del self._baldes[numero]
+
+
+def marcar_duplicadas(df, janela):
+    # Máscara das linhas cujo item da transação já apareceu na janela
+    # (JanelaTransacoes); essas linhas passam para a categoria Duplicada. Sem a
+    # coluna de IDs (logs que não vieram de transações), nada é marcado.
+    repetidas = np.zeros(len(df), dtype=bool)
+    if COLUNA_TRANSACAO not in df.columns:
+        return repetidas
+
+    with medir('duplicadas', len(df)):
+        validas = df[COLUNA_TRANSACAO].notna().to_numpy()
+        if not validas.any():
+            return repetidas
+        instantes = df['timestamp'].to_numpy()[validas].astype('datetime64[s]').astype(np.int64)
+        itens = None
+        if COLUNA_ITEM in df.columns:
+            itens = df[COLUNA_ITEM].fillna(-1).to_numpy()[validas]
+        chaves = chave_transacao(df[COLUNA_TRANSACAO].to_numpy()[validas].astype(np.int64), itens)
+        repetidas[validas] = janela.marcar(chaves, instantes)
+
+        if repetidas.any() and 'categoria' in df.columns:
+            codigos = df['categoria'].cat.codes.to_numpy().copy()
+            codigos[repetidas] = _DUPLICADA
+            df['categoria'] = pd.Categorical.from_codes(codigos, categories=CATEGORIAS)
+    return repetidas
@@ -1,17 +1,26 @@
 import os
 import pandas as pd
-import random
 from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from tarefas import BarraTarefas
+from ingestao import Quarentena, caminho_quarentena, detectar_codificacao
+from simulador import gravar_csv, ler_transacoes, logs_de_transacoes
+
+# Logs gerados por padrão e linhas mostradas na janela (a exportação grava todos)
+MAX_LOGS_PADRAO = 30
+MAX_EXIBIDOS = 1000
 
 class GeradorLogs:
     def __init__(self, root):
         self.root = root
         self.root.title("Gerador de Logs de Transações (Offline)")
         self.root.geometry("800x600")
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         
-        self.df = None
+        # O events.csv não é carregado: cada geração lê o arquivo em lotes
+        self.caminho_dataset = None
+        self.codificacao = None
         self.df_logs = None
         
         self.create_widgets()
@@ -27,6 +36,11 @@ class GeradorLogs:
         ttk.Button(control_frame, text="Selecionar Arquivo CSV", command=self.load_dataset).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Gerar Logs", command=self.generate_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(control_frame, text="Exportar Logs", command=self.export_logs).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Gerar e Exportar Todos", command=self.export_all).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(control_frame, text="Máximo de logs (0 = todos):").pack(side=tk.LEFT, padx=5)
+        self.max_logs_var = tk.StringVar(value=str(MAX_LOGS_PADRAO))
+        ttk.Entry(control_frame, textvariable=self.max_logs_var, width=8).pack(side=tk.LEFT)
         
         # Visualização dos logs
         log_frame = ttk.LabelFrame(main_frame, text="Logs Gerados")
@@ -35,10 +49,15 @@ class GeradorLogs:
         self.log_text = tk.Text(log_frame, wrap=tk.WORD)
         self.log_text.pack(fill=tk.BOTH, expand=True)
         
-        # Barra de status
+        # Barra de status; leitura e geração rodam fora da thread do Tk
         self.status_var = tk.StringVar()
         self.status_var.set("Pronto - Selecione o arquivo events.csv")
-        ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN).pack(fill=tk.X)
+        self.barra = BarraTarefas(self.root, main_frame, self.status_var)
+        self.barra.frame.pack(fill=tk.X)
+    
+    def close(self):
+        self.barra.encerrar()
+        self.root.destroy()
     
     def load_dataset(self):
         file_path = filedialog.askopenfilename(
@@ -49,54 +68,79 @@ class GeradorLogs:
         if not file_path:
             return
             
-        self.status_var.set("🔄 Carregando arquivo...")
-        self.root.update()
-        
-        try:
-            # Tenta várias codificações comuns
-            encodings = ['utf-8', 'latin1', 'ISO-8859-1', 'cp1252']
-            
-            for encoding in encodings:
-                try:
-                    self.df = pd.read_csv(file_path, encoding=encoding)
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if self.df is None:
-                raise ValueError("Não foi possível determinar a codificação do arquivo")
-            
-            self.status_var.set(f"✅ Arquivo carregado: {os.path.basename(file_path)}")
-            self.log_text.insert(tk.END, "Dataset carregado:\n")
-            self.log_text.insert(tk.END, str(self.df.head()) + "\n")
-        except Exception as e:
-            self.status_var.set(f"Erro: {str(e)}")
-            messagebox.showerror("Erro", 
-                f"Falha ao carregar arquivo: {str(e)}\n\n"
-                "Certifique-se que:\n"
-                "1. Você baixou o arquivo events.csv do dataset\n"
-                "2. O arquivo não está corrompido\n"
-                "3. Tentamos várias codificações de texto")
+        self.barra.executar("🔄 Carregando arquivo...",
+                            lambda progresso: self._ler_dataset(file_path, progresso),
+                            lambda df: self._exibir_dataset(df, file_path),
+                            "Falha ao carregar arquivo. Certifique-se que:\n"
+                            "1. Você baixou o arquivo events.csv do dataset\n"
+                            "2. O arquivo não está corrompido\n\nDetalhes")
+    
+    def _ler_dataset(self, file_path, progresso):
+        # Codificação detectada por amostras do arquivo; a prévia lê só até o
+        # primeiro lote com transações
+        codificacao = detectar_codificacao(file_path)
+        progresso.informar(0.1, f"🔄 Lendo arquivo ({codificacao})...")
+        previa = next(ler_transacoes(file_path, codificacao), None)
+        return codificacao, previa
+    
+    def _exibir_dataset(self, carregado, file_path):
+        self.codificacao, previa = carregado
+        self.caminho_dataset = file_path
+        self.status_var.set(f"✅ Arquivo selecionado: {os.path.basename(file_path)}")
+        self.log_text.insert(tk.END, "Dataset selecionado (primeiras transações):\n")
+        self.log_text.insert(tk.END, ("Nenhuma transação encontrada" if previa is None else str(previa.head())) + "\n")
 
+    def _max_logs(self):
+        # None = o arquivo inteiro
+        try:
+            max_logs = int(self.max_logs_var.get() or 0)
+        except ValueError:
+            raise ValueError("O máximo de logs deve ser um número inteiro")
+        return max_logs if max_logs > 0 else None
+    
+    def _transacoes(self, progresso):
+        # Leitura em lotes do events.csv; linhas malformadas vão para <arquivo>.rejeitadas.csv
+        quarentena = Quarentena(caminho_quarentena(self.caminho_dataset))
+        quarentena.limpar()
+        transacoes = ler_transacoes(self.caminho_dataset, self.codificacao, quarentena,
+                                    ao_progredir=lambda fracao: progresso.informar(fracao))
+        return transacoes, quarentena
+    
     def generate_logs(self):
-        if self.df is None:
+        if self.caminho_dataset is None:
             messagebox.showwarning("Aviso", "Selecione o arquivo CSV primeiro!")
             return
+        try:
+            max_logs = self._max_logs()
+        except ValueError as e:
+            messagebox.showwarning("Aviso", str(e))
+            return
         
-        self.status_var.set("Gerando logs...")
-        self.root.update()
+        self.barra.executar("Gerando logs...",
+                            lambda progresso: self._gerar_logs_simulados(progresso, max_logs),
+                            self._exibir_logs_gerados,
+                            "Falha ao gerar logs")
+    
+    def _exibir_logs_gerados(self, gerado):
+        self.df_logs, quarentena = gerado
+        self.log_text.delete(1.0, tk.END)
         
-        try:
-            self.df_logs = self._gerar_logs_simulados(max_logs=30)
-            self.log_text.delete(1.0, tk.END)
-            
-            for _, row in self.df_logs.iterrows():
-                self.log_text.insert(tk.END, f"{row['timestamp']} - {row['nivel']} - {row['mensagem']}\n")
-            
-            self.status_var.set(f"✅ {len(self.df_logs)} logs gerados!")
-        except Exception as e:
-            self.status_var.set(f"Erro: {str(e)}")
-            messagebox.showerror("Erro", f"Falha ao gerar logs: {str(e)}")
+        exibidos = self.df_logs.head(MAX_EXIBIDOS)
+        if 'transactionid' in exibidos.columns:
+            self.log_text.insert(tk.END, "".join(f"{t} - {n} - {m} (visitante {v}, transação {x})\n"
+                                                 for t, n, m, v, x in
+                                                 zip(exibidos['timestamp'], exibidos['nivel'], exibidos['mensagem'],
+                                                     exibidos['visitorid'], exibidos['transactionid'])))
+        else:
+            self.log_text.insert(tk.END, "".join(f"{t} - {n} - {m}\n" for t, n, m in
+                                                 zip(exibidos['timestamp'], exibidos['nivel'], exibidos['mensagem'])))
+        if len(self.df_logs) > MAX_EXIBIDOS:
+            self.log_text.insert(tk.END, f"\n... {len(self.df_logs) - MAX_EXIBIDOS:,} logs não exibidos\n")
+        
+        self.status_var.set(f"✅ {len(self.df_logs):,} logs gerados!")
+        if quarentena.total:
+            self.status_var.set(f"⚠️ {len(self.df_logs):,} logs gerados ({quarentena.total:,} linhas "
+                                f"malformadas em {quarentena.caminho})")
     
     def export_logs(self):
         if self.df_logs is None:
@@ -111,47 +155,51 @@ class GeradorLogs:
         
         if file_path:
             try:
-                self.df_logs.to_csv(file_path, index=False, encoding='utf-8')
+                gravar_csv(file_path, [self.df_logs])
                 self.status_var.set(f"✅ Logs salvos em: {file_path}")
                 messagebox.showinfo("Sucesso", "Logs exportados com sucesso!")
             except Exception as e:
                 self.status_var.set(f"Erro: {str(e)}")
                 messagebox.showerror("Erro", f"Falha ao exportar: {str(e)}")
     
-    def _gerar_logs_simulados(self, max_logs=30):
-        logs = []
-        if "event" not in self.df.columns:
-            raise ValueError("O arquivo CSV não contém a coluna 'event' necessária")
-            
-        df_transacoes = self.df[self.df["event"] == "transaction"].copy()
-
-        mensagens_error = [
-            "Erro ao processar pagamento com cartão de crédito.",
-            "Timeout na API do gateway de pagamento.",
-            "Discrepância nos valores da transação detectada.",
-            "Falha ao validar dados bancários do cliente.",
-            "Erro interno no sistema de pagamento.",
-            "Transação duplicada identificada no sistema.",
-            "Erro ao calcular total da compra com desconto aplicado."
-        ]
-        mensagens_info = [
-            "Pagamento processado com sucesso.",
-            "Transação concluída sem erros.",
-            "Confirmação de pagamento recebida.",
-            "Pedido finalizado com sucesso.",
-        ]
-
-        for _, row in df_transacoes.head(max_logs).iterrows():
-            nivel = random.choices(["INFO", "ERROR"], weights=[0.7, 0.3])[0]
-            mensagem = random.choice(mensagens_error) if nivel == "ERROR" else random.choice(mensagens_info)
-
-            logs.append({
-                "timestamp": pd.to_datetime(row["timestamp"], unit="ms").strftime('%Y-%m-%d %H:%M:%S'),
-                "nivel": nivel,
-                "mensagem": mensagem
-            })
-
-        return pd.DataFrame(logs)
+    def export_all(self):
+        # Gera os logs de todas as transações e grava direto no CSV, lote a lote,
+        # sem manter os logs nem o dataset em memória
+        if self.caminho_dataset is None:
+            messagebox.showwarning("Aviso", "Selecione o arquivo CSV primeiro!")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Salvar todos os logs como CSV"
+        )
+        
+        if file_path:
+            self.barra.executar("Gerando e exportando logs...",
+                                lambda progresso: self._exportar_todos(file_path, progresso),
+                                lambda exportado: self._exibir_exportacao(exportado, file_path),
+                                "Falha ao exportar logs")
+    
+    def _exportar_todos(self, file_path, progresso):
+        transacoes, quarentena = self._transacoes(progresso)
+        return gravar_csv(file_path, logs_de_transacoes(transacoes)), quarentena
+    
+    def _exibir_exportacao(self, exportado, file_path):
+        total, quarentena = exportado
+        self.status_var.set(f"✅ {total:,} logs salvos em: {file_path}")
+        if quarentena.total:
+            self.status_var.set(f"⚠️ {total:,} logs salvos em: {file_path} ({quarentena.total:,} linhas "
+                                f"malformadas em {quarentena.caminho})")
+        messagebox.showinfo("Sucesso", "Logs exportados com sucesso!")
+    
+    def _gerar_logs_simulados(self, progresso, max_logs=MAX_LOGS_PADRAO):
+        # Uma passada pelo arquivo, que para assim que há transações suficientes
+        transacoes, quarentena = self._transacoes(progresso)
+        blocos = list(logs_de_transacoes(transacoes, max_logs))
+        if not blocos:
+            raise ValueError("O arquivo não contém eventos do tipo 'transaction'")
+        return pd.concat(blocos, ignore_index=True), quarentena
 
 if __name__ == "__main__":
     root = tk.Tk()
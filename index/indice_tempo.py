@@ -0,0 +1,236 @@
+import json
+import mmap
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from ingestao import detectar_codificacao, fim_exclusivo, ler_tabelas
+from motor_analise import CATEGORICAS_LOG, COLUNAS_LOG
+
+# Índice esparso de tempo sobre o CSV bruto: o arquivo é dividido em blocos de
+# cerca de TAMANHO_BLOCO_PADRAO bytes alinhados em quebras de linha e, para cada
+# bloco, guardamos o offset e o menor/maior timestamp. Uma consulta por janela de
+# tempo lê só os blocos que a cobrem, direto do arquivo mapeado em memória, então
+# o custo não depende do tamanho do arquivo. Funciona também com arquivos fora de
+# ordem (só lê mais blocos).
+TAMANHO_BLOCO_PADRAO = 1024 * 1024
+TAMANHO_ASSINATURA = 64 * 1024
+LIMITE_LINHAS_PADRAO = 1000
+VERSAO = 1
+# Blocos sem nenhum timestamp válido nunca são selecionados
+SEM_TEMPO = (np.iinfo(np.int64).max, np.iinfo(np.int64).min)
+
+
+def caminho_indice(caminho):
+    return f"{caminho}.indice.npz"
+
+
+def _microssegundos(momento):
+    # Timestamp.value é sempre em nanossegundos
+    return pd.Timestamp(momento).value // 1000
+
+
+def _assinatura(mapa):
+    # Identifica o conteúdo inicial do arquivo para saber se ele só cresceu
+    return zlib.crc32(mapa[:TAMANHO_ASSINATURA])
+
+
+def _limites(mapa, inicio, tamanho, tamanho_bloco):
+    # Offsets de início de linha a cada ~tamanho_bloco bytes a partir de inicio
+    limites = [inicio]
+    while True:
+        quebra = mapa.find(b'\n', limites[-1] + tamanho_bloco)
+        if quebra < 0 or quebra + 1 >= tamanho:
+            break
+        limites.append(quebra + 1)
+    limites.append(tamanho)
+    return limites
+
+
+class IndiceTempo:
+    def __init__(self, caminho, colunas, codificacao, offsets, minimos, maximos,
+                 tamanho, modificado, assinatura, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        self.caminho = caminho
+        self.colunas = colunas
+        self.codificacao = codificacao
+        # offsets tem um elemento a mais: o bloco i vai de offsets[i] a offsets[i + 1]
+        self.offsets = offsets
+        self.minimos = minimos
+        self.maximos = maximos
+        self.tamanho = tamanho
+        self.modificado = modificado
+        self.assinatura = assinatura
+        self.tamanho_bloco = tamanho_bloco
+
+    @property
+    def blocos(self):
+        return len(self.minimos)
+
+    @property
+    def inicio(self):
+        validos = self.minimos[self.minimos != SEM_TEMPO[0]]
+        return pd.Timestamp(validos.min(), unit='us') if len(validos) else None
+
+    @property
+    def fim(self):
+        validos = self.maximos[self.maximos != SEM_TEMPO[1]]
+        return pd.Timestamp(validos.max(), unit='us') if len(validos) else None
+
+    @staticmethod
+    def construir(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, progresso=None):
+        codificacao = detectar_codificacao(caminho)
+        with open(caminho, 'rb') as f:
+            colunas = f.readline().decode('utf-8-sig' if codificacao == 'utf-8' else codificacao).strip().split(',')
+            cabecalho = f.tell()
+        indice = IndiceTempo(caminho, colunas, codificacao, np.array([cabecalho], dtype=np.int64),
+                             np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), cabecalho, 0, 0,
+                             tamanho_bloco)
+        return indice._indexar(cabecalho, progresso)
+
+    @staticmethod
+    def carregar(caminho):
+        # Índice salvo ao lado do arquivo, ou None se não existir
+        try:
+            with np.load(caminho_indice(caminho)) as dados:
+                meta = json.loads(str(dados['meta']))
+                if meta['versao'] != VERSAO:
+                    return None
+                return IndiceTempo(caminho, meta['colunas'], meta['codificacao'], dados['offsets'],
+                                   dados['minimos'], dados['maximos'], meta['tamanho'], meta['modificado'],
+                                   meta['assinatura'], meta['tamanho_bloco'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @staticmethod
+    def abrir(caminho, tamanho_bloco=TAMANHO_BLOCO_PADRAO, progresso=None):
+        # Carrega o índice salvo; se o arquivo só cresceu desde então, indexa só o
+        # final; se mudou de outra forma (ou não há índice), reconstrói do zero
+        indice = IndiceTempo.carregar(caminho)
+        estado = os.stat(caminho)
+        if indice is not None and (estado.st_size, estado.st_mtime_ns) == (indice.tamanho, indice.modificado):
+            return indice
+
+        if indice is not None and estado.st_size > indice.tamanho and indice.blocos:
+            with open(caminho, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                cresceu = _assinatura(mapa) == indice.assinatura
+            if cresceu:
+                # O último bloco pode ter terminado numa linha incompleta: é refeito
+                inicio = int(indice.offsets[-2])
+                indice.offsets = indice.offsets[:-1]
+                indice.minimos = indice.minimos[:-1]
+                indice.maximos = indice.maximos[:-1]
+                indice._indexar(inicio, progresso)
+                indice.salvar()
+                return indice
+
+        indice = IndiceTempo.construir(caminho, tamanho_bloco, progresso)
+        indice.salvar()
+        return indice
+
+    def _indexar(self, inicio, progresso=None):
+        # Lê só a coluna de timestamp de cada bloco a partir de inicio, em paralelo
+        estado = os.stat(self.caminho)
+        with open(self.caminho, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            limites = _limites(mapa, inicio, estado.st_size, self.tamanho_bloco)
+            assinatura = _assinatura(mapa)
+        buffer = _mapear(self.caminho)
+        blocos = list(zip(limites, limites[1:]))
+
+        def min_max(bloco):
+            minimo, maximo = SEM_TEMPO
+            for tabela in self._tabelas(buffer, *bloco, colunas=['timestamp']):
+                extremos = pc.min_max(tabela['timestamp'].cast(pa.int64()))
+                if extremos['min'].is_valid:
+                    minimo = min(minimo, extremos['min'].as_py())
+                    maximo = max(maximo, extremos['max'].as_py())
+            return minimo, maximo
+
+        extremos = []
+        with ThreadPoolExecutor() as executor:
+            for i, par in enumerate(executor.map(min_max, blocos)):
+                extremos.append(par)
+                if progresso is not None and i % 64 == 0:
+                    progresso.informar(i / max(len(blocos), 1), f"Indexando arquivo... {i:,}/{len(blocos):,} blocos")
+
+        extremos = np.array(extremos, dtype=np.int64).reshape(-1, 2)
+        self.offsets = np.concatenate([self.offsets[:-1], np.array(limites, dtype=np.int64)])
+        self.minimos = np.concatenate([self.minimos, extremos[:, 0]])
+        self.maximos = np.concatenate([self.maximos, extremos[:, 1]])
+        self.tamanho = estado.st_size
+        self.modificado = estado.st_mtime_ns
+        self.assinatura = assinatura
+        return self
+
+    def salvar(self):
+        meta = {'versao': VERSAO, 'colunas': self.colunas, 'codificacao': self.codificacao,
+                'tamanho': self.tamanho, 'modificado': self.modificado, 'assinatura': self.assinatura,
+                'tamanho_bloco': self.tamanho_bloco}
+        # Gravação atômica: um índice pela metade seria carregado como válido
+        temporario = caminho_indice(self.caminho) + '.tmp.npz'
+        np.savez(temporario, offsets=self.offsets, minimos=self.minimos, maximos=self.maximos,
+                 meta=np.array(json.dumps(meta)))
+        os.replace(temporario, caminho_indice(self.caminho))
+
+    def _tabelas(self, buffer, inicio, fim, colunas=COLUNAS_LOG):
+        # Lê [inicio, fim) do arquivo mapeado sem copiar os bytes
+        return ler_tabelas(pa.BufferReader(buffer.slice(inicio, fim - inicio)), colunas=colunas,
+                           nomes=self.colunas, categoricas=[c for c in CATEGORICAS_LOG if c in colunas],
+                           timestamps=['timestamp'], codificacao=self.codificacao, usar_threads=False)
+
+    def intervalos(self, inicio=None, fim=None):
+        # Intervalos de bytes [a, b) que podem conter linhas da janela; blocos
+        # vizinhos são juntados para ler tudo de uma vez
+        selecionados = np.ones(self.blocos, dtype=bool)
+        if inicio is not None:
+            selecionados &= self.maximos >= _microssegundos(inicio)
+        if fim is not None:
+            selecionados &= self.minimos < _microssegundos(fim_exclusivo(fim))
+
+        intervalos = []
+        for i in np.flatnonzero(selecionados):
+            a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+            if intervalos and intervalos[-1][1] == a:
+                intervalos[-1] = (intervalos[-1][0], b)
+            else:
+                intervalos.append((a, b))
+        return intervalos
+
+    def ler(self, inicio=None, fim=None, limite=LIMITE_LINHAS_PADRAO):
+        # Linhas com timestamp em [inicio, fim], na ordem do arquivo, até `limite`
+        # linhas (None lê todas); um fim só com a data inclui o dia inteiro
+        limite_fim = None if fim is None else _escalar(fim_exclusivo(fim))
+        tabelas = []
+        linhas = 0
+        buffer = _mapear(self.caminho)
+        for a, b in self.intervalos(inicio, fim):
+            for tabela in self._tabelas(buffer, a, b):
+                if inicio is not None:
+                    tabela = tabela.filter(pc.greater_equal(tabela['timestamp'], _escalar(inicio)))
+                if fim is not None:
+                    tabela = tabela.filter(pc.less(tabela['timestamp'], limite_fim))
+                tabelas.append(tabela)
+                linhas += tabela.num_rows
+                if limite is not None and linhas >= limite:
+                    break
+            if limite is not None and linhas >= limite:
+                break
+
+        if not tabelas:
+            return pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[us]'),
+                                 'nivel': pd.Categorical([]), 'mensagem': pd.Categorical([])})
+        df = pa.concat_tables(tabelas).unify_dictionaries().to_pandas()
+        return df if limite is None else df.head(limite)
+
+
+def _mapear(caminho):
+    # Arquivo inteiro mapeado em memória como um buffer do pyarrow; as fatias
+    # lidas não copiam bytes e o sistema só carrega as páginas acessadas
+    with pa.memory_map(caminho) as mapa:
+        return mapa.read_buffer()
+
+
+def _escalar(momento):
+    return pa.scalar(pd.Timestamp(momento).to_pydatetime(), type=pa.timestamp('us'))
@@ -0,0 +1,233 @@
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# Leitura de CSVs grandes com o leitor do pyarrow (multithread, tipos explícitos).
+# A codificação é detectada por amostras do arquivo, os timestamps são lidos com
+# um formato conhecido e as linhas malformadas vão para um arquivo de quarentena
+# em vez de interromper a leitura.
+CODIFICACOES = ['utf-8', 'cp1252', 'latin1']
+TAMANHO_AMOSTRA = 64 * 1024
+FORMATO_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+TAMANHO_LOTE_PADRAO = 200_000
+# Limites do bloco de bytes que cada thread do leitor converte de uma vez
+BLOCO_MINIMO = 1024 * 1024
+BLOCO_MAXIMO = 64 * 1024 * 1024
+UNIDADE_TIMESTAMP = 'us'
+# formato_timestamp também pode ser uma destas unidades: inteiro desde 1970
+# (ex.: 'ms' nos timestamps do events.csv)
+UNIDADES_EPOCA = ('s', 'ms', 'us', 'ns')
+
+
+def _amostras(caminho, tamanho_amostra=TAMANHO_AMOSTRA):
+    # Início, meio e fim do arquivo: um byte fora do UTF-8 costuma aparecer em
+    # qualquer parte, não só nas primeiras linhas
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, 'rb') as f:
+        amostras = [f.read(tamanho_amostra)]
+        for posicao in (tamanho // 2, tamanho - tamanho_amostra):
+            if posicao > tamanho_amostra:
+                f.seek(posicao)
+                f.readline()
+                amostras.append(f.read(tamanho_amostra))
+    return amostras
+
+
+def _decodifica(amostra, codificacao):
+    # A amostra pode terminar no meio de um caractere multibyte
+    try:
+        amostra.decode(codificacao)
+        return True
+    except UnicodeDecodeError as e:
+        return codificacao == 'utf-8' and e.start >= len(amostra) - 3 and e.reason == 'unexpected end of data'
+
+
+def detectar_codificacao(caminho, tamanho_amostra=TAMANHO_AMOSTRA):
+    amostras = _amostras(caminho, tamanho_amostra)
+    if amostras[0].startswith(b'\xef\xbb\xbf'):
+        return 'utf-8'
+    if amostras[0].startswith((b'\xff\xfe', b'\xfe\xff')):
+        return 'utf-16'
+    for codificacao in CODIFICACOES:
+        if all(_decodifica(amostra, codificacao) for amostra in amostras):
+            return codificacao
+    # latin1 decodifica qualquer sequência de bytes; não deve chegar aqui
+    return CODIFICACOES[-1]
+
+
+def ler_cabecalho(caminho, codificacao=None):
+    # Nomes das colunas na primeira linha do CSV
+    codificacao = codificacao or detectar_codificacao(caminho)
+    with open(caminho, 'rb') as f:
+        linha = f.readline()
+    return linha.decode('utf-8-sig' if codificacao == 'utf-8' else codificacao).strip().split(',')
+
+
+def _tamanho_bloco(caminho, tamanho_lote):
+    # Bytes por bloco para que cada lote tenha cerca de tamanho_lote linhas
+    amostra = _amostras(caminho)[0]
+    bytes_por_linha = len(amostra) / max(amostra.count(b'\n'), 1)
+    return int(min(max(bytes_por_linha * tamanho_lote, BLOCO_MINIMO), BLOCO_MAXIMO))
+
+
+def fim_exclusivo(fim):
+    # Fim de um período como limite exclusivo (timestamp < limite). Uma data sem
+    # hora ('2015-06-02') inclui o dia inteiro; um instante com hora continua incluído.
+    momento = pd.Timestamp(fim)
+    if isinstance(fim, str) and re.fullmatch(r'\s*\d{4}[-/]\d{1,2}[-/]\d{1,2}\s*', fim):
+        return momento + pd.Timedelta(days=1)
+    return momento + pd.Timedelta(microseconds=1)
+
+
+def caminho_quarentena(caminho):
+    # logs.csv -> logs.rejeitadas.csv, ao lado do arquivo de origem
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}.rejeitadas{extensao or '.csv'}"
+
+
+class Quarentena:
+    # Arquivo com as linhas que não puderam ser lidas (colunas a mais ou a menos,
+    # timestamp inválido). É criado só quando a primeira linha é rejeitada e
+    # aberto em modo append, então vários processos podem gravar no mesmo arquivo.
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado['_lock']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def limpar(self):
+        # Remove a quarentena de uma leitura anterior do mesmo arquivo
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+    def registrar(self, linhas):
+        if not linhas:
+            return
+        texto = ''.join(linha if linha.endswith('\n') else linha + '\n' for linha in linhas)
+        # O leitor chama o callback de linhas inválidas a partir de várias threads
+        with self._lock:
+            # Uma única escrita em modo append por lote de linhas
+            with open(self.caminho, 'ab', buffering=0) as f:
+                f.write(texto.encode('utf-8'))
+            self.total += len(linhas)
+
+    def linha_invalida(self, linha):
+        # invalid_row_handler do pyarrow: grava a linha e segue a leitura
+        self.registrar([linha.text])
+        return 'skip'
+
+
+def _converter_texto(texto, formato):
+    # Formato conhecido primeiro (rápido, sem inferência); outros formatos ISO só
+    # nas linhas que não casaram
+    datas = pc.strptime(texto, format=formato, unit=UNIDADE_TIMESTAMP, error_is_null=True)
+    falhas = pc.and_(pc.is_null(datas), pc.is_valid(texto))
+    if pc.any(falhas).as_py():
+        indices = np.flatnonzero(falhas.to_numpy(zero_copy_only=False))
+        outras = pd.to_datetime(pd.Series(pc.take(texto, indices).to_pylist()), format='ISO8601',
+                                errors='coerce', utc=False)
+        valores = datas.to_numpy(zero_copy_only=False).astype(f'datetime64[{UNIDADE_TIMESTAMP}]')
+        valores[indices] = outras.to_numpy(dtype=f'datetime64[{UNIDADE_TIMESTAMP}]')
+        datas = pa.array(valores, type=pa.timestamp(UNIDADE_TIMESTAMP), from_pandas=True)
+    return datas
+
+
+def _converter_epoca(texto, unidade):
+    # Inteiros desde 1970 na unidade dada; o que não for inteiro vira nulo
+    texto = pc.utf8_trim_whitespace(texto)
+    inteiros = pc.match_substring_regex(texto, r'^-?\d{1,18}$')
+    numeros = pc.cast(pc.if_else(inteiros, texto, pa.scalar(None, pa.string())), pa.int64())
+    return pc.cast(numeros, pa.timestamp(unidade)).cast(pa.timestamp(UNIDADE_TIMESTAMP), safe=False)
+
+
+def _converter_timestamps(tabela, coluna, formato, quarentena):
+    # Texto no formato dado ou inteiro desde 1970 (formato em UNIDADES_EPOCA);
+    # o que não for data vai para a quarentena
+    texto = tabela[coluna]
+    if formato in UNIDADES_EPOCA:
+        datas = _converter_epoca(texto, formato)
+    else:
+        datas = _converter_texto(texto, formato)
+
+    invalidas = pc.is_null(datas)
+    if pc.any(invalidas).as_py():
+        if quarentena is not None:
+            quarentena.registrar(_linhas_csv(tabela.filter(invalidas)))
+        datas = pc.filter(datas, pc.invert(invalidas))
+        tabela = tabela.filter(pc.invert(invalidas))
+    return tabela.set_column(tabela.schema.get_field_index(coluna), coluna, datas)
+
+
+def _linhas_csv(tabela):
+    # Linhas rejeitadas depois do parse voltam a ser texto CSV
+    tabela = tabela.cast(pa.schema([
+        pa.field(campo.name, campo.type.value_type if pa.types.is_dictionary(campo.type) else campo.type)
+        for campo in tabela.schema]))
+    saida = pa.BufferOutputStream()
+    pacsv.write_csv(tabela, saida, pacsv.WriteOptions(include_header=False, quoting_style='needed'))
+    return saida.getvalue().to_pybytes().decode('utf-8').splitlines()
+
+
+def ler_lotes(origem, **opcoes):
+    # Lê um CSV em DataFrames de cerca de tamanho_lote linhas (ver ler_tabelas)
+    for tabela in ler_tabelas(origem, **opcoes):
+        yield tabela.to_pandas()
+
+
+def ler_tabela(caminho, **opcoes):
+    # Arquivo inteiro em um DataFrame (ex.: o dataset do gerador de logs); os
+    # dicionários das colunas categóricas são unificados entre os lotes
+    tabelas = list(ler_tabelas(caminho, **opcoes))
+    if not tabelas:
+        raise ValueError(f"Nenhuma linha válida em {caminho}")
+    return pa.concat_tables(tabelas).unify_dictionaries().to_pandas()
+
+
+def ler_tabelas(origem, colunas=None, nomes=None, categoricas=(), timestamps=(),
+                formato_timestamp=FORMATO_TIMESTAMP, codificacao=None, quarentena=None,
+                tamanho_lote=TAMANHO_LOTE_PADRAO, usar_threads=True, tipos=None):
+    # Tabelas do pyarrow com cerca de tamanho_lote linhas cada.
+    # origem: caminho ou arquivo binário já aberto (ex.: um intervalo de bytes)
+    # colunas: colunas lidas (as demais nem são convertidas)
+    # nomes: nomes das colunas quando a origem não tem cabeçalho
+    # categoricas: colunas lidas como dicionário (viram categorias no pandas)
+    # timestamps: colunas convertidas com formato_timestamp
+    # tipos: tipos pyarrow de outras colunas (ex.: IDs que podem vir vazios no
+    # primeiro bloco e seriam inferidos como nulos)
+    # quarentena: Quarentena para as linhas malformadas (None descarta)
+    tamanho_bloco = BLOCO_MINIMO * 16
+    if isinstance(origem, (str, os.PathLike)):
+        codificacao = codificacao or detectar_codificacao(origem)
+        tamanho_bloco = _tamanho_bloco(origem, tamanho_lote)
+
+    tipos = dict(tipos or {})
+    tipos.update({coluna: pa.dictionary(pa.int32(), pa.string()) for coluna in categoricas})
+    tipos.update({coluna: pa.string() for coluna in timestamps})
+    leitor = pacsv.open_csv(
+        origem,
+        read_options=pacsv.ReadOptions(use_threads=usar_threads, block_size=tamanho_bloco,
+                                       column_names=nomes, encoding=codificacao or 'utf-8'),
+        parse_options=pacsv.ParseOptions(
+            invalid_row_handler=quarentena.linha_invalida if quarentena is not None else lambda linha: 'skip'),
+        convert_options=pacsv.ConvertOptions(column_types=tipos, include_columns=colunas,
+                                             strings_can_be_null=True))
+
+    for lote in leitor:
+        tabela = pa.Table.from_batches([lote])
+        for coluna in timestamps:
+            tabela = _converter_timestamps(tabela, coluna, formato_timestamp, quarentena)
+        if tabela.num_rows:
+            yield tabela
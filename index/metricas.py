@@ -0,0 +1,204 @@
+import json
+import logging
+import numbers
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INTERVALO_AMOSTRAGEM = 0.01
+PORTA_PADRAO = 9464
+logger = logging.getLogger('cona.metricas')
+
+
+def _valor_prometheus(valor):
+    # Contadores inteiros sem arredondar (rate() depende dos valores exatos); os
+    # demais com todos os dígitos do float
+    if isinstance(valor, numbers.Integral):
+        return str(valor)
+    return repr(float(valor))
+
+
+def memoria_mb():
+    # Memória residente atual, lida de /proc no Linux (ru_maxrss só dá o pico do processo)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Medicao:
+    # Uma execução de uma etapa. `linhas` pode ser preenchido dentro do bloco
+    # medido, quando a quantidade só é conhecida depois (ex.: leitura de um chunk).
+    def __init__(self, etapa, linhas=None):
+        self.etapa = etapa
+        self.linhas = linhas
+        self.segundos = None
+        self.memoria_pico_mb = memoria_mb()
+
+    def registro(self):
+        linhas_por_s = None
+        if self.linhas is not None and self.segundos:
+            linhas_por_s = round(self.linhas / self.segundos)
+        return {'etapa': self.etapa, 'segundos': round(self.segundos, 6), 'linhas': self.linhas,
+                'linhas_por_s': linhas_por_s, 'memoria_pico_mb': round(self.memoria_pico_mb, 1)}
+
+
+class Metricas:
+    # Totais por etapa (execuções, tempo, linhas e pico de memória). Uma única
+    # thread amostra a memória enquanto houver etapas em andamento, inclusive
+    # etapas aninhadas ou em threads diferentes.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etapas = {}
+        self._abertas = set()
+        self._amostrador = None
+
+    @contextmanager
+    def medir(self, etapa, linhas=None):
+        medicao = Medicao(etapa, linhas)
+        self._abrir(medicao)
+        inicio = time.perf_counter()
+        try:
+            yield medicao
+        finally:
+            medicao.segundos = time.perf_counter() - inicio
+            self._fechar(medicao)
+            self._registrar(medicao)
+
+    def medir_iteracao(self, etapa, iteravel):
+        # Mede o tempo gasto para produzir cada item (ex.: chunks de um leitor);
+        # o tempo de quem consome os itens fica de fora
+        iterador = iter(iteravel)
+        while True:
+            with self.medir(etapa) as medicao:
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    medicao.linhas = 0
+                    return
+                medicao.linhas = len(item)
+            yield item
+
+    def _abrir(self, medicao):
+        with self._lock:
+            self._abertas.add(medicao)
+            if self._amostrador is None:
+                self._amostrador = threading.Thread(target=self._amostrar, name='metricas', daemon=True)
+                self._amostrador.start()
+
+    def _fechar(self, medicao):
+        memoria = memoria_mb()
+        with self._lock:
+            self._abertas.discard(medicao)
+            medicao.memoria_pico_mb = max(medicao.memoria_pico_mb, memoria)
+
+    def _amostrar(self):
+        while True:
+            time.sleep(INTERVALO_AMOSTRAGEM)
+            memoria = memoria_mb()
+            with self._lock:
+                if not self._abertas:
+                    self._amostrador = None
+                    return
+                for medicao in self._abertas:
+                    medicao.memoria_pico_mb = max(medicao.memoria_pico_mb, memoria)
+
+    def _registrar(self, medicao):
+        registro = medicao.registro()
+        with self._lock:
+            totais = self._etapas.setdefault(medicao.etapa, {
+                'execucoes': 0, 'segundos': 0.0, 'linhas': 0, 'ultima_duracao': 0.0, 'memoria_pico_mb': 0.0})
+            totais['execucoes'] += 1
+            totais['segundos'] += medicao.segundos
+            totais['linhas'] += medicao.linhas or 0
+            totais['ultima_duracao'] = medicao.segundos
+            totais['memoria_pico_mb'] = max(totais['memoria_pico_mb'], medicao.memoria_pico_mb)
+        # Log estruturado: uma linha JSON por execução de etapa
+        logger.info(json.dumps(registro, ensure_ascii=False))
+
+    def resumo(self):
+        with self._lock:
+            return {etapa: dict(totais) for etapa, totais in self._etapas.items()}
+
+    def combinar(self, resumo):
+        # Soma os totais medidos em outro processo (ver MotorAnalise.analisar_arquivos)
+        with self._lock:
+            for etapa, outros in resumo.items():
+                totais = self._etapas.get(etapa)
+                if totais is None:
+                    self._etapas[etapa] = dict(outros)
+                    continue
+                for chave in ('execucoes', 'segundos', 'linhas'):
+                    totais[chave] += outros[chave]
+                totais['ultima_duracao'] = outros['ultima_duracao']
+                totais['memoria_pico_mb'] = max(totais['memoria_pico_mb'], outros['memoria_pico_mb'])
+
+    def limpar(self):
+        with self._lock:
+            self._etapas.clear()
+
+    def formatar_prometheus(self):
+        # Formato de exposição em texto do Prometheus
+        resumo = self.resumo()
+        series = [
+            ('cona_etapa_execucoes_total', 'counter', "Execuções de cada etapa",
+             lambda t: t['execucoes']),
+            ('cona_etapa_segundos_total', 'counter', "Tempo de parede acumulado de cada etapa",
+             lambda t: t['segundos']),
+            ('cona_etapa_linhas_total', 'counter', "Linhas de log processadas por cada etapa",
+             lambda t: t['linhas']),
+            ('cona_etapa_linhas_por_segundo', 'gauge', "Vazão média de cada etapa",
+             lambda t: t['linhas'] / t['segundos'] if t['segundos'] else 0),
+            ('cona_etapa_ultima_duracao_segundos', 'gauge', "Duração da última execução de cada etapa",
+             lambda t: t['ultima_duracao']),
+            ('cona_etapa_memoria_pico_bytes', 'gauge', "Maior memória residente observada durante cada etapa",
+             lambda t: t['memoria_pico_mb'] * 1024 * 1024),
+        ]
+        linhas = []
+        for nome, tipo, ajuda, valor in series:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for etapa in sorted(resumo):
+                linhas.append(f'{nome}{{etapa="{etapa}"}} {_valor_prometheus(valor(resumo[etapa]))}')
+        return "\n".join(linhas) + "\n"
+
+    def gravar_prometheus(self, caminho):
+        # Arquivo para o textfile collector do node_exporter; a troca atômica evita
+        # que o coletor leia um arquivo pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(self.formatar_prometheus())
+        os.replace(temporario, caminho)
+
+    def servir_http(self, porta=PORTA_PADRAO, endereco='127.0.0.1'):
+        # Expõe /metrics em uma thread em segundo plano; retorna o servidor
+        metricas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                corpo = metricas.formatar_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((endereco, porta), Handler)
+        threading.Thread(target=servidor.serve_forever, name='metricas-http', daemon=True).start()
+        return servidor
+
+
+# Registro global usado pelas etapas instrumentadas do projeto
+METRICAS = Metricas()
+medir = METRICAS.medir
+medir_iteracao = METRICAS.medir_iteracao
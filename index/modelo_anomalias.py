@@ -0,0 +1,273 @@
+import abc
+import os
+import time
+import numpy as np
+import pandas as pd
+from metricas import medir
+
+# scikit-learn, scipy e joblib levam quase um segundo para importar: são
+# importados só quando um detector é criado, usado ou carregado, para que quem
+# só precisa das constantes (ex.: as opções da linha de comando) não pague por isso
+CAMINHO_MODELO_PADRAO = os.path.join(os.path.expanduser('~'), '.cona', 'modelo_anomalias.joblib')
+INTERVALO_RETREINO_PADRAO = 24 * 60 * 60
+TAMANHO_LOTE_PADRAO = 50_000
+LIMITE_AMOSTRAS_PADRAO = 200_000
+# O One-Class SVM com kernel RBF tem treino quadrático nas amostras distintas
+LIMITE_AMOSTRAS_SVM = 20_000
+DETECTOR_PADRAO = 'sgd'
+
+
+def caracteristicas_temporais(df):
+    # Para cada linha: taxa de erros no minuto, log de logs no minuto e log de erros no minuto
+    minuto = df['timestamp'].dt.floor('min')
+    erro = (df['nivel'] == 'ERROR').to_numpy()
+    grupos = pd.Series(erro, index=df.index).groupby(minuto.to_numpy())
+    total = grupos.transform('size').to_numpy(dtype=float)
+    erros = grupos.transform('sum').to_numpy(dtype=float)
+    return np.column_stack([erros / total, np.log1p(total), np.log1p(erros)])
+
+
+class ModeloAnomalias(abc.ABC):
+    # Interface comum dos detectores de anomalias, que implementam _ajustar e
+    # _prever. Cada detector vê o texto da mensagem (vetorizado por hashing,
+    # esparso) e as características temporais do minuto em que o log ocorreu.
+    # Linhas com a mesma mensagem no mesmo minuto são idênticas para o modelo,
+    # então viram uma única amostra com peso.
+    nome = None
+    incremental = False
+
+    # peso_tempo reduz a escala das características temporais para que não
+    # dominem as de texto, que têm norma 1
+    def __init__(self, n_features=2 ** 16, peso_tempo=0.1, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                 limite_amostras=LIMITE_AMOSTRAS_PADRAO, random_state=0):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vetorizador = HashingVectorizer(n_features=n_features, alternate_sign=False, norm='l2')
+        self.peso_tempo = peso_tempo
+        self.tamanho_lote = tamanho_lote
+        self.limite_amostras = limite_amostras
+        self.random_state = random_state
+        self.treinado_em = None
+        self.amostras_vistas = 0
+
+    @property
+    def treinado(self):
+        return self.treinado_em is not None
+
+    @abc.abstractmethod
+    def _ajustar(self, X, pesos):
+        pass
+
+    @abc.abstractmethod
+    def _prever(self, X):
+        pass
+
+    def _matriz(self, mensagens, temporais):
+        from scipy import sparse
+
+        with medir('vetorizacao', len(mensagens)):
+            X = self.vetorizador.transform([str(m) for m in mensagens])
+            if temporais is None:
+                return X
+            return sparse.hstack([X, sparse.csr_matrix(temporais * self.peso_tempo)], format='csr')
+
+    def _amostras(self, df):
+        # Agrupa as linhas de erro por (mensagem, minuto) e devolve as amostras
+        # distintas, seus pesos e o índice de cada linha na lista de amostras
+        with medir('amostras', len(df)):
+            erro = (df['nivel'] == 'ERROR').to_numpy() & df['mensagem'].notna().to_numpy()
+            temporais = caracteristicas_temporais(df)[erro]
+            linhas = df[erro]
+            chave = pd.MultiIndex.from_arrays([linhas['mensagem'].to_numpy(),
+                                               linhas['timestamp'].dt.floor('min').to_numpy()])
+            codigos, distintas = pd.factorize(chave)
+            primeira = np.unique(codigos, return_index=True)[1]
+            pesos = np.bincount(codigos, minlength=len(distintas)).astype(float)
+            mensagens = distintas.get_level_values(0)
+            return erro, mensagens, temporais[primeira], pesos, codigos
+
+    def treinar(self, mensagens, pesos=None, temporais=None):
+        # Também serve para atualizar um modelo já treinado com novos logs
+        for inicio in range(0, len(mensagens), self.tamanho_lote):
+            fim = inicio + self.tamanho_lote
+            X = self._matriz(mensagens[inicio:fim], None if temporais is None else temporais[inicio:fim])
+            with medir('treino', X.shape[0]):
+                self._ajustar(X, None if pesos is None else np.asarray(pesos[inicio:fim], dtype=float))
+            self.amostras_vistas += X.shape[0]
+        self.treinado_em = time.time()
+        return self
+
+    def pontuar(self, mensagens, temporais=None):
+        # Retorna -1 para anomalias e 1 para amostras normais, sem reajustar o modelo
+        if not self.treinado:
+            raise ValueError("O modelo de anomalias ainda não foi treinado")
+        predicoes = []
+        for i in range(0, len(mensagens), self.tamanho_lote):
+            X = self._matriz(mensagens[i:i + self.tamanho_lote],
+                             None if temporais is None else temporais[i:i + self.tamanho_lote])
+            with medir('predicao', X.shape[0]):
+                predicoes.append(self._prever(X))
+        return np.concatenate(predicoes) if predicoes else np.zeros(0, dtype=int)
+
+    def treinar_logs(self, df):
+        # Detectores não incrementais treinam do zero: no máximo limite_amostras
+        # amostras distintas, sorteadas, para o custo não crescer com o volume
+        _, mensagens, temporais, pesos, _ = self._amostras(df)
+        if not self.incremental and len(mensagens) > self.limite_amostras:
+            sorteador = np.random.default_rng(self.random_state)
+            sorteio = np.sort(sorteador.choice(len(mensagens), self.limite_amostras, replace=False))
+            mensagens = np.asarray(mensagens, dtype=object)[sorteio]
+            temporais, pesos = temporais[sorteio], pesos[sorteio]
+        if len(mensagens):
+            self.treinar(mensagens, pesos, temporais)
+        return self
+
+    def treinar_chunks(self, chunks):
+        # Detectores incrementais treinam bloco a bloco; os demais usam uma amostra
+        # limitada a limite_amostras, já que só veem poucas amostras por árvore/vetor
+        if self.incremental:
+            for chunk in chunks:
+                self.treinar_logs(chunk)
+            return self
+
+        partes = []
+        total = 0
+        for chunk in chunks:
+            _, mensagens, temporais, pesos, _ = self._amostras(chunk)
+            partes.append((np.asarray(mensagens, dtype=object), temporais, pesos))
+            total += len(mensagens)
+            if total >= self.limite_amostras:
+                break
+        if partes:
+            mensagens, temporais, pesos = (np.concatenate(parte) for parte in zip(*partes))
+            self.treinar(mensagens[:self.limite_amostras], pesos[:self.limite_amostras],
+                         temporais[:self.limite_amostras])
+        return self
+
+    def pontuar_logs(self, df):
+        # Máscara (por linha de df) dos logs de erro considerados anômalos
+        anomalos = np.zeros(len(df), dtype=bool)
+        erro, mensagens, temporais, _, codigos = self._amostras(df)
+        if len(mensagens):
+            anomalos[erro] = (self.pontuar(mensagens, temporais) == -1)[codigos]
+        return anomalos
+
+    def precisa_retreinar(self, intervalo=INTERVALO_RETREINO_PADRAO):
+        return not self.treinado or time.time() - self.treinado_em >= intervalo
+
+    def salvar(self, caminho=CAMINHO_MODELO_PADRAO):
+        import joblib
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        # Grava em arquivo temporário para não corromper o modelo em caso de falha
+        temporario = caminho + '.tmp'
+        joblib.dump(self, temporario)
+        os.replace(temporario, caminho)
+
+    @staticmethod
+    def carregar(caminho=CAMINHO_MODELO_PADRAO):
+        import joblib
+
+        modelo = joblib.load(caminho)
+        if not isinstance(modelo, ModeloAnomalias):
+            raise ValueError(f"O arquivo {caminho} não contém um modelo de anomalias")
+        return modelo
+
+
+class DetectorSGD(ModeloAnomalias):
+    # One-Class SVM linear treinado por gradiente estocástico (partial_fit)
+    nome = 'sgd'
+    incremental = True
+
+    def __init__(self, nu=0.1, **kwargs):
+        from sklearn.linear_model import SGDOneClassSVM
+
+        super().__init__(**kwargs)
+        self.modelo = SGDOneClassSVM(nu=nu, random_state=self.random_state)
+
+    def _ajustar(self, X, pesos):
+        self.modelo.partial_fit(X, sample_weight=pesos)
+
+    def _prever(self, X):
+        return self.modelo.predict(X)
+
+
+class DetectorIsolationForest(ModeloAnomalias):
+    # Isolation Forest sobre as características esparsas; cada árvore usa só
+    # max_samples amostras, então o custo de treino não cresce com o volume
+    nome = 'isolation'
+
+    def __init__(self, n_estimators=100, contamination=0.1, n_features=2 ** 10, **kwargs):
+        from sklearn.ensemble import IsolationForest
+
+        super().__init__(n_features=n_features, **kwargs)
+        self.modelo = IsolationForest(n_estimators=n_estimators, contamination=contamination,
+                                      random_state=self.random_state)
+
+    def _ajustar(self, X, pesos):
+        self.modelo.fit(X.tocsc(), sample_weight=pesos)
+
+    def _prever(self, X):
+        return self.modelo.predict(X.tocsc())
+
+
+class DetectorSVM(ModeloAnomalias):
+    # One-Class SVM com kernel RBF, o algoritmo original; não escala além de
+    # algumas dezenas de milhares de amostras distintas
+    nome = 'svm'
+
+    def __init__(self, nu=0.1, limite_amostras=LIMITE_AMOSTRAS_SVM, **kwargs):
+        from sklearn.svm import OneClassSVM
+
+        super().__init__(limite_amostras=limite_amostras, **kwargs)
+        self.modelo = OneClassSVM(gamma='auto', nu=nu)
+
+    def _ajustar(self, X, pesos):
+        self.modelo.fit(X, sample_weight=pesos)
+
+    def _prever(self, X):
+        return self.modelo.predict(X)
+
+
+DETECTORES = {detector.nome: detector for detector in (DetectorSGD, DetectorIsolationForest, DetectorSVM)}
+
+
+def criar_detector(nome=DETECTOR_PADRAO, **kwargs):
+    if nome not in DETECTORES:
+        raise ValueError(f"Detector desconhecido: {nome} (opções: {', '.join(DETECTORES)})")
+    return DETECTORES[nome](**kwargs)
+
+
+def carregar_ou_treinar(df, caminho=CAMINHO_MODELO_PADRAO, intervalo=INTERVALO_RETREINO_PADRAO,
+                        detector=DETECTOR_PADRAO):
+    # Reaproveita o modelo salvo; só atualiza quando o intervalo de retreino venceu
+    # (de forma incremental quando o detector permite) e só treina do zero quando
+    # não há modelo salvo do detector escolhido
+    return _carregar_ou_treinar(lambda modelo: modelo.treinar_logs(df), caminho, intervalo, detector)
+
+
+def carregar_ou_treinar_chunks(chunks, caminho=CAMINHO_MODELO_PADRAO, intervalo=INTERVALO_RETREINO_PADRAO,
+                               detector=DETECTOR_PADRAO):
+    # Como carregar_ou_treinar, treinando bloco a bloco; os blocos só são lidos se
+    # for preciso treinar. None quando não há modelo e os blocos não têm erros.
+    modelo = _carregar_ou_treinar(lambda modelo: modelo.treinar_chunks(chunks), caminho, intervalo, detector)
+    return modelo if modelo.treinado else None
+
+
+def _carregar_ou_treinar(treinar, caminho, intervalo, detector):
+    modelo = None
+    if os.path.exists(caminho):
+        modelo = ModeloAnomalias.carregar(caminho)
+        if modelo.nome != detector:
+            modelo = None
+        elif not modelo.precisa_retreinar(intervalo):
+            return modelo
+
+    if modelo is None or not modelo.incremental:
+        modelo = criar_detector(detector)
+    treinar(modelo)
+    if modelo.treinado:
+        modelo.salvar(caminho)
+    return modelo
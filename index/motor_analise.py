@@ -0,0 +1,349 @@
+import io
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+from agregados import IndiceAgregado
+from classificador import CATEGORIAS, DicionarioTemplates, classificar_logs, contar_categorias
+from duplicadas import JANELA_DUPLICADAS_PADRAO, JanelaTransacoes, marcar_duplicadas
+from ingestao import (FORMATO_TIMESTAMP, Quarentena, caminho_quarentena, detectar_codificacao, ler_cabecalho,
+                      ler_lotes)
+from metricas import METRICAS, medir, medir_iteracao
+
+COLUNAS_LOG = ['timestamp', 'nivel', 'mensagem']
+# Nível e mensagem se repetem muito: lidos como categorias em vez de strings
+TIPOS_LOG = {'nivel': 'category', 'mensagem': 'category'}
+CATEGORICAS_LOG = ['nivel', 'mensagem']
+# IDs das transações: só existem nos logs gerados a partir do dataset de eventos
+# e são lidos quando aparecem no cabeçalho
+COLUNAS_ID_LOG = ['visitorid', 'itemid', 'transactionid']
+TAMANHO_CHUNK_PADRAO = 200_000
+TAMANHO_INTERVALO_PADRAO = 64 * 1024 * 1024
+
+
+def preprocessar(df):
+    with medir('preprocessamento', len(df)):
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            # Formato conhecido primeiro; inferência só nas linhas que não casaram
+            timestamps = pd.to_datetime(df['timestamp'], format=FORMATO_TIMESTAMP, errors='coerce')
+            falhas = timestamps.isna() & df['timestamp'].notna()
+            if falhas.any():
+                timestamps[falhas] = pd.to_datetime(df['timestamp'][falhas], format='mixed', errors='coerce')
+            df['timestamp'] = timestamps
+        return df.dropna(subset=['timestamp'])
+
+
+def ler_logs_csv(origem, tamanho_chunk=TAMANHO_CHUNK_PADRAO, quarentena=None, nomes=None, codificacao=None,
+                 cabecalho=None):
+    # Blocos de um CSV de logs já com timestamp convertido e nível/mensagem
+    # categóricos; linhas malformadas vão para a quarentena (ver ingestao.py).
+    # cabecalho: colunas do arquivo quando a origem é um arquivo já aberto
+    if cabecalho is None:
+        if nomes is not None:
+            cabecalho = nomes
+        elif isinstance(origem, (str, os.PathLike)):
+            cabecalho = ler_cabecalho(origem, codificacao)
+        else:
+            cabecalho = ()
+    ids = [coluna for coluna in COLUNAS_ID_LOG if coluna in cabecalho]
+    return ler_lotes(origem, colunas=COLUNAS_LOG + ids, nomes=nomes, categoricas=CATEGORICAS_LOG,
+                     timestamps=['timestamp'], codificacao=codificacao, quarentena=quarentena,
+                     tamanho_lote=tamanho_chunk, tipos={coluna: pa.int64() for coluna in ids})
+
+
+def concatenar_chunks(chunks):
+    # pd.concat converte para object as colunas categóricas cujas categorias
+    # diferem entre os blocos; union_categoricals junta os dicionários
+    colunas = chunks[0].columns
+    categoricas = [c for c in colunas if isinstance(chunks[0][c].dtype, pd.CategoricalDtype)]
+    df = pd.concat([chunk.drop(columns=categoricas) for chunk in chunks], ignore_index=True)
+    for coluna in categoricas:
+        df[coluna] = union_categoricals([chunk[coluna] for chunk in chunks])
+    return df[colunas]
+
+
+def detectar_por_regras(df, templates=None):
+    # Classifica todas as linhas (severidade e categoria) e retorna as que casam com as regras
+    return df[classificar_logs(df, templates)]
+
+
+class ResultadoAnalise:
+    # Acumula os resultados parciais de cada chunk sem guardar os logs brutos
+    def __init__(self, guardar_erros=True):
+        self.guardar_erros = guardar_erros
+        self.total_logs = 0
+        self.total_erros = 0
+        self.contagem_niveis = Counter()
+        self.contagem_categorias = Counter()
+        self.erros_por_dia = Counter()
+        self.inicio = None
+        self.fim = None
+        self.primeiro_erro = None
+        self.ultimo_erro = None
+        self.linhas_rejeitadas = 0
+        # Contagens por período × nível × categoria de todos os logs e dos erros
+        self.indice = IndiceAgregado()
+        self.indice_erros = IndiceAgregado()
+        self._erros = []
+
+    def atualizar(self, chunk, erros):
+        if chunk.empty:
+            return
+
+        self.total_logs += len(chunk)
+        self.contagem_niveis.update(_contagens(chunk['nivel']))
+        self.inicio = _minimo(self.inicio, chunk['timestamp'].min())
+        self.fim = _maximo(self.fim, chunk['timestamp'].max())
+        self.indice.atualizar(chunk)
+
+        if erros.empty:
+            return
+
+        self.total_erros += len(erros)
+        self.indice_erros.atualizar(erros)
+        self.contagem_categorias.update(contar_categorias(erros).to_dict())
+        self.erros_por_dia.update(erros['timestamp'].dt.normalize().value_counts().to_dict())
+        self.primeiro_erro = _minimo(self.primeiro_erro, erros['timestamp'].min())
+        self.ultimo_erro = _maximo(self.ultimo_erro, erros['timestamp'].max())
+
+        if self.guardar_erros:
+            self._erros.append(erros)
+
+    def combinar(self, outro):
+        self.total_logs += outro.total_logs
+        self.total_erros += outro.total_erros
+        self.linhas_rejeitadas += outro.linhas_rejeitadas
+        self.contagem_niveis.update(outro.contagem_niveis)
+        self.contagem_categorias.update(outro.contagem_categorias)
+        self.erros_por_dia.update(outro.erros_por_dia)
+        self.inicio = _minimo(self.inicio, outro.inicio)
+        self.fim = _maximo(self.fim, outro.fim)
+        self.primeiro_erro = _minimo(self.primeiro_erro, outro.primeiro_erro)
+        self.ultimo_erro = _maximo(self.ultimo_erro, outro.ultimo_erro)
+        self.indice.combinar(outro.indice)
+        self.indice_erros.combinar(outro.indice_erros)
+        if self.guardar_erros:
+            self._erros.extend(outro._erros)
+        return self
+
+    def erros_detectados(self):
+        if not self._erros:
+            return pd.DataFrame(columns=COLUNAS_LOG + ['severidade', 'categoria'])
+        return pd.concat(self._erros, ignore_index=True)
+
+    def resumo(self):
+        linhas = ["RESUMO DA ANÁLISE", "=" * 40,
+                  f"Total de logs analisados: {self.total_logs:,}",
+                  f"Período coberto: {self.inicio} a {self.fim}"]
+        if self.linhas_rejeitadas:
+            linhas.append(f"Linhas malformadas (quarentena): {self.linhas_rejeitadas:,}")
+
+        if self.total_erros == 0:
+            linhas.append("NENHUM ERRO GRAVE DETECTADO")
+            return "\n".join(linhas)
+
+        percentual = (self.total_erros / self.total_logs) * 100
+        linhas += [f"Total de erros: {self.total_erros:,}",
+                   f"Percentual sobre total: {percentual:.2f}%",
+                   f"Primeira ocorrência: {self.primeiro_erro}",
+                   f"Última ocorrência: {self.ultimo_erro}",
+                   "",
+                   "DISTRIBUIÇÃO DE ERROS POR TIPO:"]
+        for tipo in CATEGORIAS:
+            qtd = self.contagem_categorias.get(tipo, 0)
+            if qtd > 0:
+                linhas.append(f"• {tipo}: {qtd} ocorrências")
+        return "\n".join(linhas)
+
+
+class MotorAnalise:
+    # Motor de análise sem interface gráfica: lê o CSV em blocos de tamanho fixo,
+    # então o pico de memória depende do tamanho do chunk e não do arquivo.
+    def __init__(self, tamanho_chunk=TAMANHO_CHUNK_PADRAO, guardar_erros=True,
+                 processos=1, tamanho_intervalo=TAMANHO_INTERVALO_PADRAO, modelo=None, quarentena=True,
+                 janela_duplicadas=JANELA_DUPLICADAS_PADRAO):
+        self.tamanho_chunk = tamanho_chunk
+        self.guardar_erros = guardar_erros
+        self.processos = processos or os.cpu_count() or 1
+        self.tamanho_intervalo = tamanho_intervalo
+        # Compartilhado entre os chunks: cada template é classificado uma vez
+        # enquanto estiver entre os max_templates usados mais recentemente
+        self.templates = DicionarioTemplates()
+        # Modelo de anomalias já treinado (opcional), usado só para pontuar
+        self.modelo = modelo
+        # Grava as linhas malformadas em <arquivo>.rejeitadas.csv em vez de descartá-las
+        self.quarentena = quarentena
+        # IDs de transação recentes, para marcar as repetidas dentro da janela. Com
+        # vários processos cada intervalo tem a sua, então repetições que cruzam a
+        # divisa entre dois intervalos não são vistas.
+        self.duplicadas = JanelaTransacoes(janela_duplicadas)
+
+    def _quarentena(self, caminho, limpar=False):
+        if not self.quarentena:
+            return None
+        quarentena = Quarentena(caminho_quarentena(caminho))
+        if limpar:
+            quarentena.limpar()
+        return quarentena
+
+    def ler_chunks(self, caminho, inicio=None, fim=None, colunas=None, codificacao=None, quarentena=None):
+        if inicio is None:
+            return ler_logs_csv(caminho, self.tamanho_chunk, quarentena, codificacao=codificacao)
+
+        # Lê apenas o intervalo de bytes [inicio, fim) de um arquivo sem cabeçalho
+        leitor = io.BufferedReader(_LeitorIntervalo(caminho, inicio, fim), buffer_size=1024 * 1024)
+        return ler_logs_csv(leitor, self.tamanho_chunk, quarentena, nomes=colunas, codificacao=codificacao)
+
+    def analisar_chunk(self, chunk):
+        chunk = preprocessar(chunk)
+        with medir('regras', len(chunk)):
+            mascara, severidade, categoria = self.templates.classificar(chunk['mensagem'])
+            chunk['severidade'] = severidade
+            chunk['categoria'] = categoria
+        mascara = mascara | marcar_duplicadas(chunk, self.duplicadas)
+
+        if self.modelo is not None:
+            mascara = mascara | self.modelo.pontuar_logs(chunk)
+        return chunk, chunk[mascara]
+
+    def analisar_arquivo(self, caminho, ao_detectar=None):
+        if self.processos > 1:
+            return self.analisar_arquivos([caminho], ao_detectar=ao_detectar)
+
+        resultado = ResultadoAnalise(guardar_erros=self.guardar_erros)
+        quarentena = self._quarentena(caminho, limpar=True)
+        for chunk in medir_iteracao('carregamento', self.ler_chunks(caminho, quarentena=quarentena)):
+            chunk, erros = self.analisar_chunk(chunk)
+            resultado.atualizar(chunk, erros)
+            if ao_detectar is not None and not erros.empty:
+                ao_detectar(erros)
+        if quarentena is not None:
+            resultado.linhas_rejeitadas = quarentena.total
+        return resultado
+
+    def analisar_armazenamento(self, diretorio, inicio=None, fim=None, ao_detectar=None):
+        # Analisa um armazenamento Parquet (ver armazenamento.py) lendo só o período pedido
+        from armazenamento import ler_lotes
+
+        resultado = ResultadoAnalise(guardar_erros=self.guardar_erros)
+        lotes = ler_lotes(diretorio, inicio=inicio, fim=fim, tamanho_lote=self.tamanho_chunk)
+        for lote in medir_iteracao('carregamento', lotes):
+            lote, erros = self.analisar_chunk(lote)
+            resultado.atualizar(lote, erros)
+            if ao_detectar is not None and not erros.empty:
+                ao_detectar(erros)
+        return resultado
+
+    def analisar_intervalo(self, caminho, inicio, fim, colunas, codificacao, guardar_erros):
+        # Roda no processo de trabalho, que é reaproveitado entre intervalos: as
+        # métricas deste intervalo voltam junto com o resultado parcial
+        METRICAS.limpar()
+        resultado = ResultadoAnalise(guardar_erros=guardar_erros)
+        quarentena = self._quarentena(caminho)
+        chunks = self.ler_chunks(caminho, inicio, fim, colunas, codificacao, quarentena)
+        for chunk in medir_iteracao('carregamento', chunks):
+            resultado.atualizar(*self.analisar_chunk(chunk))
+        if quarentena is not None:
+            resultado.linhas_rejeitadas = quarentena.total
+        resultado.metricas = METRICAS.resumo()
+        return resultado
+
+    def analisar_arquivos(self, caminhos, ao_detectar=None):
+        # Divide cada arquivo em intervalos de bytes alinhados em quebras de linha e
+        # distribui os intervalos entre processos. Os resultados parciais são
+        # combinados na ordem dos intervalos, igual ao caminho de um processo só.
+        tarefas = []
+        for caminho in caminhos:
+            # Codificação detectada uma vez e repassada a todos os intervalos
+            codificacao = detectar_codificacao(caminho)
+            colunas, intervalos = dividir_arquivo(caminho, self.tamanho_intervalo, codificacao)
+            self._quarentena(caminho, limpar=True)
+            tarefas.extend((caminho, inicio, fim, colunas, codificacao) for inicio, fim in intervalos)
+
+        guardar_erros = self.guardar_erros or ao_detectar is not None
+        resultado = ResultadoAnalise(guardar_erros=self.guardar_erros)
+        max_pendentes = self.processos * 2
+
+        with ProcessPoolExecutor(max_workers=self.processos) as executor:
+            pendentes = deque()
+            for tarefa in tarefas:
+                pendentes.append(executor.submit(self.analisar_intervalo, *tarefa, guardar_erros))
+                # Limita os resultados em memória ao dobro da quantidade de processos
+                if len(pendentes) >= max_pendentes:
+                    self._combinar_parcial(resultado, pendentes.popleft().result(), ao_detectar)
+            while pendentes:
+                self._combinar_parcial(resultado, pendentes.popleft().result(), ao_detectar)
+
+        return resultado
+
+    def _combinar_parcial(self, resultado, parcial, ao_detectar):
+        if ao_detectar is not None and parcial.total_erros > 0:
+            ao_detectar(parcial.erros_detectados())
+            if not self.guardar_erros:
+                parcial._erros = []
+        METRICAS.combinar(parcial.metricas)
+        resultado.combinar(parcial)
+
+
+def dividir_arquivo(caminho, tamanho_intervalo=TAMANHO_INTERVALO_PADRAO, codificacao='utf-8'):
+    # Retorna as colunas do cabeçalho e os intervalos [inicio, fim) que começam
+    # sempre no início de uma linha
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, 'rb') as f:
+        cabecalho = f.readline()
+        colunas = cabecalho.decode('utf-8-sig' if codificacao == 'utf-8' else codificacao).strip().split(',')
+        limites = [f.tell()]
+        posicao = limites[0] + tamanho_intervalo
+        while posicao < tamanho:
+            f.seek(posicao)
+            f.readline()
+            if f.tell() >= tamanho:
+                break
+            limites.append(f.tell())
+            posicao = f.tell() + tamanho_intervalo
+    limites.append(tamanho)
+    intervalos = [(inicio, fim) for inicio, fim in zip(limites, limites[1:]) if fim > inicio]
+    return colunas, intervalos
+
+
+class _LeitorIntervalo(io.RawIOBase):
+    # Arquivo somente leitura limitado ao intervalo de bytes [inicio, fim)
+    def __init__(self, caminho, inicio, fim):
+        self._arquivo = open(caminho, 'rb')
+        self._arquivo.seek(inicio)
+        self._restante = fim - inicio
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._restante <= 0:
+            return 0
+        visao = memoryview(buffer)[:self._restante]
+        lidos = self._arquivo.readinto(visao)
+        self._restante -= lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+def _contagens(serie):
+    # value_counts de colunas categóricas inclui categorias sem ocorrência
+    contagem = serie.value_counts()
+    return contagem[contagem > 0].to_dict()
+
+
+def _minimo(atual, novo):
+    if novo is None or pd.isna(novo):
+        return atual
+    return novo if atual is None or novo < atual else atual
+
+
+def _maximo(atual, novo):
+    if novo is None or pd.isna(novo):
+        return atual
+    return novo if atual is None or novo > atual else atual
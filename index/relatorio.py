@@ -0,0 +1,196 @@
+import json
+import os
+from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from metricas import medir
+from motor_analise import COLUNAS_LOG, TAMANHO_CHUNK_PADRAO
+
+# Colunas gravadas na exportação dos erros detectados
+COLUNAS_ERROS = COLUNAS_LOG + ['severidade', 'categoria']
+FORMATOS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.txt': 'texto'}
+COMPRESSOES = {'.gz': 'gzip', '.zst': 'zstd'}
+# Buffer do arquivo de saída: os blocos formatados são gravados de uma vez
+TAMANHO_BUFFER_PADRAO = 8 * 1024 * 1024
+FORMATO_DATA = '%Y-%m-%d %H:%M:%S'
+
+
+def formato_do_caminho(caminho):
+    # Formato e compressão pela extensão, ex.: erros.jsonl.zst -> ('jsonl', 'zstd')
+    raiz, extensao = os.path.splitext(caminho.lower())
+    compressao = COMPRESSOES.get(extensao)
+    if compressao is not None:
+        raiz, extensao = os.path.splitext(raiz)
+    return FORMATOS.get(extensao, 'csv'), compressao
+
+
+def abrir_saida(caminho, compressao=None, tamanho_buffer=TAMANHO_BUFFER_PADRAO):
+    # Arquivo binário bufferizado, comprimido em fluxo com os codecs do pyarrow
+    if compressao is not None and not pa.Codec.is_available(compressao):
+        raise ValueError(f"Compressão '{compressao}' não disponível nesta instalação do pyarrow")
+    return pa.output_stream(caminho, compression=compressao, buffer_size=tamanho_buffer)
+
+
+def _texto(serie, formato=lambda v: str(v)):
+    # Formata cada valor distinto uma vez só: mensagens, níveis e categorias se
+    # repetem muito, então a coluna vira um dicionário de textos já formatados
+    if serie.dtype.kind == 'M':
+        datas = pa.array(serie.to_numpy(dtype='datetime64[s]'))
+        return pc.fill_null(pc.strftime(datas, FORMATO_DATA), formato(None))
+    categorias = serie.astype('category').cat
+    valores = pa.array([formato(v) for v in categorias.categories] + [formato(None)], type=pa.string())
+    codigos = np.where(categorias.codes.to_numpy() < 0, len(valores) - 1, categorias.codes.to_numpy())
+    return valores.take(pa.array(codigos))
+
+
+def _juntar(partes):
+    # Concatena colunas de texto e literais linha a linha
+    return pc.binary_join_element_wise(*partes, '')
+
+
+def linhas_texto(bloco):
+    # Mesmo formato das linhas do relatório em texto
+    return _juntar(['[', _texto(bloco['timestamp'], lambda v: '' if v is None else str(v)), '] ',
+                    _texto(bloco['nivel']), ' (', _texto(bloco['severidade']), ' / ',
+                    _texto(bloco['categoria']), '): ', _texto(bloco['mensagem']), '\n'])
+
+
+def linhas_jsonl(bloco):
+    partes = []
+    for i, coluna in enumerate(COLUNAS_ERROS):
+        partes.append(('{' if i == 0 else ',') + json.dumps(coluna) + ':')
+        if coluna == 'timestamp':
+            partes.append(_juntar(['"', _texto(bloco[coluna], lambda v: ''), '"']))
+        else:
+            partes.append(_texto(bloco[coluna], lambda v: json.dumps(v, ensure_ascii=False)))
+    return _juntar(partes + ['}\n'])
+
+
+class ExportadorErros:
+    # Grava erros detectados à medida que são produzidos, bloco a bloco, em CSV,
+    # JSON Lines ou texto, opcionalmente comprimidos (gzip/zstd). Cada bloco é
+    # formatado de uma vez (sem iterrows) e escrito em um buffer grande.
+    def __init__(self, caminho, formato=None, compressao=None, tamanho_buffer=TAMANHO_BUFFER_PADRAO):
+        formato_padrao, compressao_padrao = formato_do_caminho(caminho)
+        self.formato = formato or formato_padrao
+        if self.formato not in FORMATOS.values():
+            raise ValueError(f"Formato de exportação desconhecido: {self.formato}")
+        self.compressao = compressao or compressao_padrao
+        self.total = 0
+        self._saida = abrir_saida(caminho, self.compressao, tamanho_buffer)
+        self._escritor_csv = None
+        if self.formato == 'csv':
+            # Cabeçalho gravado mesmo que nenhum erro seja exportado
+            self.escrever_texto(','.join(COLUNAS_ERROS) + '\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def escrever_texto(self, texto):
+        self._saida.write(texto.encode('utf-8'))
+
+    def copiar(self, caminho, tamanho_bloco=TAMANHO_BUFFER_PADRAO):
+        # Acrescenta o conteúdo de um arquivo já formatado (ex.: linhas de erros
+        # gravadas durante a análise em blocos)
+        with open(caminho, 'rb') as origem:
+            while bloco := origem.read(tamanho_bloco):
+                self._saida.write(bloco)
+
+    def escrever(self, erros):
+        if erros.empty:
+            return
+        with medir('exportacao', len(erros)):
+            bloco = erros[COLUNAS_ERROS]
+            if self.formato == 'csv':
+                self._escrever_csv(bloco)
+            else:
+                linhas = linhas_jsonl(bloco) if self.formato == 'jsonl' else linhas_texto(bloco)
+                # Um único buffer com todas as linhas do bloco
+                self._saida.write(pc.binary_join(pa.array([linhas], type=pa.list_(pa.string())), '')[0].as_buffer())
+        self.total += len(erros)
+
+    def _escrever_csv(self, bloco):
+        tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+        # Categóricas viram texto (o escritor CSV do pyarrow não grava dicionários)
+        # e o timestamp fica em segundos, como nos outros formatos
+        tabela = tabela.cast(pa.schema([
+            pa.field(campo.name, campo.type.value_type if pa.types.is_dictionary(campo.type)
+                     else pa.timestamp('s') if pa.types.is_timestamp(campo.type) else campo.type)
+            for campo in tabela.schema]), safe=False)
+        if self._escritor_csv is None:
+            self._escritor_csv = pacsv.CSVWriter(self._saida, tabela.schema,
+                                                 write_options=pacsv.WriteOptions(include_header=False))
+        self._escritor_csv.write_table(tabela)
+
+    def fechar(self):
+        if self._saida.closed:
+            return
+        if self._escritor_csv is not None:
+            self._escritor_csv.close()
+        self._saida.close()
+
+
+def blocos_filtrados(df, mascara, tamanho_bloco=TAMANHO_CHUNK_PADRAO):
+    # Linhas de df selecionadas pela máscara, um bloco por vez, sem montar a
+    # seleção inteira em memória
+    for inicio in range(0, len(df), tamanho_bloco):
+        fim = inicio + tamanho_bloco
+        yield df.iloc[inicio:fim][mascara[inicio:fim]]
+
+
+def exportar_erros(caminho, blocos, total=None, progresso=None, **opcoes):
+    # Exporta os blocos de erros detectados; retorna quantos foram gravados
+    with ExportadorErros(caminho, **opcoes) as exportador:
+        for bloco in blocos:
+            exportador.escrever(bloco)
+            if progresso is not None and total:
+                progresso.informar(min(exportador.total / total, 1.0),
+                                   f"Exportando erros... {exportador.total:,}")
+    return exportador.total
+
+
+def gravar_relatorio(caminho, indice, erros=None, indice_erros=None, progresso=None,
+                     tamanho_bloco=TAMANHO_CHUNK_PADRAO, arquivo_erros=None):
+    # Relatório em texto: informações gerais do índice de agregados e, se houver,
+    # a lista dos erros detectados, gravada em blocos (progresso é opcional).
+    # arquivo_erros: linhas dos erros já gravadas em texto por um ExportadorErros,
+    # copiadas no lugar de `erros`
+    if arquivo_erros is not None:
+        tem_erros = indice_erros is not None and indice_erros.total > 0
+    else:
+        tem_erros = erros is not None and not erros.empty
+    with ExportadorErros(caminho, formato='texto') as f:
+        f.escrever_texto("RELATÓRIO DE ANÁLISE DE LOGS\n")
+        f.escrever_texto("="*40 + "\n\n")
+
+        # Informações gerais
+        f.escrever_texto(f"Data da análise: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+        f.escrever_texto(f"Total de logs analisados: {indice.total:,}\n")
+        f.escrever_texto(f"Período coberto: {indice.inicio} a {indice.fim}\n\n")
+
+        # Erros detectados
+        if not tem_erros:
+            f.escrever_texto("NENHUM ERRO GRAVE DETECTADO\n")
+            return
+
+        f.escrever_texto(f"ERROS DETECTADOS: {indice_erros.total:,}\n")
+        f.escrever_texto("="*40 + "\n\n")
+
+        for tipo, qtd in indice_erros.por_categoria().items():
+            if qtd > 0:
+                f.escrever_texto(f"• {tipo}: {qtd} ocorrências\n")
+        f.escrever_texto("\n")
+
+        if arquivo_erros is not None:
+            f.copiar(arquivo_erros)
+            return
+        total = len(erros)
+        for inicio in range(0, total, tamanho_bloco):
+            f.escrever(erros.iloc[inicio:inicio + tamanho_bloco])
+            if progresso is not None:
+                progresso.informar(f.total / total, f"Exportando relatório... {f.total:,} erros")
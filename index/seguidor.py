@@ -0,0 +1,182 @@
+import csv
+import os
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime
+from functools import lru_cache
+
+from classificador import classificar_mensagem
+from duplicadas import COLUNA_ITEM, COLUNA_TRANSACAO, JANELA_DUPLICADAS_PADRAO, JanelaTransacoes, chave_transacao
+
+JANELA_PADRAO = 60
+INTERVALO_LEITURA_PADRAO = 0.5
+# Quantidade de mensagens distintas com classificação em cache
+TAMANHO_CACHE_MENSAGENS = 10_000
+TOTAL = 'Total'
+
+
+class JanelaDeslizante:
+    # Contadores por categoria nos últimos `segundos` segundos, em baldes de um
+    # segundo. Guarda no máximo `segundos` baldes, então a memória é constante.
+    def __init__(self, segundos=JANELA_PADRAO):
+        self.segundos = segundos
+        self.totais = Counter()
+        self._baldes = deque()
+
+    def adicionar(self, instante, categoria):
+        if self._baldes and instante <= self._baldes[-1][0]:
+            # Logs fora de ordem contam no balde mais recente, se ainda estiverem na janela
+            if instante <= self._baldes[-1][0] - self.segundos:
+                return
+            balde = self._baldes[-1][1]
+        else:
+            balde = Counter()
+            self._baldes.append((instante, balde))
+            self._expirar(instante)
+
+        balde[categoria] += 1
+        balde[TOTAL] += 1
+        self.totais[categoria] += 1
+        self.totais[TOTAL] += 1
+
+    def _expirar(self, agora):
+        while self._baldes and self._baldes[0][0] <= agora - self.segundos:
+            _, balde = self._baldes.popleft()
+            self.totais.subtract(balde)
+        self.totais = +self.totais
+
+
+class MonitorTempoReal:
+    # Aplica as regras de detecção linha a linha e alerta quando a quantidade de
+    # erros de uma categoria na janela deslizante atinge o limite configurado.
+    # colunas: cabeçalho do arquivo; sem ele, a mensagem é tudo depois do nível
+    # até aparecer uma linha de cabeçalho (e não há IDs de transação).
+    def __init__(self, janela=JANELA_PADRAO, limites=None, limite_padrao=None, ao_alertar=None, colunas=None,
+                 janela_duplicadas=JANELA_DUPLICADAS_PADRAO):
+        self.janela = JanelaDeslizante(janela)
+        self.duplicadas = JanelaTransacoes(janela_duplicadas)
+        self.colunas = None
+        if colunas is not None:
+            self._definir_colunas(colunas)
+        self.limites = dict(limites or {})
+        self.limite_padrao = limite_padrao
+        self.ao_alertar = ao_alertar or imprimir_alerta
+        self.linhas_processadas = 0
+        self.erros_detectados = 0
+        self._em_alerta = set()
+        self._classificar = lru_cache(maxsize=TAMANHO_CACHE_MENSAGENS)(classificar_mensagem)
+
+    def limite(self, categoria):
+        return self.limites.get(categoria, self.limite_padrao)
+
+    def _definir_colunas(self, colunas):
+        self.colunas = [coluna.strip() for coluna in colunas]
+        self._posicao_mensagem = self.colunas.index('mensagem') if 'mensagem' in self.colunas else 2
+        self._posicao_transacao = self.colunas.index(COLUNA_TRANSACAO) if COLUNA_TRANSACAO in self.colunas else None
+        self._posicao_item = self.colunas.index(COLUNA_ITEM) if COLUNA_ITEM in self.colunas else None
+
+    def _inteiro(self, campos, posicao):
+        if posicao is None or posicao >= len(campos):
+            return None
+        texto = campos[posicao].strip()
+        return int(texto) if texto.isdigit() else None
+
+    def _mensagem_e_transacao(self, campos):
+        # Mensagem e chave (transação, item) da linha, ou None sem transação
+        if self.colunas is None:
+            return ','.join(campos[2:]), None
+        mensagem = campos[self._posicao_mensagem] if self._posicao_mensagem < len(campos) else ''
+        transacao = self._inteiro(campos, self._posicao_transacao)
+        if transacao is not None and self._posicao_item is not None:
+            item = self._inteiro(campos, self._posicao_item)
+            transacao = int(chave_transacao(transacao, -1 if item is None else item))
+        return mensagem, transacao
+
+    def processar_linha(self, linha):
+        campos = next(csv.reader([linha]), None)
+        if not campos or len(campos) < 3:
+            return
+        if campos[0].strip() == 'timestamp':
+            self._definir_colunas(campos)
+            return
+
+        try:
+            timestamp = datetime.fromisoformat(campos[0].strip())
+        except ValueError:
+            # Cabeçalho ou timestamp inválido (descartado, como no carregamento em lote)
+            return
+
+        mensagem, transacao = self._mensagem_e_transacao(campos)
+        instante = int(timestamp.timestamp())
+        self.linhas_processadas += 1
+        casa_regra, severidade, categoria = self._classificar(mensagem)
+        if transacao is not None and self.duplicadas.repetida(transacao, instante):
+            casa_regra, categoria = True, 'Duplicada'
+        if not casa_regra:
+            return
+
+        self.erros_detectados += 1
+        self.janela.adicionar(instante, categoria)
+        self._verificar(timestamp, categoria)
+        self._verificar(timestamp, TOTAL)
+
+    def _verificar(self, timestamp, categoria):
+        limite = self.limite(categoria)
+        if limite is None:
+            return
+
+        quantidade = self.janela.totais[categoria]
+        if quantidade >= limite and categoria not in self._em_alerta:
+            self._em_alerta.add(categoria)
+            self.ao_alertar({'timestamp': timestamp, 'categoria': categoria, 'quantidade': quantidade,
+                             'limite': limite, 'janela': self.janela.segundos})
+        elif quantidade < limite:
+            self._em_alerta.discard(categoria)
+
+    def processar(self, linhas):
+        for linha in linhas:
+            self.processar_linha(linha)
+
+
+def imprimir_alerta(alerta):
+    print(f"[{alerta['timestamp']}] ALERTA {alerta['categoria']}: {alerta['quantidade']} erros "
+          f"nos últimos {alerta['janela']}s (limite {alerta['limite']})", flush=True)
+
+
+def seguir_arquivo(caminho, do_inicio=False, intervalo=INTERVALO_LEITURA_PADRAO, parar=None):
+    # Lê as linhas novas de um arquivo que continua crescendo (como tail -F).
+    # Reabre o arquivo se ele for truncado ou substituído por rotação.
+    f = open(caminho, encoding='utf-8', errors='replace', newline='')
+    if not do_inicio:
+        f.seek(0, os.SEEK_END)
+
+    pendente = ''
+    try:
+        while parar is None or not parar.is_set():
+            linha = f.readline()
+            if linha:
+                # Só entrega linhas completas; o resto fica para a próxima leitura
+                pendente += linha
+                if pendente.endswith('\n'):
+                    yield pendente
+                    pendente = ''
+                continue
+
+            try:
+                estado = os.stat(caminho)
+            except FileNotFoundError:
+                estado = None
+            if estado is not None and (estado.st_ino != os.fstat(f.fileno()).st_ino or estado.st_size < f.tell()):
+                f.close()
+                f = open(caminho, encoding='utf-8', errors='replace', newline='')
+                pendente = ''
+                continue
+            time.sleep(intervalo)
+    finally:
+        f.close()
+
+
+def seguir_entrada_padrao():
+    for linha in sys.stdin:
+        yield linha
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import os
+import signal
+import stat
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from classificador import CATEGORIAS
+from duplicadas import JANELA_DUPLICADAS_PADRAO
+from metricas import METRICAS, medir
+from motor_analise import COLUNAS_LOG, MotorAnalise, ResultadoAnalise, ler_logs_csv
+from relatorio import COLUNAS_ERROS, linhas_jsonl
+
+# Serviço de ingestão sem interface: os produtores enviam lotes de linhas CSV
+# (timestamp,nivel,mensagem, com cabeçalho opcional) por HTTP local ou socket
+# Unix. Cada corpo é validado antes da resposta: sem as colunas do log ou
+# ilegível, o produtor recebe 400 e nada é aceito. Os corpos aceitos vão para
+# uma fila limitada e um único consumidor junta o que estiver na fila em
+# micro-lotes, lidos e analisados numa thread com a mesma classificação
+# vetorizada do motor de análise (regras, severidade, duplicadas e modelo de
+# anomalias opcional). Com a fila cheia, o envio espera; se a espera passar de
+# espera_maxima, o produtor recebe 503 e tenta de novo depois.
+PORTA_PADRAO = 8070
+TAMANHO_LOTE_PADRAO = 50_000
+INTERVALO_LOTE_PADRAO = 0.2
+MAX_PENDENTES_PADRAO = 256
+ESPERA_MAXIMA_PADRAO = 5.0
+TAMANHO_MAXIMO_CORPO = 1024 * 1024
+MAX_RECENTES_PADRAO = 1000
+# Fila de conexões do sistema operacional: milhares de produtores conectando juntos
+BACKLOG_CONEXOES = 4096
+
+_MOTIVOS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            411: 'Length Required', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class Resposta:
+    def __init__(self, status, corpo=b'', tipo='application/json', cabecalhos=None):
+        self.status = status
+        self.corpo = corpo
+        self.tipo = tipo
+        self.cabecalhos = cabecalhos or {}
+
+    @staticmethod
+    def json(dados, status=200, cabecalhos=None):
+        return Resposta(status, json.dumps(dados, ensure_ascii=False, default=str).encode('utf-8'),
+                        cabecalhos=cabecalhos)
+
+    def codificar(self, manter_conexao):
+        cabecalhos = {'Content-Type': self.tipo, 'Content-Length': str(len(self.corpo)),
+                      'Connection': 'keep-alive' if manter_conexao else 'close', **self.cabecalhos}
+        linhas = [f"HTTP/1.1 {self.status} {_MOTIVOS[self.status]}"]
+        linhas += [f"{nome}: {valor}" for nome, valor in cabecalhos.items()]
+        return ('\r\n'.join(linhas) + '\r\n\r\n').encode('latin-1') + self.corpo
+
+
+def _separar_cabecalho(corpo):
+    # (colunas, linhas) de um corpo recebido; sem cabeçalho valem as colunas do log
+    corpo = corpo.removeprefix(b'\xef\xbb\xbf')
+    if not corpo.startswith(b'timestamp,'):
+        return tuple(COLUNAS_LOG), corpo
+    cabecalho, _, linhas = corpo.partition(b'\n')
+    return tuple(coluna.strip() for coluna in cabecalho.decode('utf-8').split(',')), linhas
+
+
+def _tamanho_corpo(valor):
+    # Content-Length como inteiro não negativo; None se o valor não for um número
+    valor = valor.strip()
+    return int(valor) if valor.isascii() and valor.isdigit() else None
+
+
+def contar_linhas(corpo):
+    # Linhas de log de um corpo, sem o cabeçalho e contando a última sem quebra
+    linhas = corpo.count(b'\n') + (bool(corpo) and not corpo.endswith(b'\n'))
+    return linhas - corpo.removeprefix(b'\xef\xbb\xbf').startswith(b'timestamp,')
+
+
+def validar(corpo):
+    # ValueError se o cabeçalho não tem as colunas do log ou se o texto não é
+    # UTF-8, os dois casos que fariam a leitura do micro-lote inteiro falhar.
+    # Linhas malformadas não são erro: são descartadas na leitura e contam como
+    # rejeitadas.
+    colunas, linhas = _separar_cabecalho(corpo)
+    faltando = [coluna for coluna in COLUNAS_LOG if coluna not in colunas]
+    if faltando:
+        raise ValueError(f"cabeçalho sem as colunas: {', '.join(faltando)}")
+    try:
+        linhas.decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise ValueError(f"texto não é UTF-8 (byte {e.start})") from e
+
+
+def _ler_corpos(corpos, tamanho_lote):
+    # Blocos de logs de corpos com as mesmas colunas, lidos como um CSV só
+    colunas = _separar_cabecalho(corpos[0])[0]
+    partes = []
+    for corpo in corpos:
+        linhas = _separar_cabecalho(corpo)[1]
+        if linhas.strip():
+            partes.append(linhas if linhas.endswith(b'\n') else linhas + b'\n')
+    if not partes:
+        return []
+    return list(ler_logs_csv(pa.BufferReader(b''.join(partes)), tamanho_lote, nomes=list(colunas),
+                             codificacao='utf-8'))
+
+
+class ServicoIngestao:
+    def __init__(self, modelo=None, tamanho_lote=TAMANHO_LOTE_PADRAO, intervalo=INTERVALO_LOTE_PADRAO,
+                 max_pendentes=MAX_PENDENTES_PADRAO, espera_maxima=ESPERA_MAXIMA_PADRAO,
+                 max_recentes=MAX_RECENTES_PADRAO, janela_duplicadas=JANELA_DUPLICADAS_PADRAO):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.espera_maxima = espera_maxima
+        self.max_recentes = max_recentes
+        # Templates, janela de duplicadas e modelo só são usados pela thread de análise
+        self.motor = MotorAnalise(tamanho_chunk=tamanho_lote, guardar_erros=False, modelo=modelo,
+                                  quarentena=False, janela_duplicadas=janela_duplicadas)
+        # Só a thread do asyncio altera os totais, então as consultas não precisam de trava
+        self.resultado = ResultadoAnalise(guardar_erros=False)
+        self.fila = asyncio.Queue(maxsize=max_pendentes)
+        self.linhas_recebidas = 0
+        self.envios_recusados = 0
+        self.envios_invalidos = 0
+        self.lotes_analisados = 0
+        self._recentes = deque()
+        self._total_recentes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingestao')
+
+    async def receber(self, corpo):
+        # Valida e enfileira um corpo; False quando a fila continuou cheia por
+        # espera_maxima. ValueError (corpo inválido) vai para quem chamou, antes
+        # de qualquer linha ser aceita.
+        try:
+            validar(corpo)
+        except ValueError:
+            self.envios_invalidos += 1
+            raise
+        linhas = contar_linhas(corpo)
+        try:
+            await asyncio.wait_for(self.fila.put((corpo, linhas)), self.espera_maxima)
+        except asyncio.TimeoutError:
+            self.envios_recusados += 1
+            return False
+        self.linhas_recebidas += linhas
+        return True
+
+    async def consumir(self):
+        # Junta os corpos da fila até tamanho_lote linhas ou `intervalo` segundos
+        # e analisa o micro-lote fora da thread do asyncio
+        laco = asyncio.get_running_loop()
+        while True:
+            envios = [await self.fila.get()]
+            linhas = envios[0][1]
+            prazo = laco.time() + self.intervalo
+            while linhas < self.tamanho_lote:
+                try:
+                    envio = self.fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    restante = prazo - laco.time()
+                    if restante <= 0:
+                        break
+                    try:
+                        envio = await asyncio.wait_for(self.fila.get(), restante)
+                    except asyncio.TimeoutError:
+                        break
+                envios.append(envio)
+                linhas += envio[1]
+
+            try:
+                parcial, erros = await laco.run_in_executor(self._executor, self._analisar, envios)
+                self._registrar(parcial, erros)
+            except Exception as e:
+                # O consumidor continua; as linhas do lote ficam como rejeitadas
+                print(f"Falha ao analisar lote de {len(envios)} envios: {e}", file=sys.stderr)
+                self.resultado.linhas_rejeitadas += linhas
+            finally:
+                for _ in envios:
+                    self.fila.task_done()
+
+    async def esvaziar(self):
+        await self.fila.join()
+
+    def _analisar(self, envios):
+        # Roda na thread de análise: os corpos com as mesmas colunas são lidos e
+        # analisados juntos. Se um grupo falhar, cada corpo dele é tentado sozinho
+        # e as linhas dos que falharem contam como rejeitadas.
+        parcial = ResultadoAnalise(guardar_erros=True)
+        grupos = {}
+        for corpo, _ in envios:
+            grupos.setdefault(_separar_cabecalho(corpo)[0], []).append(corpo)
+
+        recebidas = sum(linhas for _, linhas in envios)
+        with medir('ingestao', recebidas):
+            for corpos in grupos.values():
+                try:
+                    self._analisar_corpos(parcial, corpos)
+                except Exception as e:
+                    if len(corpos) == 1:
+                        print(f"Falha ao analisar envio: {e}", file=sys.stderr)
+                        continue
+                    for corpo in corpos:
+                        try:
+                            self._analisar_corpos(parcial, [corpo])
+                        except Exception as e:
+                            print(f"Falha ao analisar envio: {e}", file=sys.stderr)
+        parcial.linhas_rejeitadas = recebidas - parcial.total_logs
+        erros = parcial.erros_detectados()
+        parcial._erros = []
+        return parcial, erros
+
+    def _analisar_corpos(self, parcial, corpos):
+        # Só atualiza o resultado parcial depois que todos os blocos foram analisados
+        analisados = [self.motor.analisar_chunk(chunk) for chunk in _ler_corpos(corpos, self.tamanho_lote)]
+        for chunk, erros in analisados:
+            parcial.atualizar(chunk, erros)
+
+    def _registrar(self, parcial, erros):
+        self.resultado.combinar(parcial)
+        self.lotes_analisados += 1
+        if erros.empty:
+            return
+        erros = erros.tail(self.max_recentes)
+        self._recentes.append(erros)
+        self._total_recentes += len(erros)
+        while self._total_recentes - len(self._recentes[0]) >= self.max_recentes:
+            self._total_recentes -= len(self._recentes.popleft())
+
+    def contagens(self):
+        resultado = self.resultado
+        return {
+            'logs': resultado.total_logs,
+            'erros': resultado.total_erros,
+            'linhas_rejeitadas': resultado.linhas_rejeitadas,
+            'niveis': dict(resultado.contagem_niveis),
+            'categorias': {tipo: resultado.contagem_categorias.get(tipo, 0) for tipo in CATEGORIAS},
+            'inicio': resultado.inicio,
+            'fim': resultado.fim,
+            'primeiro_erro': resultado.primeiro_erro,
+            'ultimo_erro': resultado.ultimo_erro,
+            'linhas_recebidas': self.linhas_recebidas,
+            'envios_pendentes': self.fila.qsize(),
+            'envios_recusados': self.envios_recusados,
+            'envios_invalidos': self.envios_invalidos,
+            'lotes_analisados': self.lotes_analisados,
+        }
+
+    def deteccoes(self, limite=100):
+        # Detecções mais recentes em JSON Lines, no formato da exportação de erros
+        if not self._recentes or limite <= 0:
+            return b''
+        erros = pd.concat(list(self._recentes), ignore_index=True).tail(limite)
+        linhas = linhas_jsonl(erros[COLUNAS_ERROS])
+        return pc.binary_join(pa.array([linhas], type=pa.list_(pa.string())), '')[0].as_py().encode('utf-8')
+
+    async def atender(self, metodo, alvo, corpo):
+        url = urlsplit(alvo)
+        if url.path == '/logs':
+            if metodo != 'POST':
+                return Resposta.json({'erro': "use POST"}, 405)
+            try:
+                aceito = await self.receber(corpo)
+            except ValueError as e:
+                return Resposta.json({'erro': f"corpo inválido: {e}"}, 400)
+            if not aceito:
+                return Resposta.json({'erro': "fila cheia, tente novamente"}, 503, {'Retry-After': '1'})
+            return Resposta.json({'pendentes': self.fila.qsize()}, 202)
+
+        if metodo != 'GET':
+            return Resposta.json({'erro': "use GET"}, 405)
+        if url.path == '/contagens':
+            return Resposta.json(self.contagens())
+        if url.path == '/deteccoes':
+            try:
+                limite = int(parse_qs(url.query).get('limite', ['100'])[0])
+            except ValueError:
+                return Resposta.json({'erro': "limite deve ser um número inteiro"}, 400)
+            return Resposta(200, self.deteccoes(limite), 'application/x-ndjson')
+        if url.path == '/metrics':
+            return Resposta(200, METRICAS.formatar_prometheus().encode('utf-8'),
+                            'text/plain; version=0.0.4; charset=utf-8')
+        if url.path == '/saude':
+            return Resposta.json({'status': 'ok'})
+        return Resposta.json({'erro': f"caminho desconhecido: {url.path}"}, 404)
+
+    async def conexao(self, leitor, escritor):
+        # HTTP/1.1 mínimo com conexões persistentes; o corpo precisa de Content-Length
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                partes = linha.decode('latin-1').split()
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                manter = cabecalhos.get('connection', '').lower() != 'close'
+                tamanho = _tamanho_corpo(cabecalhos.get('content-length', '0'))
+
+                if len(partes) != 3:
+                    resposta, manter = Resposta.json({'erro': "requisição inválida"}, 400), False
+                elif partes[0] == 'POST' and 'content-length' not in cabecalhos:
+                    resposta, manter = Resposta.json({'erro': "informe Content-Length"}, 411), False
+                elif tamanho is None:
+                    resposta, manter = Resposta.json({'erro': "Content-Length inválido"}, 400), False
+                elif tamanho > TAMANHO_MAXIMO_CORPO:
+                    resposta, manter = Resposta.json({'erro': f"corpo maior que {TAMANHO_MAXIMO_CORPO} bytes"},
+                                                     413), False
+                else:
+                    corpo = await leitor.readexactly(tamanho) if tamanho else b''
+                    resposta = await self.atender(partes[0], partes[1], corpo)
+
+                escritor.write(resposta.codificar(manter))
+                await escritor.drain()
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
+
+
+def _remover_socket(caminho):
+    # Remove um socket Unix deixado por uma execução anterior; qualquer outra
+    # coisa no caminho é erro, para não apagar um arquivo do usuário
+    try:
+        modo = os.lstat(caminho).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(modo):
+        raise FileExistsError(f"{caminho} já existe e não é um socket Unix")
+    os.remove(caminho)
+
+
+async def servir(servico, porta=PORTA_PADRAO, endereco='127.0.0.1', socket_unix=None, pronto=None, parar=None):
+    # Atende até `parar` (asyncio.Event) ou SIGINT/SIGTERM; as linhas já aceitas
+    # são analisadas antes de encerrar
+    parar = parar or asyncio.Event()
+    laco = asyncio.get_running_loop()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            laco.add_signal_handler(sinal, parar.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows ou fora da thread principal
+            pass
+
+    if socket_unix:
+        _remover_socket(socket_unix)
+        servidor = await asyncio.start_unix_server(servico.conexao, socket_unix, backlog=BACKLOG_CONEXOES)
+    else:
+        servidor = await asyncio.start_server(servico.conexao, endereco, porta, backlog=BACKLOG_CONEXOES)
+    consumidor = asyncio.create_task(servico.consumir())
+    if pronto is not None:
+        pronto(servidor)
+
+    try:
+        await parar.wait()
+        # Para de aceitar conexões e analisa o que já está na fila
+        servidor.close()
+        await servico.esvaziar()
+    finally:
+        consumidor.cancel()
+        servico.encerrar()
+        if socket_unix:
+            try:
+                _remover_socket(socket_unix)
+            except FileExistsError:
+                # Substituído por outra coisa enquanto o servidor rodava: fica como está
+                pass
@@ -0,0 +1,239 @@
+import itertools
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from classificador import classificar_mensagem
+from ingestao import TAMANHO_LOTE_PADRAO, detectar_codificacao, ler_cabecalho, ler_tabelas
+from motor_analise import COLUNAS_ID_LOG, COLUNAS_LOG
+
+MENSAGENS_ERROR = [
+    "Erro ao processar pagamento com cartão de crédito.",
+    "Timeout na API do gateway de pagamento.",
+    "Discrepância nos valores da transação detectada.",
+    "Falha ao validar dados bancários do cliente.",
+    "Erro interno no sistema de pagamento.",
+    "Transação duplicada identificada no sistema.",
+    "Erro ao calcular total da compra com desconto aplicado."
+]
+MENSAGENS_INFO = [
+    "Pagamento processado com sucesso.",
+    "Transação concluída sem erros.",
+    "Confirmação de pagamento recebida.",
+    "Pedido finalizado com sucesso.",
+]
+NIVEIS = ['INFO', 'ERROR']
+# Dicionário fixo das mensagens: todos os blocos gerados têm as mesmas categorias
+MENSAGENS = MENSAGENS_INFO + MENSAGENS_ERROR
+PROPORCAO_ERRO_PADRAO = 0.3
+TAMANHO_BLOCO_PADRAO = 1_000_000
+# Colunas do events.csv (dataset de e-commerce) lidas pelo gerador; as demais
+# nem são convertidas. O timestamp está em milissegundos desde 1970.
+COLUNAS_EVENTOS = ['timestamp', 'visitorid', 'event', 'itemid', 'transactionid']
+COLUNAS_ID = ['visitorid', 'itemid', 'transactionid']
+EVENTO_TRANSACAO = 'transaction'
+# Timestamp com precisão de segundos, como no gerador original; os IDs só são
+# gravados quando os logs vêm das transações
+ESQUEMA_CSV = pa.schema([
+    ('timestamp', pa.timestamp('s')),
+    ('nivel', pa.string()),
+    ('mensagem', pa.string()),
+    ('visitorid', pa.int64()),
+    ('itemid', pa.int64()),
+    ('transactionid', pa.int64()),
+])
+
+
+class Surto:
+    # Período [inicio, fim) com comportamento diferente do normal: outra proporção
+    # de erros, volume multiplicado (pico de tráfego; 0 simula uma queda sem logs)
+    # e, opcionalmente, erros só de uma categoria (ex.: Timeout numa queda do gateway)
+    def __init__(self, inicio, fim, proporcao_erro=1.0, volume=1.0, categoria=None):
+        self.inicio = pd.Timestamp(inicio)
+        self.fim = pd.Timestamp(fim)
+        if self.fim <= self.inicio:
+            raise ValueError(f"O surto termina antes de começar: {self.inicio} a {self.fim}")
+        self.proporcao_erro = proporcao_erro
+        self.volume = volume
+        self.categoria = categoria
+        self.mensagens_erro = _codigos_erro(categoria)
+
+    @staticmethod
+    def interpretar(texto):
+        # Formato: INICIO,DURACAO[,proporcao=P][,volume=V][,categoria=C]
+        # ex.: "2015-06-03 10:00,30min,proporcao=0.9,volume=5,categoria=Timeout"
+        partes = [parte.strip() for parte in texto.split(',')]
+        if len(partes) < 2:
+            raise ValueError(f"Surto inválido: {texto} (use INICIO,DURACAO[,chave=valor...])")
+
+        inicio = pd.Timestamp(partes[0])
+        opcoes = {}
+        for parte in partes[2:]:
+            chave, _, valor = parte.partition('=')
+            if chave == 'proporcao':
+                opcoes['proporcao_erro'] = float(valor)
+            elif chave == 'volume':
+                opcoes['volume'] = float(valor)
+            elif chave == 'categoria':
+                opcoes['categoria'] = valor
+            else:
+                raise ValueError(f"Opção de surto desconhecida: {chave}")
+        return Surto(inicio, inicio + pd.Timedelta(partes[1]), **opcoes)
+
+
+def _codigos_erro(categoria=None):
+    # Códigos (em MENSAGENS) das mensagens de erro, opcionalmente de uma categoria só
+    codigos = [MENSAGENS.index(m) for m in MENSAGENS_ERROR
+               if categoria is None or classificar_mensagem(m)[2] == categoria]
+    if not codigos:
+        raise ValueError(f"Nenhuma mensagem de erro da categoria {categoria}")
+    return np.array(codigos)
+
+
+def sortear_logs(rng, n, proporcao_erro=PROPORCAO_ERRO_PADRAO, mensagens_erro=None):
+    # Sorteia nível e mensagem de n logs de uma vez; retorna colunas categóricas
+    if mensagens_erro is None:
+        mensagens_erro = _codigos_erro()
+    erro = rng.random(n) < proporcao_erro
+    codigos = np.where(erro,
+                       mensagens_erro[rng.integers(0, len(mensagens_erro), n)],
+                       rng.integers(0, len(MENSAGENS_INFO), n))
+    return (pd.Categorical.from_codes(erro.astype(np.int8), categories=NIVEIS),
+            pd.Categorical.from_codes(codigos, categories=MENSAGENS))
+
+
+def _segmentos(inicio, fim, surtos):
+    # Divide [inicio, fim) nos trechos em que o surto ativo não muda; quando
+    # surtos se sobrepõem vale o último da lista
+    limites = {inicio, fim}
+    for surto in surtos:
+        limites.update(t for t in (surto.inicio, surto.fim) if inicio < t < fim)
+    limites = sorted(limites)
+
+    segmentos = []
+    for a, b in zip(limites, limites[1:]):
+        ativo = None
+        for surto in surtos:
+            if surto.inicio <= a and b <= surto.fim:
+                ativo = surto
+        segmentos.append((a, b, ativo))
+    return segmentos
+
+
+def gerar_blocos(total, inicio, fim, proporcao_erro=PROPORCAO_ERRO_PADRAO, surtos=(),
+                 tamanho_bloco=TAMANHO_BLOCO_PADRAO, seed=0):
+    # Gera `total` logs entre inicio e fim em blocos de cerca de tamanho_bloco
+    # linhas, já em ordem de timestamp. Só um bloco fica em memória por vez.
+    rng = np.random.default_rng(seed)
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    if fim <= inicio:
+        raise ValueError(f"Período inválido: {inicio} a {fim}")
+
+    segmentos = _segmentos(inicio, fim, list(surtos))
+    # A quantidade de logs de cada trecho é proporcional à duração vezes o volume
+    pesos = np.array([(b - a).total_seconds() * (s.volume if s else 1.0) for a, b, s in segmentos])
+    if pesos.sum() <= 0:
+        raise ValueError("Nenhum trecho do período tem volume de logs")
+    por_segmento = rng.multinomial(total, pesos / pesos.sum())
+
+    padrao = _codigos_erro()
+    for (a, b, surto), quantidade in zip(segmentos, por_segmento):
+        if quantidade == 0:
+            continue
+        proporcao = surto.proporcao_erro if surto else proporcao_erro
+        mensagens_erro = surto.mensagens_erro if surto else padrao
+
+        # Subdivide o trecho em intervalos de tempo iguais, um bloco por intervalo
+        partes = -(-quantidade // tamanho_bloco)
+        cortes = np.linspace(a.value // 10 ** 9, b.value // 10 ** 9, partes + 1).astype(np.int64)
+        for (c, d), n in zip(zip(cortes, cortes[1:]), rng.multinomial(quantidade, [1 / partes] * partes)):
+            if n == 0:
+                continue
+            segundos = np.sort(rng.integers(c, max(d, c + 1), n))
+            nivel, mensagem = sortear_logs(rng, n, proporcao, mensagens_erro)
+            yield pd.DataFrame({
+                'timestamp': pd.to_datetime(segundos, unit='s'),
+                'nivel': nivel,
+                'mensagem': mensagem,
+            })
+
+
+def ler_transacoes(caminho, codificacao=None, quarentena=None, tamanho_lote=TAMANHO_LOTE_PADRAO,
+                   ao_progredir=None):
+    # Transações do events.csv em lotes, sem carregar o arquivo: só timestamp,
+    # evento e IDs são lidos, os outros eventos (visualizações, carrinho) são
+    # descartados em cada lote e o timestamp é convertido por lote.
+    # ao_progredir recebe a fração do arquivo já lida.
+    codificacao = codificacao or detectar_codificacao(caminho)
+    cabecalho = ler_cabecalho(caminho, codificacao)
+    for coluna in ('timestamp', 'event'):
+        if coluna not in cabecalho:
+            raise ValueError(f"O arquivo CSV não contém a coluna '{coluna}' necessária")
+    colunas = [coluna for coluna in COLUNAS_EVENTOS if coluna in cabecalho]
+
+    tamanho = max(os.path.getsize(caminho), 1)
+    with open(caminho, 'rb') as f:
+        tabelas = ler_tabelas(f, colunas=colunas, categoricas=['event'], timestamps=['timestamp'],
+                              formato_timestamp='ms', codificacao=codificacao, quarentena=quarentena,
+                              tamanho_lote=tamanho_lote,
+                              tipos={coluna: pa.int64() for coluna in COLUNAS_ID if coluna in colunas})
+        for tabela in tabelas:
+            transacoes = tabela.filter(pc.fill_null(pc.equal(tabela['event'], EVENTO_TRANSACAO), False))
+            if ao_progredir is not None:
+                ao_progredir(min(f.tell() / tamanho, 1.0))
+            if transacoes.num_rows:
+                yield transacoes.drop_columns(['event']).to_pandas()
+
+
+def logs_de_transacoes(transacoes, max_logs=None, proporcao_erro=PROPORCAO_ERRO_PADRAO, seed=None):
+    # Um bloco de logs por lote de transações, com o timestamp e os IDs de cada
+    # transação; com max_logs, para de ler a origem assim que gera logs suficientes
+    rng = np.random.default_rng(seed)
+    gerados = 0
+    try:
+        for lote in transacoes:
+            if max_logs is not None:
+                lote = lote.head(max_logs - gerados)
+            nivel, mensagem = sortear_logs(rng, len(lote), proporcao_erro)
+            bloco = pd.DataFrame({
+                'timestamp': lote['timestamp'].to_numpy().astype('datetime64[s]'),
+                'nivel': nivel,
+                'mensagem': mensagem,
+            })
+            for coluna in COLUNAS_ID_LOG:
+                if coluna in lote.columns:
+                    bloco[coluna] = lote[coluna].to_numpy()
+            yield bloco
+            gerados += len(lote)
+            if max_logs is not None and gerados >= max_logs:
+                break
+    finally:
+        # Fecha o arquivo de origem mesmo quando a leitura para antes do fim
+        if hasattr(transacoes, 'close'):
+            transacoes.close()
+
+
+def gravar_csv(caminho, blocos, ao_progredir=None):
+    # Grava os blocos no CSV à medida que são gerados; retorna o total de linhas.
+    # O escritor CSV do pyarrow é bem mais rápido que o to_csv do pandas; as
+    # mensagens geradas não têm vírgulas nem aspas, então nada precisa de aspas.
+    # As colunas de IDs gravadas são as do primeiro bloco.
+    total = 0
+    blocos = iter(blocos)
+    primeiro = next(blocos, None)
+    colunas = COLUNAS_LOG + [coluna for coluna in COLUNAS_ID_LOG
+                             if primeiro is not None and coluna in primeiro.columns]
+    esquema = pa.schema([ESQUEMA_CSV.field(coluna) for coluna in colunas])
+    with open(caminho, 'wb') as f:
+        f.write((','.join(colunas) + '\n').encode('utf-8'))
+        opcoes = pacsv.WriteOptions(include_header=False, quoting_style='none')
+        with pacsv.CSVWriter(f, esquema, write_options=opcoes) as escritor:
+            for bloco in itertools.chain([primeiro] if primeiro is not None else [], blocos):
+                tabela = pa.Table.from_pandas(bloco[colunas], preserve_index=False)
+                escritor.write_table(tabela.cast(esquema))
+                total += len(bloco)
+                if ao_progredir is not None:
+                    ao_progredir(total)
+    return total
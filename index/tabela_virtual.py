@@ -0,0 +1,202 @@
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import pandas as pd
+
+TODOS = "Todos"
+ALTURA_LINHA_PADRAO = 20
+LINHAS_POR_PAGINA_PADRAO = 30
+
+
+class TabelaVirtual:
+    # Tabela que desenha só as linhas visíveis de um DataFrame: o Treeview tem
+    # sempre uma página de itens, reaproveitados a cada rolagem, e a barra de
+    # rolagem é controlada à mão. Filtros e ordenação trabalham com arrays de
+    # posições (códigos das categorias e ordens pré-calculadas por coluna), então
+    # continuam rápidos com milhões de linhas.
+    def __init__(self, parent, colunas, filtros=(), larguras=None):
+        # colunas: lista de (coluna do DataFrame, título); filtros: colunas
+        # categóricas com um combobox de filtro (ex.: nível, severidade, categoria)
+        self.colunas = [coluna for coluna, _ in colunas]
+        self.df = None
+        self._visao = np.zeros(0, dtype=np.int64)
+        self._ordens = {}
+        self._ordenacao = None
+        self._topo = 0
+        self._linhas_pagina = LINHAS_POR_PAGINA_PADRAO
+
+        self.frame = ttk.Frame(parent)
+        filtro_frame = ttk.Frame(self.frame)
+        filtro_frame.pack(side=tk.TOP, fill=tk.X, pady=2)
+        self._filtros = {}
+        for coluna in filtros:
+            titulo = dict(colunas).get(coluna, coluna)
+            ttk.Label(filtro_frame, text=f"{titulo}:").pack(side=tk.LEFT, padx=2)
+            variavel = tk.StringVar(value=TODOS)
+            combo = ttk.Combobox(filtro_frame, textvariable=variavel, values=[TODOS], state='readonly', width=14)
+            combo.bind('<<ComboboxSelected>>', lambda _: self._atualizar_visao())
+            combo.pack(side=tk.LEFT, padx=2)
+            self._filtros[coluna] = (variavel, combo)
+        self.info_var = tk.StringVar()
+        ttk.Label(filtro_frame, textvariable=self.info_var).pack(side=tk.RIGHT, padx=5)
+
+        self.tree = ttk.Treeview(self.frame, columns=self.colunas, show='headings', selectmode='browse')
+        for coluna, titulo in colunas:
+            self.tree.heading(coluna, text=titulo, command=lambda c=coluna: self.ordenar(c))
+            self.tree.column(coluna, width=(larguras or {}).get(coluna, 120),
+                             stretch=coluna == self.colunas[-1])
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._rolar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', self._redimensionar)
+        self.tree.bind('<MouseWheel>', lambda e: self.rolar(-1 if e.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda e: self.rolar(-1, 'units'))
+        self.tree.bind('<Button-5>', lambda e: self.rolar(1, 'units'))
+        self.tree.bind('<Prior>', lambda e: self.rolar(-1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self.rolar(1, 'pages'))
+        self.tree.bind('<Home>', lambda e: self._ir_para(0))
+        self.tree.bind('<End>', lambda e: self._ir_para(len(self._visao)))
+
+    def mostrar(self, df):
+        # Troca os dados exibidos; filtros e ordenação voltam ao padrão
+        self.df = df
+        self._ordens = {}
+        self._ordenacao = None
+        for coluna, (variavel, combo) in self._filtros.items():
+            variavel.set(TODOS)
+            valores = []
+            if df is not None and coluna in df.columns:
+                serie = df[coluna]
+                categorias = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else serie.unique()
+                valores = sorted(str(v) for v in categorias if not pd.isna(v))
+            combo.configure(values=[TODOS] + valores)
+        self._atualizar_visao()
+
+    def limpar(self):
+        self.mostrar(None)
+
+    @property
+    def total_visivel(self):
+        return len(self._visao)
+
+    def ordenar(self, coluna):
+        # Clique no cabeçalho: crescente, depois decrescente
+        crescente = self._ordenacao != (coluna, True)
+        self._ordenacao = (coluna, crescente)
+        for c in self.colunas:
+            seta = (" ▲" if crescente else " ▼") if c == coluna else ""
+            self.tree.heading(c, text=self.tree.heading(c, 'text').rstrip(" ▲▼") + seta)
+        self._atualizar_visao()
+
+    def _ordem(self, coluna):
+        # Posições de todas as linhas ordenadas pela coluna; calculada uma vez por coluna
+        if coluna not in self._ordens:
+            if coluna not in self.df.columns:
+                # Coluna opcional ausente destes dados (ex.: IDs de transação)
+                self._ordens[coluna] = np.arange(len(self.df))
+                return self._ordens[coluna]
+            serie = self.df[coluna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                # Ordena pelos códigos remapeados para a ordem alfabética das categorias
+                nomes = serie.cat.categories.astype(str).to_numpy()
+                posicao = np.empty(len(nomes) + 1, dtype=np.int64)
+                posicao[:-1] = np.argsort(np.argsort(nomes, kind='stable'), kind='stable') + 1
+                posicao[-1] = 0
+                chave = posicao[serie.cat.codes.to_numpy()]
+            elif serie.dtype.kind == 'M':
+                chave = serie.to_numpy().view(np.int64)
+            elif serie.dtype.kind in 'iuf':
+                chave = serie.to_numpy()
+            else:
+                chave = serie.astype(str).to_numpy()
+            self._ordens[coluna] = np.argsort(chave, kind='stable')
+        return self._ordens[coluna]
+
+    def _mascara(self):
+        mascara = None
+        for coluna, (variavel, _) in self._filtros.items():
+            valor = variavel.get()
+            if valor == TODOS or coluna not in self.df.columns:
+                continue
+            serie = self.df[coluna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                categorias = serie.cat.categories.astype(str)
+                codigo = categorias.get_loc(valor) if valor in categorias else -2
+                selecao = serie.cat.codes.to_numpy() == codigo
+            else:
+                selecao = (serie.astype(str) == valor).to_numpy()
+            mascara = selecao if mascara is None else mascara & selecao
+        return mascara
+
+    def _atualizar_visao(self):
+        if self.df is None:
+            self._visao = np.zeros(0, dtype=np.int64)
+        else:
+            if self._ordenacao is None:
+                base = np.arange(len(self.df))
+            else:
+                coluna, crescente = self._ordenacao
+                base = self._ordem(coluna)
+                if not crescente:
+                    base = base[::-1]
+            mascara = self._mascara()
+            self._visao = base if mascara is None else base[mascara[base]]
+        self._topo = 0
+        self._desenhar()
+
+    def _redimensionar(self, event):
+        altura = ALTURA_LINHA_PADRAO
+        itens = self.tree.get_children()
+        cabecalho = altura
+        if itens and self.tree.bbox(itens[0]):
+            y, altura = self.tree.bbox(itens[0])[1], self.tree.bbox(itens[0])[3]
+            cabecalho = y
+        linhas = max(1, (event.height - cabecalho) // max(altura, 1))
+        if linhas != self._linhas_pagina:
+            self._linhas_pagina = linhas
+            self._desenhar()
+
+    def rolar(self, quantidade, unidade):
+        passo = self._linhas_pagina if unidade == 'pages' else 3
+        self._ir_para(self._topo + int(quantidade) * passo)
+        return 'break'
+
+    def _rolar(self, acao, *args):
+        # Comando da barra de rolagem: 'moveto FRAÇÃO' ou 'scroll N units|pages'
+        if acao == 'moveto':
+            self._ir_para(int(float(args[0]) * len(self._visao)))
+        elif acao == 'scroll':
+            self.rolar(int(args[0]), args[1])
+
+    def _ir_para(self, topo):
+        topo = min(max(topo, 0), max(len(self._visao) - self._linhas_pagina, 0))
+        if topo != self._topo:
+            self._topo = topo
+            self._desenhar()
+
+    def _desenhar(self):
+        posicoes = self._visao[self._topo:self._topo + self._linhas_pagina]
+        linhas = [] if self.df is None else self.df.iloc[posicoes].reindex(columns=self.colunas, fill_value='').astype(str).to_numpy()
+
+        itens = self.tree.get_children()
+        # Reaproveita os itens existentes; cria ou remove só a diferença
+        for i, valores in enumerate(linhas):
+            if i < len(itens):
+                self.tree.item(itens[i], values=list(valores))
+            else:
+                self.tree.insert('', tk.END, values=list(valores))
+        if len(itens) > len(linhas):
+            self.tree.delete(*itens[len(linhas):])
+
+        total = len(self._visao)
+        if total:
+            self.scrollbar.set(self._topo / total, min((self._topo + self._linhas_pagina) / total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        if self.df is None:
+            self.info_var.set("")
+        else:
+            filtrados = f" (filtradas de {len(self.df):,})" if total != len(self.df) else ""
+            inicio = self._topo + 1 if total else 0
+            self.info_var.set(f"Linhas {inicio:,}–{self._topo + len(linhas):,} de {total:,}{filtrados}")
@@ -0,0 +1,154 @@
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox
+
+INTERVALO_VERIFICACAO_MS = 100
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class Progresso:
+    # Entregue à função da tarefa para informar o avanço (fração de 0 a 1) e
+    # interromper o trabalho quando o usuário cancela
+    def __init__(self, fila, cancelar):
+        self._fila = fila
+        self._cancelar = cancelar
+
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    def verificar(self):
+        if self.cancelado:
+            raise TarefaCancelada()
+
+    def informar(self, fracao, mensagem=None):
+        self.verificar()
+        self._fila.put(('progresso', fracao, mensagem))
+
+
+class ExecutorTarefas:
+    # Executa o trabalho pesado em threads de trabalho. O Tk só pode ser usado
+    # pela thread principal, então progresso e resultados voltam por uma fila
+    # consultada com after() e os callbacks rodam na thread principal.
+    def __init__(self, root, ao_progredir, max_workers=1):
+        self.root = root
+        self.ao_progredir = ao_progredir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tarefa')
+        self._fila = queue.Queue()
+        self._cancelar = None
+        self._callbacks = None
+
+    @property
+    def ocupado(self):
+        return self._callbacks is not None
+
+    def executar(self, funcao, ao_concluir, ao_falhar=None, ao_cancelar=None):
+        # funcao(progresso) roda em outra thread e não pode tocar em widgets.
+        # Retorna False se já houver uma tarefa em andamento.
+        if self.ocupado:
+            return False
+
+        self._cancelar = threading.Event()
+        self._callbacks = (ao_concluir, ao_falhar, ao_cancelar)
+        futuro = self._executor.submit(funcao, Progresso(self._fila, self._cancelar))
+        futuro.add_done_callback(lambda f: self._fila.put(('fim', f)))
+        self.root.after(INTERVALO_VERIFICACAO_MS, self._verificar_fila)
+        return True
+
+    def cancelar(self):
+        if self._cancelar is not None:
+            self._cancelar.set()
+
+    def encerrar(self):
+        self.cancelar()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _verificar_fila(self):
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                break
+
+            if item[0] == 'progresso':
+                self.ao_progredir(item[1], item[2])
+                continue
+
+            self._finalizar(item[1])
+            return
+        self.root.after(INTERVALO_VERIFICACAO_MS, self._verificar_fila)
+
+    def _finalizar(self, futuro):
+        ao_concluir, ao_falhar, ao_cancelar = self._callbacks
+        self._callbacks = None
+        self._cancelar = None
+
+        erro = futuro.exception()
+        if isinstance(erro, TarefaCancelada):
+            if ao_cancelar is not None:
+                ao_cancelar()
+        elif erro is not None:
+            if ao_falhar is None:
+                raise erro
+            ao_falhar(erro)
+        else:
+            ao_concluir(futuro.result())
+
+
+class BarraTarefas:
+    # Barra de status com progresso e botão de cancelar, ligada a um ExecutorTarefas
+    def __init__(self, root, parent, status_var):
+        self.status_var = status_var
+        self.tarefas = ExecutorTarefas(root, self._atualizar_progresso)
+
+        self.frame = ttk.Frame(parent)
+        ttk.Label(self.frame, textvariable=status_var, relief=tk.SUNKEN).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.progress_bar = ttk.Progressbar(self.frame, maximum=1.0, length=200)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(self.frame, text="Cancelar", command=self.tarefas.cancelar,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT)
+
+    def executar(self, mensagem, funcao, ao_concluir, mensagem_erro):
+        # funcao(progresso) roda em uma thread de trabalho; ao_concluir recebe o
+        # resultado na thread principal, onde os widgets podem ser alterados
+        def concluir(resultado):
+            self._finalizar()
+            try:
+                ao_concluir(resultado)
+            except Exception as e:
+                falhar(e)
+
+        def falhar(e):
+            self._finalizar()
+            self.status_var.set(f"Erro: {str(e)}")
+            messagebox.showerror("Erro", f"{mensagem_erro}: {str(e)}")
+
+        def cancelar():
+            self._finalizar()
+            self.status_var.set("⛔ Operação cancelada")
+
+        if not self.tarefas.executar(funcao, concluir, falhar, cancelar):
+            messagebox.showwarning("Aviso", "Aguarde a tarefa em andamento ou cancele-a.")
+            return
+
+        self.status_var.set(mensagem)
+        self.progress_bar['value'] = 0
+        self.cancel_button.configure(state=tk.NORMAL)
+
+    def encerrar(self):
+        self.tarefas.encerrar()
+
+    def _atualizar_progresso(self, fracao, mensagem):
+        self.progress_bar['value'] = fracao
+        if mensagem:
+            self.status_var.set(mensagem)
+
+    def _finalizar(self):
+        self.progress_bar['value'] = 0
+        self.cancel_button.configure(state=tk.DISABLED)